@@ -0,0 +1,226 @@
+# cython: language_level=3
+
+from libc.stdint cimport int16_t, uint8_t, uint32_t, uint64_t
+
+
+ctypedef struct _MapTarget:
+    uint8_t* solid_bits
+    int16_t* top_z
+    int16_t* bottom_z
+    uint32_t* color_mask
+    uint32_t* color_offset
+    uint8_t* color_capacity
+    uint32_t* color_data
+
+
+# The solid bitmap is column-major: each of the 512x512 columns owns 30
+# consecutive bytes (240 bits), bit `z` of column `x + (y << 9)`.
+cdef inline bint solid_at(const uint8_t* bits, int x, int y, int z) noexcept nogil:
+    cdef const uint8_t* column
+    if x < 0 or x >= 512 or y < 0 or y >= 512 or z < 0 or z >= 240:
+        return False
+    column = bits + (x + (y << 9)) * 30
+    return (column[z >> 3] >> (z & 7)) & 1
+
+
+cdef class _Snapshot:
+    cdef dict tiles
+    cdef dict stamps
+    cdef object __weakref__
+
+
+cdef class _MapStream:
+    cdef object source
+    cdef object compressor
+    cdef bytearray data
+    cdef bytes blob
+    cdef list marks
+    cdef Py_ssize_t pos
+    cdef Py_ssize_t total
+    cdef unsigned long long generation
+
+    cdef int _advance(self) except -1
+
+
+cdef class _BandDecoder:
+    cdef const unsigned char* data
+    cdef int edge
+    cdef int band_rows
+    cdef int offset
+    cdef int z_shift
+    cdef _MapTarget target
+    cdef uint32_t* encoded_offset
+    cdef uint32_t* encoded_length
+    cdef bytearray starts
+    cdef bytearray color_ends
+
+
+cdef class VXL:
+    cdef public object minimap_texture
+    cdef int _detail_level
+    cdef int _source_size
+    cdef int _source_max_z
+    cdef int _source_offset
+    cdef int _z_shift
+    cdef bint _overview_dirty
+    cdef object _raw_data
+    cdef bytearray _color_mask_buf
+    cdef bytearray _color_offset_buf
+    cdef bytearray _color_capacity_buf
+    cdef bytearray _color_data_buf
+    cdef uint32_t* _color_mask
+    cdef uint32_t* _color_offset
+    cdef uint8_t* _color_capacity
+    cdef uint32_t* _color_data
+    cdef Py_ssize_t _color_used
+    cdef Py_ssize_t _color_alloc
+    cdef Py_ssize_t _color_waste
+    cdef bytearray _solid_bits_buf
+    cdef bytearray _top_z_buf
+    cdef bytearray _bottom_z_buf
+    cdef uint8_t* _solid_bits
+    cdef int16_t* _top_z
+    cdef int16_t* _bottom_z
+    cdef bytearray _column_flags_buf
+    cdef bytearray _dirty_columns_buf
+    cdef bytearray _encoded_offset_buf
+    cdef bytearray _encoded_length_buf
+    cdef uint8_t* _column_flags
+    cdef uint32_t* _dirty_columns
+    cdef uint32_t* _encoded_offset
+    cdef uint32_t* _encoded_length
+    cdef Py_ssize_t _dirty_count
+    cdef bytearray _overview_columns_buf
+    cdef bytearray _overview_opaque_buf
+    cdef bytearray _overview_transparent_buf
+    cdef uint32_t* _overview_columns
+    cdef uint8_t* _overview_opaque
+    cdef uint8_t* _overview_transparent
+    cdef object _overview_opaque_view
+    cdef object _overview_transparent_view
+    cdef Py_ssize_t _overview_count
+    cdef readonly unsigned long long edit_generation
+    cdef unsigned long long _map_cache_generation
+    cdef bytes _map_blob
+    cdef dict _map_chunk_cache
+    cdef _MapStream _map_stream
+    cdef bytearray _check_visited_buf
+    cdef bytearray _check_stack_buf
+    cdef bytearray _check_nodes_buf
+    cdef uint8_t* _check_visited
+    cdef uint32_t* _check_stack
+    cdef uint32_t* _check_nodes
+    cdef bytearray _checked_points
+    cdef bytearray _tile_shared_buf
+    cdef bytearray _tile_edits_buf
+    cdef uint8_t* _tile_shared
+    cdef uint32_t* _tile_edits
+    cdef bytearray _tile_versions_buf
+    cdef uint64_t* _tile_versions
+    cdef list _chunks
+    cdef bytearray _column_hashes_buf
+    cdef bytearray _hash_columns_buf
+    cdef uint64_t* _column_hashes
+    cdef uint32_t* _hash_columns
+    cdef Py_ssize_t _hash_count
+    cdef bint _checksum_valid
+    cdef uint64_t _checksum_sum
+    cdef list _snapshots
+    cdef bytearray _journal_voxels_buf
+    cdef bytearray _journal_generations_buf
+    cdef uint32_t* _journal_voxels
+    cdef uint64_t* _journal_generations
+    cdef Py_ssize_t _journal_count
+    cdef Py_ssize_t _journal_alloc
+    cdef Py_ssize_t _journal_coalesced
+    cdef bint _journal_stale
+    cdef bytes _journal_base
+    cdef dict _journal_base_chunks
+
+    cdef void _reset_blank(self)
+    cdef void _reset_columns(self)
+    cdef void _reset_encoded(self)
+    cdef void _advance_all_tiles(self)
+    cdef void _clear_dirty_columns(self)
+    cdef void _touch_column(self, int x, int y)
+    cdef void _fill_target(self, _MapTarget* target)
+    cdef void _reset_color_arena(self)
+    cdef void _reset_colors(self)
+    cdef inline bint _has_color(self, int col, int z) noexcept
+    cdef inline int _color_rank(self, int col, int z) noexcept
+    cdef inline int _color_count(self, int col) noexcept
+    cdef inline unsigned int _color_at(self, int col, int z) noexcept
+    cdef void _grow_color_arena(self, Py_ssize_t needed)
+    cdef void _resize_color_arena(self, Py_ssize_t alloc)
+    cdef void _compact_colors(self)
+    cdef void _reserve_column_colors(self, int col, int count)
+    cdef void _put_color(self, int col, int z, unsigned int color)
+    cdef void _drop_color(self, int col, int z)
+    cdef inline bint _in_bounds(self, int x, int y, int z) noexcept
+    cdef inline bint _solid_at(self, int x, int y, int z) noexcept
+    cdef inline void _set_solid(self, int x, int y, int z, bint value) noexcept
+    cdef inline void _update_column_bounds(self, int x, int y, int z) noexcept
+    cdef void _recompute_column_bounds(self, int x, int y) noexcept
+    cdef void _shrink_column_bounds(self, int col, int z) noexcept
+    cdef inline void _store_block(self, int x, int y, int z, unsigned int color)
+    cdef list _apply_batch(self, object points, object colors, int mode, bint report=*)
+    cdef void _stamp_prefab(self, object kv6, int x, int y, int z, int rx, int ry, int rz, int scale, int mode)
+    cdef bint _load_source(self, object source, int threads=*)
+    cdef bint _load_bands(self, const unsigned char* data, Py_ssize_t limit, int edge, int threads, Py_ssize_t* color_used)
+    cdef bint _load_buffer(self, const unsigned char* data, Py_ssize_t limit, int threads=*)
+    cdef bint _load_cache(self, str path, object data, unsigned int checksum)
+    cdef bint _cache_columns_valid(self, Py_ssize_t color_used, Py_ssize_t source_length) noexcept
+    cdef void _write_cache(self, str path, object data, unsigned int checksum)
+    cdef inline void _overview_pixel(self, int col) noexcept
+    cdef void _ensure_overview(self)
+    cdef bytes _serialize_dirty(self)
+    cdef bytes _compressed_map(self)
+    cdef void _store_compressed_map(self, unsigned long long generation, bytes blob)
+    cdef void _ensure_check_buffers(self)
+    cdef void _reset_journal(self)
+    cdef inline void _journal_append(self, int x, int y, int z)
+    cdef void _journal_stamp(self, Py_ssize_t start)
+    cdef void _grow_journal(self)
+    cdef void _coalesce_journal(self)
+    cdef object _chunk(self, int tile)
+    cdef void _drop_snapshots(self)
+    cdef inline void _preserve_column(self, int x, int y)
+    cdef void _preserve_tile(self, int tile)
+    cdef bytes _capture_tile(self, int tile)
+    cdef void _write_tile(self, int tile, bytes data)
+
+    cpdef object add_point(self, object x, object y, object z, tuple color_tuple)
+    cpdef object set_point(self, object x, object y, object z, object color)
+    cpdef object remove_point(self, object x, object y, object z)
+    cpdef object remove_point_nochecks(self, object x, object y, object z)
+    cpdef object color_block(self, object x, object y, object z, object color=*)
+    cpdef object check_only(self, object x, object y, object z)
+    cpdef void clear_checked_geometry(self)
+    cpdef bint get_solid(self, object x, object y, object z)
+    cpdef tuple get_point(self, object x, object y, object z)
+    cpdef unsigned int get_color(self, object x, object y, object z)
+    cpdef tuple get_color_tuple(self, object x, object y, object z)
+    cpdef bint has_neighbors(self, object x, object y, object z, object check_water)
+    cpdef bint is_space_to_add_blocks(self)
+    cpdef void add_static_light(self, int x, int y, int z, int r, int g, int b, float intensity=*)
+    cpdef void update_static_light_colour(self, int x, int y, int z, int r, int g, int b)
+    cpdef void remove_static_light(self, int x, int y, int z)
+    cpdef void create_spot_shadows(self, object positions)
+    cpdef void set_shadow_char_height(self, int height)
+    cpdef void draw_spot_shadows(self)
+    cpdef void draw(self, object x=*, object y=*, object z=*, object draw_distance=*)
+    cpdef void draw_sea(self)
+    cpdef void post_load_draw_setup(self, object arg=*)
+    cpdef bint get_prefab_touches_world(self, object kv6, int x, int y, int z, int rx=*, int ry=*, int rz=*, int scale=*)
+    cpdef void place_prefab_in_world(self, object kv6, int x, int y, int z, int rx=*, int ry=*, int rz=*, int scale=*, int flags=*, float tolerance=*)
+    cpdef void erase_prefab_from_world(self, object kv6, int x, int y, int z, int rx=*, int ry=*, int rz=*, int scale=*, int flags=*, float tolerance=*)
+    cpdef list get_ground_colors(self)
+    cpdef void refresh_ground_colors(self)
+    cpdef void set_max_modifiable_z(self, int z)
+    cpdef int get_max_modifiable_z(self)
+    cpdef bint done_processing(self)
+    cpdef void change_thread_state(self, int mode, object data=*, int data_size=*)
+    cpdef list chunk_to_pointlist(self, object chunk)
+    cpdef bytes generate_vxl(self, bint compress=*, int level=*, int threads=*)
+    cpdef void destroy(self)
+    cpdef void cleanup(self)
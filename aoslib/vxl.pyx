@@ -9,8 +9,21 @@ match the original `aosdump/aoslib/vxl.pyd` in the local reverse-engineering
 environment while keeping the implementation readable in Cython.
 """
 
+import array as _pyarray
+import builtins as _builtins
+import mmap as _mmap
 import os as _os
+import struct as _struct
+import weakref as _weakref
+import zlib as _zlib
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from cpython.buffer cimport PyBUF_SIMPLE, PyBuffer_Release, PyObject_CheckBuffer, PyObject_GetBuffer
+from cpython.bytearray cimport PyByteArray_AS_STRING, PyByteArray_GET_SIZE, PyByteArray_Resize
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
 from libc.math cimport sqrt
+from libc.stdint cimport int16_t, int32_t, uint8_t, uint32_t, uint64_t
+from libc.stdlib cimport qsort
+from libc.string cimport memcmp, memcpy, memmove, memset
 
 
 DEF MAP_SIZE = 512
@@ -18,25 +31,229 @@ DEF MAP_HEIGHT = 240
 DEF MAP_AREA = MAP_SIZE * MAP_SIZE
 DEF VOXEL_COUNT = MAP_AREA * MAP_HEIGHT
 DEF VOXEL_BITS = (VOXEL_COUNT + 7) // 8
+DEF COLUMN_BYTES = MAP_HEIGHT // 8
 DEF EMPTY_TOP_START = 240
 DEF EMPTY_TOP_END = 239
+DEF COLOR_MASK_WORDS = 8
+DEF COLOR_ARENA_MIN = 4096
+DEF COLOR_COLUMN_MIN = 4
+DEF ENCODED_COLUMN_MAX = 2048
+DEF COLUMN_DIRTY = 1
+DEF COLUMN_BATCH = 2
+DEF COLUMN_OVERVIEW = 4
+DEF COLUMN_HASH = 8
+DEF BATCH_SET = 0
+DEF BATCH_REMOVE = 1
+DEF BATCH_COLOR = 2
+DEF MAP_CHUNK_SIZE = 8192
+DEF MAP_STREAM_STEP = 65536
+DEF DEFLATE_BAND_MIN = 262144
+DEF DEFLATE_WINDOW = 32768
+DEF GROUND_Z = MAP_HEIGHT - 2
+DEF CHECK_NODE_LIMIT = 65536
+DEF PREFAB_FIELDS = 6
+DEF PREFAB_ALPHA = 0x80
+DEF TILE_SHIFT = 5
+DEF TILE_SIZE = 1 << TILE_SHIFT
+DEF TILE_ROW = MAP_SIZE >> TILE_SHIFT
+DEF TILE_COUNT = TILE_ROW * TILE_ROW
+DEF TILE_COLUMNS = TILE_SIZE * TILE_SIZE
+DEF CACHE_VERSION = 1
+DEF JOURNAL_MIN = 4096
+DEF JOURNAL_FOLD = 4096
+DEF LOAD_BAND_ROWS = 32
 
 
 cdef list _ground_colors = []
 cdef int _max_modifiable_z = 238
 cdef bytes _EMPTY_COLUMN = b"\x00\xF0\xEF\x00"
 cdef bytes _BLANK_VXL = _EMPTY_COLUMN * MAP_AREA
+cdef bytes _CACHE_MAGIC = b"VXLC"
+# magic, version, source length, source CRC-32, edge, max Z, offset, Z shift,
+# color count
+cdef object _CACHE_HEADER = _struct.Struct("<4sIQIiiiiQ")
 
 
-cdef inline int _column_index(int x, int y):
+cdef inline int _column_index(int x, int y) noexcept nogil:
     return x + (y << 9)
 
 
-cdef inline int _voxel_index(int x, int y, int z):
-    return x + (y << 9) + (z << 18)
+cdef inline int _popcount32(uint32_t value) nogil:
+    value = value - ((value >> 1) & 0x55555555)
+    value = (value & 0x33333333) + ((value >> 2) & 0x33333333)
+    return <int>((((value + (value >> 4)) & 0x0F0F0F0F) * 0x01010101) >> 24)
 
 
-cdef inline unsigned int _read_u32_le(bytes data, Py_ssize_t pos):
+cdef inline uint64_t _mix64(uint64_t hash, uint64_t value) noexcept nogil:
+    # splitmix64-style finalizer folded over each input word.
+    hash ^= value * 0x9E3779B97F4A7C15ULL
+    hash = (hash ^ (hash >> 30)) * 0xBF58476D1CE4E5B9ULL
+    hash = (hash ^ (hash >> 27)) * 0x94D049BB133111EBULL
+    return hash ^ (hash >> 31)
+
+
+cdef uint64_t _column_hash(
+    const uint8_t* bits,
+    const uint32_t* mask,
+    const uint32_t* colors,
+    int col,
+) noexcept nogil:
+    # Hashes one column's solid bits, color mask and colors, seeded with its
+    # index so that equal columns at different places differ.
+    cdef uint64_t hash = _mix64(0, <uint64_t>col + 1)
+    cdef uint64_t word
+    cdef int count = 0
+    cdef int i
+
+    for i in range(0, COLUMN_BYTES, 8):
+        word = 0
+        memcpy(&word, bits + i, min(8, COLUMN_BYTES - i))
+        hash = _mix64(hash, word)
+    for i in range(0, COLOR_MASK_WORDS, 2):
+        hash = _mix64(hash, (<uint64_t>mask[i + 1] << 32) | mask[i])
+        count += _popcount32(mask[i]) + _popcount32(mask[i + 1])
+    for i in range(count):
+        hash = _mix64(hash, colors[i])
+    return hash
+
+
+cdef inline uint8_t* _column_bits(uint8_t* bits, int col) noexcept nogil:
+    return bits + col * COLUMN_BYTES
+
+
+cdef inline void _fill_bits(uint8_t* column, int start, int end) noexcept nogil:
+    # Sets bits [start, end) of one column.
+    cdef int first
+    cdef int last
+
+    if start >= end:
+        return
+    first = start >> 3
+    last = (end - 1) >> 3
+    if first == last:
+        column[first] |= <uint8_t>((0xFF << (start & 7)) & (0xFF >> (7 - ((end - 1) & 7))))
+        return
+    column[first] |= <uint8_t>(0xFF << (start & 7))
+    if last > first + 1:
+        memset(column + first + 1, 0xFF, last - first - 1)
+    column[last] |= <uint8_t>(0xFF >> (7 - ((end - 1) & 7)))
+
+
+cdef inline int _low_bit(uint8_t value) noexcept nogil:
+    cdef int bit = 0
+
+    while not (value & 1):
+        value >>= 1
+        bit += 1
+    return bit
+
+
+cdef inline int _high_bit(uint8_t value) noexcept nogil:
+    cdef int bit = 7
+
+    while not (value & 0x80):
+        value <<= 1
+        bit -= 1
+    return bit
+
+
+cdef inline int _next_solid(const uint8_t* column, int start) noexcept nogil:
+    # First solid Z at or after `start`, or MAP_HEIGHT. Scans a byte at a time.
+    cdef int i
+    cdef uint8_t value
+
+    if start < 0:
+        start = 0
+    if start >= MAP_HEIGHT:
+        return MAP_HEIGHT
+    i = start >> 3
+    value = column[i] & <uint8_t>(0xFF << (start & 7))
+    while not value:
+        i += 1
+        if i >= COLUMN_BYTES:
+            return MAP_HEIGHT
+        value = column[i]
+    return (i << 3) + _low_bit(value)
+
+
+cdef inline int _next_air(const uint8_t* column, int start) noexcept nogil:
+    # First empty Z at or after `start`, or MAP_HEIGHT.
+    cdef int i
+    cdef uint8_t value
+
+    if start < 0:
+        start = 0
+    if start >= MAP_HEIGHT:
+        return MAP_HEIGHT
+    i = start >> 3
+    value = <uint8_t>~column[i] & <uint8_t>(0xFF << (start & 7))
+    while not value:
+        i += 1
+        if i >= COLUMN_BYTES:
+            return MAP_HEIGHT
+        value = <uint8_t>~column[i]
+    return (i << 3) + _low_bit(value)
+
+
+cdef void _fill_solid_region(
+    const uint8_t* bits,
+    uint8_t* out,
+    int x1,
+    int y1,
+    int z1,
+    int x2,
+    int y2,
+    int z2,
+) noexcept nogil:
+    # Writes one byte per voxel of the box, z fastest. Each column is cleared
+    # and then filled run by run; columns outside the map stay air.
+    cdef int depth = z2 - z1 + 1
+    cdef int top = max(z1, 0)
+    cdef int bottom = min(z2 + 1, MAP_HEIGHT)
+    cdef const uint8_t* column
+    cdef uint8_t* cell = out
+    cdef int x
+    cdef int y
+    cdef int z
+    cdef int end
+
+    for y in range(y1, y2 + 1):
+        for x in range(x1, x2 + 1):
+            memset(cell, 0, depth)
+            if 0 <= x < MAP_SIZE and 0 <= y < MAP_SIZE:
+                column = _column_bits(<uint8_t*>bits, _column_index(x, y))
+                z = _next_solid(column, top)
+                while z < bottom:
+                    end = min(_next_air(column, z), bottom)
+                    memset(cell + (z - z1), 1, end - z)
+                    z = _next_solid(column, end)
+            cell += depth
+
+
+cdef inline int _prev_solid(const uint8_t* column, int end) noexcept nogil:
+    # Last solid Z at or before `end`, or -1.
+    cdef int i
+    cdef uint8_t value
+
+    if end < 0:
+        return -1
+    if end >= MAP_HEIGHT:
+        end = MAP_HEIGHT - 1
+    i = end >> 3
+    value = column[i] & <uint8_t>(0xFF >> (7 - (end & 7)))
+    while not value:
+        i -= 1
+        if i < 0:
+            return -1
+        value = column[i]
+    return (i << 3) + _high_bit(value)
+
+
+cdef inline bytearray _new_buffer(Py_ssize_t count, Py_ssize_t itemsize):
+    return bytearray(count * itemsize)
+
+
+cdef inline unsigned int _read_u32_le(const unsigned char* data, Py_ssize_t pos) noexcept nogil:
     return (
         data[pos]
         | (data[pos + 1] << 8)
@@ -92,19 +309,111 @@ cdef inline unsigned int _pack_color_tuple(tuple color_tuple):
     )
 
 
-cdef object _coerce_raw_bytes(object source):
+cdef object _coerce_raw_source(object source):
+    # Buffer-protocol sources (bytearray, memoryview, mmap, ...) are kept by
+    # reference as a flat byte view so the loader can parse them in place.
     if isinstance(source, bytes):
         return source
-    if isinstance(source, bytearray):
-        return bytes(source)
     if isinstance(source, str):
         return source.encode("latin1", "ignore")
-    return b""
-
-
-cdef tuple _get_vxl_size(bytes data):
+    if not PyObject_CheckBuffer(source):
+        return b""
+    source = _builtins.memoryview(source)
+    if not source.c_contiguous:
+        return source.tobytes()
+    if source.format != "B" or source.ndim != 1:
+        source = source.cast("B")
+    return source.toreadonly()
+
+
+cdef str _cache_path(str path):
+    # The map cache lives beside its source: maps/Foo.vxl -> maps/Foo.vxlc.
+    return _os.path.splitext(path)[0] + ".vxlc"
+
+
+cdef object _coerce_int32_buffer(object values, str name):
+    # Returns a flat, C-contiguous 4-byte integer view of `values`; sequences
+    # without the buffer protocol are packed into an `array`.
+    cdef object view
+    cdef str code
+
+    if not PyObject_CheckBuffer(values):
+        values = _pyarray.array("i", [int(value) for row in values for value in (row if isinstance(row, (tuple, list)) else (row,))])
+    view = _builtins.memoryview(values)
+    code = view.format.lstrip("@=<>!")
+    if view.itemsize != 4 or code not in ("i", "I", "l", "L"):
+        raise TypeError("%s must be a buffer of 32-bit integers" % name)
+    if not view.c_contiguous:
+        view = _builtins.memoryview(view.tobytes()).cast(code)
+    return view.cast("B").cast("i")
+
+
+cdef object _coerce_colors(object colors):
+    # Colors are unsigned 32-bit values, so sequences are packed as "I" and a
+    # tuple entry is one color rather than a row of values.
+    if not PyObject_CheckBuffer(colors):
+        colors = _pyarray.array("I", [
+            _pack_color_tuple(color) if isinstance(color, tuple) else int(color) & 0xFFFFFFFF
+            for color in colors
+        ])
+    return _coerce_int32_buffer(colors, "colors")
+
+
+cdef object _coerce_points(object points):
+    cdef object view = _coerce_int32_buffer(points, "points")
+
+    if len(view) % 3:
+        raise ValueError("points must have shape (N, 3)")
+    return view
+
+
+def _deflate_band(object source, Py_ssize_t start, Py_ssize_t end, int level, bint last):
+    # Raw deflate of one band, primed with the preceding window so matches can
+    # reach across the band boundary. zlib releases the GIL while deflating.
+    cdef object compressor
+
+    if start:
+        compressor = _zlib.compressobj(level, _zlib.DEFLATED, -15, zdict=source[max(0, start - DEFLATE_WINDOW):start])
+    else:
+        compressor = _zlib.compressobj(level, _zlib.DEFLATED, -15)
+    return compressor.compress(source[start:end]) + compressor.flush(_zlib.Z_FINISH if last else _zlib.Z_SYNC_FLUSH)
+
+
+cdef bytes _deflate_map(object data, int level, int threads):
+    # pigz-style parallel zlib: bands end on byte-aligned sync flushes, so the
+    # raw deflate outputs concatenate into one stream under a single zlib
+    # header and an Adler-32 trailer over the whole input.
+    cdef object source = _builtins.memoryview(data)
+    cdef Py_ssize_t total = len(source)
+    cdef Py_ssize_t band_size
+    cdef int bands
+    cdef list parts
+
+    if threads <= 0:
+        threads = _os.cpu_count() or 1
+    bands = <int>min(threads, max(1, total // DEFLATE_BAND_MIN))
+    if bands <= 1:
+        return _zlib.compress(source, level)
+
+    band_size = (total + bands - 1) // bands
+    with _ThreadPoolExecutor(bands) as pool:
+        parts = list(pool.map(
+            _deflate_band,
+            [source] * bands,
+            [index * band_size for index in range(bands)],
+            [min(total, (index + 1) * band_size) for index in range(bands)],
+            [level] * bands,
+            [index == bands - 1 for index in range(bands)],
+        ))
+    return b"".join([
+        _zlib.compress(b"", level)[:2],
+        b"".join(parts),
+        _struct.pack(">I", _zlib.adler32(source)),
+    ])
+
+
+cdef tuple _get_vxl_size(const unsigned char* data, Py_ssize_t limit):
     cdef Py_ssize_t pos = 0
-    cdef Py_ssize_t limit = len(data)
     cdef Py_ssize_t columns = 0
     cdef int max_ref = 0
     cdef int span_words
@@ -153,6 +462,549 @@ cdef tuple _get_vxl_size(bytes data):
     return (columns, max_ref)
 
 
+cdef inline void _column_add_color(uint32_t* mask, uint32_t* colors, int* count, int z, unsigned int color) noexcept nogil:
+    cdef int word = z >> 5
+    cdef uint32_t bit = 1u << (z & 31)
+    cdef int rank = 0
+    cdef int i
+
+    if z >= MAP_HEIGHT or not color:
+        return
+    for i in range(word):
+        rank += _popcount32(mask[i])
+    rank += _popcount32(mask[word] & (bit - 1))
+    if mask[word] & bit:
+        colors[rank] = color
+        return
+    if rank < count[0]:
+        memmove(colors + rank + 1, colors + rank, (count[0] - rank) * sizeof(uint32_t))
+    colors[rank] = color
+    mask[word] |= bit
+    count[0] += 1
+
+
+cdef inline void _column_add_solid(uint8_t* column, int start, int end, int* top, int* bottom) noexcept nogil:
+    if start < 0:
+        start = 0
+    if end > MAP_HEIGHT:
+        end = MAP_HEIGHT
+    if start >= end:
+        return
+    _fill_bits(column, start, end)
+    if start < top[0]:
+        top[0] = start
+    if end - 1 > bottom[0]:
+        bottom[0] = end - 1
+
+
+cdef Py_ssize_t _decode_column(
+    const unsigned char* data,
+    Py_ssize_t pos,
+    Py_ssize_t limit,
+    int col,
+    int z_shift,
+    _MapTarget* target,
+    Py_ssize_t color_pos,
+    int* color_count,
+) noexcept nogil:
+    # Decodes the spans of one packed column straight into the map buffers.
+    # Returns the position of the next column, or -1 for malformed data.
+    cdef uint8_t* column = _column_bits(target.solid_bits, col)
+    cdef uint32_t* mask = target.color_mask + col * COLOR_MASK_WORDS
+    cdef uint32_t* colors = target.color_data + color_pos
+    cdef int count = 0
+    cdef int top = MAP_HEIGHT
+    cdef int bottom = -1
+    cdef int span_words
+    cdef int top_start
+    cdef int top_end
+    cdef int top_len
+    cdef int bottom_len
+    cdef int bottom_start
+    cdef int next_air_start
+    cdef int solid_start
+    cdef int i
+
+    while True:
+        if pos + 4 > limit:
+            return -1
+
+        span_words = data[pos]
+        top_start = data[pos + 1]
+        top_end = data[pos + 2]
+        pos += 4
+
+        if top_end >= top_start:
+            top_len = top_end - top_start + 1
+            if pos + (top_len * 4) > limit:
+                return -1
+            for i in range(top_len):
+                _column_add_color(mask, colors, &count, top_start + z_shift + i, _read_u32_le(data, pos + (i * 4)))
+            pos += top_len * 4
+            solid_start = top_start
+        else:
+            top_len = 0
+            solid_start = top_end + 1
+
+        if span_words == 0:
+            if top_len:
+                _column_add_solid(column, top_start + z_shift, top_end + 1 + z_shift, &top, &bottom)
+            break
+
+        bottom_len = span_words - top_len - 1
+        if bottom_len < 0:
+            return -1
+        if pos + (bottom_len * 4) + 4 > limit:
+            return -1
+
+        next_air_start = data[pos + (bottom_len * 4) + 3]
+        bottom_start = next_air_start - bottom_len
+        if bottom_start < top_end + 1:
+            return -1
+
+        for i in range(bottom_len):
+            _column_add_color(mask, colors, &count, bottom_start + z_shift + i, _read_u32_le(data, pos + (i * 4)))
+        pos += bottom_len * 4
+
+        # Top colors, the hidden gap and bottom colors form one solid run.
+        _column_add_solid(column, solid_start + z_shift, next_air_start + z_shift, &top, &bottom)
+
+    target.top_z[col] = top
+    target.bottom_z[col] = bottom
+    target.color_offset[col] = <uint32_t>color_pos
+    target.color_capacity[col] = count
+    color_count[0] = count
+    return pos
+
+
+cdef inline Py_ssize_t _skip_column(const unsigned char* data, Py_ssize_t pos, Py_ssize_t limit) noexcept nogil:
+    # Position of the next column, walking span headers only, or -1.
+    while True:
+        if pos + 4 > limit:
+            return -1
+        if data[pos] == 0:
+            if data[pos + 2] >= data[pos + 1]:
+                return pos + 8 + 4 * (data[pos + 2] - data[pos + 1])
+            return pos + 4
+        pos += 4 * data[pos]
+
+
+cdef Py_ssize_t _decode_rows(
+    const unsigned char* data,
+    Py_ssize_t pos,
+    Py_ssize_t limit,
+    int first_row,
+    int last_row,
+    int edge,
+    int offset,
+    int z_shift,
+    _MapTarget* target,
+    uint32_t* encoded_offset,
+    uint32_t* encoded_length,
+    Py_ssize_t* color_pos,
+) noexcept nogil:
+    # Decodes source rows [first_row, last_row) starting at `pos`, appending
+    # colors at `color_pos`. Returns the position after the last row, or -1.
+    cdef Py_ssize_t start
+    cdef int color_count = 0
+    cdef int col
+    cdef int src_x
+    cdef int src_y
+
+    for src_y in range(first_row, last_row):
+        for src_x in range(edge):
+            start = pos
+            col = _column_index(src_x + offset, src_y + offset)
+            pos = _decode_column(data, pos, limit, col, z_shift, target, color_pos[0], &color_count)
+            if pos < 0:
+                return -1
+            # The source bytes double as the column's encoded segment.
+            encoded_offset[col] = <uint32_t>start
+            encoded_length[col] = <uint32_t>(pos - start)
+            color_pos[0] += color_count
+    return pos
+
+
+cdef class _BandDecoder:
+    # Decodes row bands of one source on worker threads. Every band writes
+    # its own columns and appends colors from `start // 4` on, which cannot
+    # overlap the next band because each color takes a 4-byte source word.
+    def decode(self, int band):
+        cdef Py_ssize_t* starts = <Py_ssize_t*>PyByteArray_AS_STRING(self.starts)
+        cdef Py_ssize_t* color_ends = <Py_ssize_t*>PyByteArray_AS_STRING(self.color_ends)
+        cdef Py_ssize_t color_pos = starts[band] // 4
+        cdef int first_row = band * self.band_rows
+        cdef int last_row = min(self.edge, first_row + self.band_rows)
+        cdef Py_ssize_t end
+
+        with nogil:
+            end = _decode_rows(
+                self.data,
+                starts[band],
+                starts[band + 1],
+                first_row,
+                last_row,
+                self.edge,
+                self.offset,
+                self.z_shift,
+                &self.target,
+                self.encoded_offset,
+                self.encoded_length,
+                &color_pos,
+            )
+        color_ends[band] = color_pos
+        return end == starts[band + 1]
+
+
+cdef inline unsigned int _column_color(const uint32_t* mask, const uint32_t* colors, int z) noexcept nogil:
+    cdef int word = z >> 5
+    cdef uint32_t bit = 1u << (z & 31)
+    cdef int rank = 0
+    cdef int i
+
+    if not (mask[word] & bit):
+        return 0
+    for i in range(word):
+        rank += _popcount32(mask[i])
+    return colors[rank + _popcount32(mask[word] & (bit - 1))]
+
+
+cdef inline bint _column_has_color(const uint32_t* mask, int z) noexcept nogil:
+    return (mask[z >> 5] >> (z & 31)) & 1
+
+
+cdef inline bint _column_solid(const uint8_t* column, int z) noexcept nogil:
+    return (column[z >> 3] >> (z & 7)) & 1
+
+
+cdef inline int _write_span_colors(
+    uint8_t* out,
+    int pos,
+    const uint32_t* mask,
+    const uint32_t* colors,
+    int start,
+    int end,
+) noexcept nogil:
+    cdef unsigned int color
+    cdef int z
+
+    for z in range(start, end + 1):
+        color = _column_color(mask, colors, z)
+        out[pos] = color & 0xFF
+        out[pos + 1] = (color >> 8) & 0xFF
+        out[pos + 2] = (color >> 16) & 0xFF
+        out[pos + 3] = (color >> 24) & 0xFF
+        pos += 4
+    return pos
+
+
+cdef inline int _write_span_header(uint8_t* out, int pos, int words, int top_start, int top_end, int air_start) noexcept nogil:
+    out[pos] = words
+    out[pos + 1] = top_start
+    out[pos + 2] = top_end
+    out[pos + 3] = air_start
+    return pos + 4
+
+
+cdef int _encode_column(const _MapTarget* target, int col, int z_shift, int floor_z, uint8_t* out) noexcept nogil:
+    # Encodes one column as packed VXL spans into `out`, which must hold
+    # ENCODED_COLUMN_MAX bytes, and returns the encoded length. Each span
+    # stores a colored top, a hidden gap and a colored bottom; a solid run with
+    # several colored stretches continues in the next span with no air between.
+    # `floor_z` is the source's highest referenced Z, which closes every column
+    # so that the output reloads with the same Z shift.
+    cdef const uint8_t* column = _column_bits(target.solid_bits, col)
+    cdef const uint32_t* mask = target.color_mask + col * COLOR_MASK_WORDS
+    cdef const uint32_t* colors = target.color_data + target.color_offset[col]
+    cdef int low = target.top_z[col]
+    cdef int high = target.bottom_z[col]
+    cdef int pos = 0
+    cdef int air_start = 0
+    cdef int run_end
+    cdef int top_start
+    cdef int top_end
+    cdef int bottom_start
+    cdef int z
+
+    if low < z_shift:
+        low = z_shift
+
+    z = low
+    while z <= high:
+        while z <= high and not _column_solid(column, z):
+            z += 1
+        if z > high:
+            break
+        run_end = z
+        while run_end < high and _column_solid(column, run_end + 1):
+            run_end += 1
+
+        while z <= run_end:
+            top_start = z
+            # Spans never start with an empty top at source Z 0 or at the map
+            # floor; a hidden voxel there is written with a zero color.
+            if (z == z_shift or z == MAP_HEIGHT - 1) and not _column_has_color(mask, z):
+                z += 1
+            while z <= run_end and _column_has_color(mask, z):
+                z += 1
+            top_end = z - 1
+            if z > run_end and run_end == high:
+                pos = _write_span_header(out, pos, 0, top_start - z_shift, top_end - z_shift, air_start)
+                return _write_span_colors(out, pos, mask, colors, top_start, top_end)
+
+            # The bottom voxel of the map always opens the final span, so the
+            # gap stops there and the next span never starts past `floor_z`.
+            while z <= run_end and z < MAP_HEIGHT - 1 and not _column_has_color(mask, z):
+                z += 1
+            bottom_start = z
+            while z <= run_end and z < MAP_HEIGHT - 1 and _column_has_color(mask, z):
+                z += 1
+
+            pos = _write_span_header(
+                out,
+                pos,
+                1 + (top_end - top_start + 1) + (z - bottom_start),
+                top_start - z_shift,
+                top_end - z_shift,
+                air_start,
+            )
+            pos = _write_span_colors(out, pos, mask, colors, top_start, top_end)
+            pos = _write_span_colors(out, pos, mask, colors, bottom_start, z - 1)
+            air_start = z - z_shift
+
+    # The closing span has no colors and starts at the map floor.
+    return _write_span_header(out, pos, 0, floor_z, floor_z - 1, air_start)
+
+
+cdef int _compare_columns(const void* left, const void* right) noexcept nogil:
+    cdef uint32_t a = (<const uint32_t*>left)[0]
+    cdef uint32_t b = (<const uint32_t*>right)[0]
+    return (a > b) - (a < b)
+
+
+cdef int _compare_keys(const void* left, const void* right) noexcept nogil:
+    cdef uint64_t a = (<const uint64_t*>left)[0]
+    cdef uint64_t b = (<const uint64_t*>right)[0]
+    return (a > b) - (a < b)
+
+
+cdef tuple _split_chunks(bytes blob, int chunk_size):
+    cdef Py_ssize_t total = len(blob)
+
+    return tuple(
+        (blob[pos:pos + chunk_size], min(pos + chunk_size, total) * 100 // total)
+        for pos in range(0, total, chunk_size)
+    )
+
+
+cdef inline int _push_voxel(
+    const uint8_t* solid,
+    uint8_t* visited,
+    uint32_t* stack,
+    uint32_t* nodes,
+    Py_ssize_t* top,
+    Py_ssize_t* count,
+    int x,
+    int y,
+    int z,
+) noexcept nogil:
+    # Returns 1 when the voxel grounds the component (or the component grew
+    # past CHECK_NODE_LIMIT), otherwise queues unvisited solid voxels.
+    cdef uint32_t index
+
+    if not solid_at(solid, x, y, z):
+        return 0
+    if z >= GROUND_Z:
+        return 1
+    index = <uint32_t>(_column_index(x, y) * MAP_HEIGHT + z)
+    if visited[index >> 3] & (1 << (index & 7)):
+        return 0
+    if count[0] >= CHECK_NODE_LIMIT:
+        return 1
+    visited[index >> 3] |= 1 << (index & 7)
+    stack[top[0]] = index
+    top[0] += 1
+    nodes[count[0]] = index
+    count[0] += 1
+    return 0
+
+
+cdef bint _find_floating(
+    const uint8_t* solid,
+    uint8_t* visited,
+    uint32_t* stack,
+    uint32_t* nodes,
+    Py_ssize_t* count,
+    int x,
+    int y,
+    int z,
+) noexcept nogil:
+    # Walks the solid component holding (x, y, z) and returns True when it
+    # never reaches the ground plane; its voxels are left in nodes[:count] and
+    # marked in `visited`. The voxel below is popped first, so a supported
+    # component usually reaches the ground in a straight line instead of
+    # flooding the terrain around the start.
+    cdef Py_ssize_t top = 0
+    cdef uint32_t index
+    cdef int col
+
+    count[0] = 0
+    if _push_voxel(solid, visited, stack, nodes, &top, count, x, y, z):
+        return False
+    while top:
+        top -= 1
+        index = stack[top]
+        col = index // MAP_HEIGHT
+        z = index - col * MAP_HEIGHT
+        x = col & (MAP_SIZE - 1)
+        y = col >> 9
+        if (_push_voxel(solid, visited, stack, nodes, &top, count, x, y, z - 1)
+                or _push_voxel(solid, visited, stack, nodes, &top, count, x - 1, y, z)
+                or _push_voxel(solid, visited, stack, nodes, &top, count, x + 1, y, z)
+                or _push_voxel(solid, visited, stack, nodes, &top, count, x, y - 1, z)
+                or _push_voxel(solid, visited, stack, nodes, &top, count, x, y + 1, z)
+                or _push_voxel(solid, visited, stack, nodes, &top, count, x, y, z + 1)):
+            return False
+    return True
+
+
+cdef inline void _clear_visited(uint8_t* visited, const uint32_t* nodes, Py_ssize_t count) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef uint32_t index
+
+    for i in range(count):
+        index = nodes[i]
+        visited[index >> 3] &= ~(1 << (index & 7))
+
+
+cdef object _prefab_voxels(object kv6):
+    # Returns the KV6 point list, an (N, 6) int16 buffer of pivot-relative
+    # x, y, z and r, g, b, as a flat byte view.
+    cdef object view = _builtins.memoryview(kv6.get_points())
+
+    if view.format != "h" or view.ndim != 2 or view.shape[1] != PREFAB_FIELDS:
+        raise TypeError("kv6 points must be an (N, 6) int16 buffer")
+    if not view.c_contiguous:
+        view = _builtins.memoryview(view.tobytes())
+    return view.cast("B")
+
+
+cdef inline void _quarter_turns(int* a, int* b, int turns) noexcept nogil:
+    # Rotates the (a, b) plane by `turns` quarter turns.
+    cdef int t
+
+    turns &= 3
+    while turns:
+        t = a[0]
+        a[0] = -b[0]
+        b[0] = t
+        turns -= 1
+
+
+cdef void _prefab_matrix(int rx, int ry, int rz, int* matrix) noexcept nogil:
+    # Builds the integer rotation for quarter turns about x, then y, then z.
+    # Column `axis` of the row-major 3x3 matrix is the rotated unit vector.
+    cdef int axis
+    cdef int v[3]
+
+    for axis in range(3):
+        v[0] = axis == 0
+        v[1] = axis == 1
+        v[2] = axis == 2
+        _quarter_turns(&v[1], &v[2], rx)
+        _quarter_turns(&v[2], &v[0], ry)
+        _quarter_turns(&v[0], &v[1], rz)
+        matrix[axis] = v[0]
+        matrix[3 + axis] = v[1]
+        matrix[6 + axis] = v[2]
+
+
+cdef void _expand_prefab(
+    const int16_t* voxels,
+    Py_ssize_t count,
+    const int* matrix,
+    int x,
+    int y,
+    int z,
+    int scale,
+    int32_t* points,
+    uint32_t* colors,
+) noexcept nogil:
+    # Each model voxel becomes a scale^3 block, rotated and moved to (x, y, z).
+    cdef Py_ssize_t i
+    cdef Py_ssize_t out = 0
+    cdef const int16_t* voxel
+    cdef uint32_t color
+    cdef int i0
+    cdef int i1
+    cdef int i2
+    cdef int px
+    cdef int py
+    cdef int pz
+
+    for i in range(count):
+        voxel = voxels + i * PREFAB_FIELDS
+        color = (<uint32_t>PREFAB_ALPHA << 24) | ((voxel[3] & 0xFF) << 16) | ((voxel[4] & 0xFF) << 8) | (voxel[5] & 0xFF)
+        for i0 in range(scale):
+            px = voxel[0] * scale + i0
+            for i1 in range(scale):
+                py = voxel[1] * scale + i1
+                for i2 in range(scale):
+                    pz = voxel[2] * scale + i2
+                    points[out * 3] = x + matrix[0] * px + matrix[1] * py + matrix[2] * pz
+                    points[out * 3 + 1] = y + matrix[3] * px + matrix[4] * py + matrix[5] * pz
+                    points[out * 3 + 2] = z + matrix[6] * px + matrix[7] * py + matrix[8] * pz
+                    colors[out] = color
+                    out += 1
+
+
+cdef bint _prefab_touches(
+    const uint8_t* solid,
+    const int16_t* voxels,
+    Py_ssize_t count,
+    const int* matrix,
+    int x,
+    int y,
+    int z,
+    int scale,
+) noexcept nogil:
+    # True as soon as a prefab voxel overlaps or faces a solid map voxel.
+    cdef Py_ssize_t i
+    cdef const int16_t* voxel
+    cdef int i0
+    cdef int i1
+    cdef int i2
+    cdef int px
+    cdef int py
+    cdef int pz
+    cdef int wx
+    cdef int wy
+    cdef int wz
+
+    if scale < 1:
+        scale = 1
+    for i in range(count):
+        voxel = voxels + i * PREFAB_FIELDS
+        for i0 in range(scale):
+            px = voxel[0] * scale + i0
+            for i1 in range(scale):
+                py = voxel[1] * scale + i1
+                for i2 in range(scale):
+                    pz = voxel[2] * scale + i2
+                    wx = x + matrix[0] * px + matrix[1] * py + matrix[2] * pz
+                    wy = y + matrix[3] * px + matrix[4] * py + matrix[5] * pz
+                    wz = z + matrix[6] * px + matrix[7] * py + matrix[8] * pz
+                    if (solid_at(solid, wx, wy, wz)
+                            or solid_at(solid, wx - 1, wy, wz)
+                            or solid_at(solid, wx + 1, wy, wz)
+                            or solid_at(solid, wx, wy - 1, wz)
+                            or solid_at(solid, wx, wy + 1, wz)
+                            or solid_at(solid, wx, wy, wz - 1)
+                            or solid_at(solid, wx, wy, wz + 1)):
+                        return True
+    return False
+
+
 cpdef object A2(object arg):
     return arg
 
@@ -201,10 +1053,16 @@ cpdef object parse_constant_overrides(object arg):
 
 
 cdef class CChunk:
+    # Live view of one 32x32 column tile of a map, over the full height.
+    # Bounds are half-open; `CChunk()` without a map is empty.
+    cdef VXL _map
+    cdef int _tile
     cdef int _x1, _y1, _z1
     cdef int _x2, _y2, _z2
 
     def __cinit__(self):
+        self._map = None
+        self._tile = 0
         self._x1 = 0
         self._y1 = 0
         self._z1 = 0
@@ -236,6 +1094,13 @@ cdef class CChunk:
     def z2(self):
         return self._z2
 
+    @property
+    def version(self):
+        """`edit_generation` of the last edit (or load) inside the chunk."""
+        if self._map is None:
+            return 0
+        return self._map._tile_versions[self._tile]
+
     cpdef void delete(self):
         return
 
@@ -243,49 +1108,179 @@ cdef class CChunk:
         return
 
     cpdef list get_colors(self):
-        return []
+        """Return the colors of the chunk's colored voxels, in `to_block_list` order."""
+        cdef list colors = []
+        cdef const uint32_t* mask
+        cdef const uint32_t* data
+        cdef int col
+        cdef int count
+        cdef int x
+        cdef int y
+        cdef int i
+
+        if self._map is None:
+            return colors
+        for y in range(self._y1, self._y2):
+            for x in range(self._x1, self._x2):
+                col = _column_index(x, y)
+                mask = self._map._color_mask + col * COLOR_MASK_WORDS
+                data = self._map._color_data + self._map._color_offset[col]
+                count = 0
+                for i in range(COLOR_MASK_WORDS):
+                    count += _popcount32(mask[i])
+                for i in range(count):
+                    colors.append(data[i])
+        return colors
 
     cpdef list to_block_list(self):
-        return []
+        """Return the chunk's colored (surface) voxels as `(x, y, z)` tuples.
+
+        Columns are walked row by row and each column top to bottom, the
+        order of the color store.
+        """
+        cdef list blocks = []
+        cdef const uint32_t* mask
+        cdef uint32_t bits
+        cdef int col
+        cdef int x
+        cdef int y
+        cdef int word
+
+        if self._map is None:
+            return blocks
+        for y in range(self._y1, self._y2):
+            for x in range(self._x1, self._x2):
+                col = _column_index(x, y)
+                mask = self._map._color_mask + col * COLOR_MASK_WORDS
+                for word in range(COLOR_MASK_WORDS):
+                    bits = mask[word]
+                    while bits:
+                        # Index of the lowest set bit.
+                        blocks.append((x, y, (word << 5) + _popcount32((bits & (~bits + 1)) - 1)))
+                        bits &= bits - 1
+        return blocks
+
+
+cdef inline int _tile_index(int x, int y) noexcept nogil:
+    return (x >> TILE_SHIFT) + ((y >> TILE_SHIFT) * TILE_ROW)
+
+
+cdef class _Snapshot:
+    # Copy-on-write handle returned by `VXL.snapshot()`. `tiles` maps a tile
+    # index to its captured state; tiles that were never edited since the
+    # snapshot are still shared with the live map and are not stored.
+    def __cinit__(self):
+        self.tiles = {}
+        self.stamps = {}
+
+    def __len__(self):
+        return len(self.tiles)
+
+
+cdef class _MapStream:
+    # One compression of a map generation shared by every `iter_map_chunks`
+    # reader. `data` grows one source step at a time as the leading reader
+    # needs it, and `marks` records `(compressed_length, percent)` after each
+    # step so that readers joining late report the same progress.
+    def __cinit__(self, object source, unsigned long long generation):
+        self.source = _builtins.memoryview(source)
+        self.compressor = _zlib.compressobj()
+        self.data = bytearray()
+        self.blob = None
+        self.marks = []
+        self.pos = 0
+        self.total = len(self.source)
+        self.generation = generation
+
+    cdef int _advance(self) except -1:
+        # Compresses the next step and returns 0 once the stream is complete.
+        cdef Py_ssize_t step = min(MAP_STREAM_STEP, self.total - self.pos)
+
+        if step > 0:
+            self.data += self.compressor.compress(self.source[self.pos:self.pos + step])
+            self.pos += step
+            self.marks.append((len(self.data), <int>(self.pos * 100 // self.total)))
+            return 1
+        self.data += self.compressor.flush()
+        self.blob = bytes(self.data)
+        self.marks.append((len(self.blob), 100))
+        self.data = None
+        self.source = None
+        self.compressor = None
+        return 0
 
 
 cdef class VXL:
-    cdef public object minimap_texture
-    cdef int _detail_level
-    cdef int _source_size
-    cdef int _source_max_z
-    cdef int _source_offset
-    cdef int _z_shift
-    cdef bint _dirty
-    cdef bint _overview_dirty
-    cdef bytes _raw_data
-    cdef bytes _overview_opaque
-    cdef bytes _overview_transparent
-    cdef dict _colors
-    cdef bytearray _solid_bits
-    cdef list _top_z
-    cdef list _bottom_z
-
     def __cinit__(self):
         self.minimap_texture = None
         self._detail_level = 2
         self._source_size = MAP_SIZE
-        self._source_max_z = EMPTY_TOP_END
+        self._source_max_z = EMPTY_TOP_START
         self._source_offset = 0
         self._z_shift = 0
-        self._dirty = False
         self._overview_dirty = True
         self._raw_data = _BLANK_VXL
-        self._overview_opaque = b""
-        self._overview_transparent = b""
-        self._colors = {}
-        self._solid_bits = bytearray(VOXEL_BITS)
-        self._top_z = [MAP_HEIGHT] * MAP_AREA
-        self._bottom_z = [-1] * MAP_AREA
-
-    def __init__(self, object state, object source, int size_or_detail, int detail_level=2):
+        self._color_mask_buf = _new_buffer(MAP_AREA * COLOR_MASK_WORDS, sizeof(uint32_t))
+        self._color_offset_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+        self._color_capacity_buf = _new_buffer(MAP_AREA, sizeof(uint8_t))
+        self._color_mask = <uint32_t*>PyByteArray_AS_STRING(self._color_mask_buf)
+        self._color_offset = <uint32_t*>PyByteArray_AS_STRING(self._color_offset_buf)
+        self._color_capacity = <uint8_t*>PyByteArray_AS_STRING(self._color_capacity_buf)
+        self._reset_color_arena()
+        self._solid_bits_buf = _new_buffer(VOXEL_BITS, sizeof(uint8_t))
+        self._top_z_buf = _new_buffer(MAP_AREA, sizeof(int16_t))
+        self._bottom_z_buf = _new_buffer(MAP_AREA, sizeof(int16_t))
+        self._solid_bits = <uint8_t*>PyByteArray_AS_STRING(self._solid_bits_buf)
+        self._top_z = <int16_t*>PyByteArray_AS_STRING(self._top_z_buf)
+        self._bottom_z = <int16_t*>PyByteArray_AS_STRING(self._bottom_z_buf)
+        self._reset_columns()
+        self._column_flags_buf = _new_buffer(MAP_AREA, sizeof(uint8_t))
+        self._dirty_columns_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+        self._encoded_offset_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+        self._encoded_length_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+        self._column_flags = <uint8_t*>PyByteArray_AS_STRING(self._column_flags_buf)
+        self._dirty_columns = <uint32_t*>PyByteArray_AS_STRING(self._dirty_columns_buf)
+        self._encoded_offset = <uint32_t*>PyByteArray_AS_STRING(self._encoded_offset_buf)
+        self._encoded_length = <uint32_t*>PyByteArray_AS_STRING(self._encoded_length_buf)
+        self._overview_columns_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+        self._overview_opaque_buf = _new_buffer(MAP_AREA * 4, sizeof(uint8_t))
+        self._overview_transparent_buf = _new_buffer(MAP_AREA * 4, sizeof(uint8_t))
+        self._overview_columns = <uint32_t*>PyByteArray_AS_STRING(self._overview_columns_buf)
+        self._overview_opaque = <uint8_t*>PyByteArray_AS_STRING(self._overview_opaque_buf)
+        self._overview_transparent = <uint8_t*>PyByteArray_AS_STRING(self._overview_transparent_buf)
+        self._overview_opaque_view = _builtins.memoryview(self._overview_opaque_buf).toreadonly()
+        self._overview_transparent_view = _builtins.memoryview(self._overview_transparent_buf).toreadonly()
+        self._overview_count = 0
+        self.edit_generation = 0
+        self._map_cache_generation = 0
+        self._map_blob = None
+        self._map_chunk_cache = {}
+        self._map_stream = None
+        self._check_visited_buf = None
+        self._check_stack_buf = None
+        self._check_nodes_buf = None
+        self._checked_points = bytearray()
+        self._tile_shared_buf = _new_buffer(TILE_COUNT, sizeof(uint8_t))
+        self._tile_edits_buf = _new_buffer(TILE_COUNT, sizeof(uint32_t))
+        self._tile_shared = <uint8_t*>PyByteArray_AS_STRING(self._tile_shared_buf)
+        self._tile_edits = <uint32_t*>PyByteArray_AS_STRING(self._tile_edits_buf)
+        self._tile_versions_buf = _new_buffer(TILE_COUNT, sizeof(uint64_t))
+        self._tile_versions = <uint64_t*>PyByteArray_AS_STRING(self._tile_versions_buf)
+        self._chunks = [None] * TILE_COUNT
+        self._snapshots = []
+        self._journal_voxels_buf = _new_buffer(JOURNAL_MIN, sizeof(uint32_t))
+        self._journal_generations_buf = _new_buffer(JOURNAL_MIN, sizeof(uint64_t))
+        self._journal_voxels = <uint32_t*>PyByteArray_AS_STRING(self._journal_voxels_buf)
+        self._journal_generations = <uint64_t*>PyByteArray_AS_STRING(self._journal_generations_buf)
+        self._journal_alloc = JOURNAL_MIN
+        self._reset_journal()
+        self._reset_encoded()
+
+    def __init__(self, object state, object source, int size_or_detail, int detail_level=2, *, int threads=1):
         cdef object data = b""
         cdef bint loaded = False
+        cdef str cache_path = None
+        cdef unsigned int checksum = 0
 
         self._reset_blank()
 
@@ -294,126 +1289,563 @@ cdef class VXL:
                 self._detail_level = size_or_detail
             else:
                 self._detail_level = detail_level
+            # Path loads copy the file: a mapping would pin it and fault if
+            # the map file is rewritten while loaded.
             with open(source, "rb") as handle:
                 data = handle.read()
+            cache_path = _cache_path(source)
         else:
             self._detail_level = detail_level
-            data = _coerce_raw_bytes(source)
+            data = _coerce_raw_source(source)
             if size_or_detail > 0 and len(data) > size_or_detail:
-                data = data[:size_or_detail]
+                data = _builtins.memoryview(data)[:size_or_detail]
 
         if data:
-            loaded = self._load_source(data)
+            if cache_path is not None:
+                checksum = _zlib.crc32(data)
+                loaded = self._load_cache(cache_path, data, checksum)
+            if not loaded:
+                loaded = self._load_source(data, threads)
+                if loaded and cache_path is not None:
+                    self._write_cache(cache_path, data, checksum)
             if loaded:
                 self._raw_data = data
-                self._dirty = False
             else:
                 self._reset_blank()
 
+    cdef bint _load_cache(self, str path, object data, unsigned int checksum):
+        # Copies a `.vxlc` cache straight into the map buffers. Any mismatch
+        # (version, source length or CRC, section sizes, header fields or
+        # per-column ranges) falls back to parsing.
+        cdef object mapped
+        cdef tuple header
+        cdef Py_buffer view
+        cdef const uint8_t* at
+        cdef Py_ssize_t header_size = _CACHE_HEADER.size
+        cdef Py_ssize_t color_used
+        cdef Py_ssize_t fixed = (
+            VOXEL_BITS
+            + 2 * MAP_AREA * sizeof(int16_t)
+            + MAP_AREA * (COLOR_MASK_WORDS * sizeof(uint32_t) + sizeof(uint32_t) + sizeof(uint8_t))
+            + 2 * MAP_AREA * sizeof(uint32_t)
+        )
+
+        try:
+            with open(path, "rb") as handle:
+                mapped = _mmap.mmap(handle.fileno(), 0, access=_mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            if len(mapped) < header_size:
+                return False
+            header = _CACHE_HEADER.unpack_from(mapped, 0)
+            if (
+                header[0] != _CACHE_MAGIC
+                or header[1] != CACHE_VERSION
+                or header[2] != len(data)
+                or header[3] != checksum
+            ):
+                return False
+            color_used = header[8]
+            if len(mapped) != header_size + fixed + color_used * sizeof(uint32_t):
+                return False
+            if (
+                not 0 < header[4] <= MAP_SIZE
+                or not 0 <= header[5] <= MAP_HEIGHT
+                or header[6] != (MAP_SIZE - header[4]) // 2
+                or header[7] != max(0, EMPTY_TOP_END - header[5])
+            ):
+                return False
+
+            self._clear_dirty_columns()
+            self._advance_all_tiles()
+            self._overview_dirty = True
+            self._source_size = header[4]
+            self._source_max_z = header[5]
+            self._source_offset = header[6]
+            self._z_shift = header[7]
+            self._resize_color_arena(max(COLOR_ARENA_MIN, color_used))
+            self._color_used = color_used
+            self._color_waste = 0
+
+            PyObject_GetBuffer(mapped, &view, PyBUF_SIMPLE)
+            try:
+                at = <const uint8_t*>view.buf + header_size
+                memcpy(self._solid_bits, at, VOXEL_BITS)
+                at += VOXEL_BITS
+                memcpy(self._top_z, at, MAP_AREA * sizeof(int16_t))
+                at += MAP_AREA * sizeof(int16_t)
+                memcpy(self._bottom_z, at, MAP_AREA * sizeof(int16_t))
+                at += MAP_AREA * sizeof(int16_t)
+                memcpy(self._color_mask, at, MAP_AREA * COLOR_MASK_WORDS * sizeof(uint32_t))
+                at += MAP_AREA * COLOR_MASK_WORDS * sizeof(uint32_t)
+                memcpy(self._color_offset, at, MAP_AREA * sizeof(uint32_t))
+                at += MAP_AREA * sizeof(uint32_t)
+                memcpy(self._color_capacity, at, MAP_AREA * sizeof(uint8_t))
+                at += MAP_AREA * sizeof(uint8_t)
+                memcpy(self._encoded_offset, at, MAP_AREA * sizeof(uint32_t))
+                at += MAP_AREA * sizeof(uint32_t)
+                memcpy(self._encoded_length, at, MAP_AREA * sizeof(uint32_t))
+                at += MAP_AREA * sizeof(uint32_t)
+                memcpy(self._color_data, at, color_used * sizeof(uint32_t))
+            finally:
+                PyBuffer_Release(&view)
+            # A cache of the right size can still be corrupt; the caller
+            # re-parses the source, which resets every buffer copied above.
+            return self._cache_columns_valid(color_used, len(data))
+        finally:
+            mapped.close()
+
+    cdef bint _cache_columns_valid(self, Py_ssize_t color_used, Py_ssize_t source_length) noexcept:
+        # Checks that every cached column stays inside the source serialization
+        # and that the color arena has the compacted layout the cache is written
+        # with: columns packed back to back in index order, each holding exactly
+        # its colors. Overlapping or oversized slots would later let compaction
+        # copy more colors than it allocates.
+        cdef uint64_t used = 0
+        cdef int col
+
+        for col in range(MAP_AREA):
+            if not 0 <= self._top_z[col] <= MAP_HEIGHT or not -1 <= self._bottom_z[col] < MAP_HEIGHT:
+                return False
+            if self._color_offset[col] != used or self._color_capacity[col] != self._color_count(col):
+                return False
+            used += self._color_capacity[col]
+            if <uint64_t>self._encoded_offset[col] + self._encoded_length[col] > <uint64_t>source_length:
+                return False
+        return used == <uint64_t>color_used
+
+    cdef void _write_cache(self, str path, object data, unsigned int checksum):
+        # Best effort: a read-only map directory just means no cache. The file
+        # is written under a temporary name and renamed into place, so a
+        # concurrent reader never sees a partial cache.
+        cdef str temp_path = "%s.%d.tmp" % (path, _os.getpid())
+
+        try:
+            with open(temp_path, "wb") as handle:
+                handle.write(
+                    _CACHE_HEADER.pack(
+                        _CACHE_MAGIC,
+                        CACHE_VERSION,
+                        len(data),
+                        checksum,
+                        self._source_size,
+                        self._source_max_z,
+                        self._source_offset,
+                        self._z_shift,
+                        self._color_used,
+                    )
+                )
+                handle.write(self._solid_bits_buf)
+                handle.write(self._top_z_buf)
+                handle.write(self._bottom_z_buf)
+                handle.write(self._color_mask_buf)
+                handle.write(self._color_offset_buf)
+                handle.write(self._color_capacity_buf)
+                handle.write(self._encoded_offset_buf)
+                handle.write(self._encoded_length_buf)
+                handle.write(_builtins.memoryview(self._color_data_buf)[:self._color_used * sizeof(uint32_t)])
+            _os.replace(temp_path, path)
+        except OSError:
+            try:
+                _os.remove(temp_path)
+            except OSError:
+                pass
+
     cdef void _reset_blank(self):
-        self._colors = {}
-        self._solid_bits = bytearray(VOXEL_BITS)
-        self._top_z = [MAP_HEIGHT] * MAP_AREA
-        self._bottom_z = [-1] * MAP_AREA
+        self._reset_colors()
+        self._reset_columns()
         self._source_size = MAP_SIZE
-        self._source_max_z = EMPTY_TOP_END
+        self._source_max_z = EMPTY_TOP_START
         self._source_offset = 0
         self._z_shift = 0
         self._raw_data = _BLANK_VXL
-        self._dirty = False
+        self._map_stream = None
+        self._checked_points = bytearray()
+        self._drop_snapshots()
+        self._reset_journal()
+        self._reset_encoded()
         self._overview_dirty = True
-        self._overview_opaque = b""
-        self._overview_transparent = b""
 
-    cdef inline bint _in_bounds(self, int x, int y, int z):
+    cdef void _reset_columns(self):
+        cdef int col
+
+        memset(self._solid_bits, 0, VOXEL_BITS)
+        for col in range(MAP_AREA):
+            self._top_z[col] = MAP_HEIGHT
+            self._bottom_z[col] = -1
+
+    cdef void _reset_encoded(self):
+        # Points every column at its segment of the blank serialization.
+        cdef int col
+
+        for col in range(MAP_AREA):
+            self._encoded_offset[col] = col * 4
+            self._encoded_length[col] = 4
+        self._clear_dirty_columns()
+        self._advance_all_tiles()
+
+    cdef void _advance_all_tiles(self):
+        # A load or reset replaces every chunk at once.
+        cdef int tile
+
+        self.edit_generation += 1
+        for tile in range(TILE_COUNT):
+            self._tile_versions[tile] = self.edit_generation
+
+    cdef void _clear_dirty_columns(self):
+        # Drops every per-column queue; callers also force a full overview.
+        memset(self._column_flags, 0, MAP_AREA * sizeof(uint8_t))
+        self._dirty_count = 0
+        self._overview_count = 0
+        self._hash_count = 0
+        self._checksum_valid = False
+
+    cdef void _touch_column(self, int x, int y):
+        # Every edit funnels through here: the edit generation advances and
+        # stamps the column's chunk, and the column is queued once for the
+        # overview and for re-encoding by `generate_vxl`.
+        cdef int col = _column_index(x, y)
+        cdef int tile = _tile_index(x, y)
+        cdef int low = self._source_offset
+        cdef int high = self._source_offset + self._source_size
+
+        self.edit_generation += 1
+        self._tile_edits[tile] += 1
+        self._tile_versions[tile] = self.edit_generation
+        if not self._column_flags[col] & COLUMN_OVERVIEW:
+            self._column_flags[col] |= COLUMN_OVERVIEW
+            self._overview_columns[self._overview_count] = col
+            self._overview_count += 1
+        if self._checksum_valid and not self._column_flags[col] & COLUMN_HASH:
+            self._column_flags[col] |= COLUMN_HASH
+            self._hash_columns[self._hash_count] = col
+            self._hash_count += 1
+        if x < low or x >= high or y < low or y >= high:
+            return
+        if self._column_flags[col] & COLUMN_DIRTY:
+            return
+        self._column_flags[col] |= COLUMN_DIRTY
+        self._dirty_columns[self._dirty_count] = col
+        self._dirty_count += 1
+
+    @property
+    def _solid_view(self):
+        return _builtins.memoryview(self._solid_bits_buf).toreadonly()
+
+    @property
+    def _top_z_view(self):
+        return _builtins.memoryview(self._top_z_buf).cast("h").toreadonly()
+
+    @property
+    def _bottom_z_view(self):
+        return _builtins.memoryview(self._bottom_z_buf).cast("h").toreadonly()
+
+    cdef void _fill_target(self, _MapTarget* target):
+        target.solid_bits = self._solid_bits
+        target.top_z = self._top_z
+        target.bottom_z = self._bottom_z
+        target.color_mask = self._color_mask
+        target.color_offset = self._color_offset
+        target.color_capacity = self._color_capacity
+        target.color_data = self._color_data
+
+    cdef void _reset_color_arena(self):
+        self._color_data_buf = _new_buffer(COLOR_ARENA_MIN, sizeof(uint32_t))
+        self._color_data = <uint32_t*>PyByteArray_AS_STRING(self._color_data_buf)
+        self._color_used = 0
+        self._color_alloc = COLOR_ARENA_MIN
+        self._color_waste = 0
+
+    cdef void _reset_colors(self):
+        memset(self._color_mask, 0, MAP_AREA * COLOR_MASK_WORDS * sizeof(uint32_t))
+        memset(self._color_offset, 0, MAP_AREA * sizeof(uint32_t))
+        memset(self._color_capacity, 0, MAP_AREA * sizeof(uint8_t))
+        self._reset_color_arena()
+
+    cdef inline bint _has_color(self, int col, int z) noexcept:
+        return (self._color_mask[col * COLOR_MASK_WORDS + (z >> 5)] >> (z & 31)) & 1
+
+    cdef inline int _color_rank(self, int col, int z) noexcept:
+        cdef uint32_t* mask = self._color_mask + col * COLOR_MASK_WORDS
+        cdef int word = z >> 5
+        cdef int rank = 0
+        cdef int i
+
+        for i in range(word):
+            rank += _popcount32(mask[i])
+        return rank + _popcount32(mask[word] & ((1u << (z & 31)) - 1))
+
+    cdef inline int _color_count(self, int col) noexcept:
+        cdef uint32_t* mask = self._color_mask + col * COLOR_MASK_WORDS
+        cdef int count = 0
+        cdef int i
+
+        for i in range(COLOR_MASK_WORDS):
+            count += _popcount32(mask[i])
+        return count
+
+    cdef inline unsigned int _color_at(self, int col, int z) noexcept:
+        if not self._has_color(col, z):
+            return 0
+        return self._color_data[self._color_offset[col] + self._color_rank(col, z)]
+
+    cdef void _grow_color_arena(self, Py_ssize_t needed):
+        cdef Py_ssize_t alloc = self._color_alloc
+
+        while alloc < needed:
+            alloc += alloc >> 1
+        self._resize_color_arena(alloc)
+
+    cdef void _resize_color_arena(self, Py_ssize_t alloc):
+        cdef bytearray buffer = _new_buffer(alloc, sizeof(uint32_t))
+
+        memcpy(PyByteArray_AS_STRING(buffer), self._color_data, self._color_used * sizeof(uint32_t))
+        self._color_data_buf = buffer
+        self._color_data = <uint32_t*>PyByteArray_AS_STRING(buffer)
+        self._color_alloc = alloc
+
+    cdef void _compact_colors(self):
+        # The new arena is sized from the stored colors themselves rather than
+        # from the `used - waste` bookkeeping.
+        cdef Py_ssize_t alloc
+        cdef bytearray buffer
+        cdef uint32_t* data
+        cdef Py_ssize_t used = 0
+        cdef int col
+        cdef int count
+
+        for col in range(MAP_AREA):
+            used += self._color_count(col)
+        alloc = max(COLOR_ARENA_MIN, used)
+        buffer = _new_buffer(alloc, sizeof(uint32_t))
+        data = <uint32_t*>PyByteArray_AS_STRING(buffer)
+        used = 0
+        for col in range(MAP_AREA):
+            count = self._color_count(col)
+            if count:
+                memcpy(data + used, self._color_data + self._color_offset[col], count * sizeof(uint32_t))
+            self._color_offset[col] = used
+            self._color_capacity[col] = count
+            used += count
+
+        self._color_data_buf = buffer
+        self._color_data = data
+        self._color_alloc = alloc
+        self._color_used = used
+        self._color_waste = 0
+
+    cdef void _reserve_column_colors(self, int col, int count):
+        cdef int capacity = self._color_capacity[col]
+        cdef Py_ssize_t offset = self._color_offset[col]
+        cdef int new_capacity
+
+        if count <= capacity:
+            return
+
+        if capacity and offset + capacity == self._color_used:
+            # The column already sits at the arena tail, so it can grow in place.
+            new_capacity = min(MAP_HEIGHT, max(count, capacity * 2))
+            if offset + new_capacity > self._color_alloc:
+                self._grow_color_arena(offset + new_capacity)
+            self._color_capacity[col] = new_capacity
+            self._color_used = offset + new_capacity
+            return
+
+        new_capacity = min(MAP_HEIGHT, max(count, COLOR_COLUMN_MIN, capacity * 2))
+        if self._color_used + new_capacity > self._color_alloc:
+            if self._color_waste > (self._color_used >> 1):
+                self._compact_colors()
+                self._reserve_column_colors(col, count)
+                return
+            self._grow_color_arena(self._color_used + new_capacity)
+
+        if capacity:
+            memcpy(
+                self._color_data + self._color_used,
+                self._color_data + offset,
+                self._color_count(col) * sizeof(uint32_t),
+            )
+        self._color_offset[col] = self._color_used
+        self._color_capacity[col] = new_capacity
+        self._color_used += new_capacity
+        self._color_waste += capacity
+
+    cdef void _put_color(self, int col, int z, unsigned int color):
+        cdef int rank
+        cdef int count
+        cdef uint32_t* column
+
+        if not color:
+            self._drop_color(col, z)
+            return
+
+        rank = self._color_rank(col, z)
+        if self._has_color(col, z):
+            self._color_data[self._color_offset[col] + rank] = color
+            return
+
+        count = self._color_count(col)
+        self._reserve_column_colors(col, count + 1)
+        column = self._color_data + self._color_offset[col]
+        if rank < count:
+            memmove(column + rank + 1, column + rank, (count - rank) * sizeof(uint32_t))
+        column[rank] = color
+        self._color_mask[col * COLOR_MASK_WORDS + (z >> 5)] |= 1u << (z & 31)
+
+    cdef void _drop_color(self, int col, int z):
+        cdef int rank
+        cdef int count
+        cdef uint32_t* column
+
+        if not self._has_color(col, z):
+            return
+
+        rank = self._color_rank(col, z)
+        count = self._color_count(col)
+        column = self._color_data + self._color_offset[col]
+        if rank < count - 1:
+            memmove(column + rank, column + rank + 1, (count - rank - 1) * sizeof(uint32_t))
+        self._color_mask[col * COLOR_MASK_WORDS + (z >> 5)] &= ~(1u << (z & 31))
+
+    cdef inline bint _in_bounds(self, int x, int y, int z) noexcept:
         return 0 <= x < MAP_SIZE and 0 <= y < MAP_SIZE and 0 <= z < MAP_HEIGHT
 
-    cdef inline bint _solid_at(self, int x, int y, int z):
-        cdef int index
-        cdef int byte_index
-        cdef int shift
-        if not self._in_bounds(x, y, z):
-            return False
-        index = _voxel_index(x, y, z)
-        byte_index = index >> 3
-        shift = index & 7
-        return ((self._solid_bits[byte_index] >> shift) & 1) != 0
-
-    cdef inline void _set_solid(self, int x, int y, int z, bint value):
-        cdef int index
-        cdef int byte_index
-        cdef int shift
-        cdef int mask
-        cdef int current
+    cdef inline bint _solid_at(self, int x, int y, int z) noexcept:
+        return solid_at(self._solid_bits, x, y, z)
+
+    cdef inline void _set_solid(self, int x, int y, int z, bint value) noexcept:
+        cdef uint8_t* column
 
         if not self._in_bounds(x, y, z):
             return
 
-        index = _voxel_index(x, y, z)
-        byte_index = index >> 3
-        shift = index & 7
-        mask = 1 << shift
-        current = self._solid_bits[byte_index]
+        column = _column_bits(self._solid_bits, _column_index(x, y))
         if value:
-            self._solid_bits[byte_index] = current | mask
+            column[z >> 3] |= <uint8_t>(1 << (z & 7))
         else:
-            self._solid_bits[byte_index] = current & (~mask & 0xFF)
+            column[z >> 3] &= <uint8_t>~(1 << (z & 7))
 
-    cdef inline void _update_column_bounds(self, int x, int y, int z):
+    cdef inline void _update_column_bounds(self, int x, int y, int z) noexcept:
         cdef int col = _column_index(x, y)
         if z < self._top_z[col]:
             self._top_z[col] = z
         if z > self._bottom_z[col]:
             self._bottom_z[col] = z
 
-    cdef void _recompute_column_bounds(self, int x, int y):
+    cdef void _recompute_column_bounds(self, int x, int y) noexcept:
         cdef int col = _column_index(x, y)
-        cdef int z
+        cdef const uint8_t* column = _column_bits(self._solid_bits, col)
 
-        self._top_z[col] = MAP_HEIGHT
-        self._bottom_z[col] = -1
-        for z in range(MAP_HEIGHT):
-            if self._solid_at(x, y, z):
-                self._top_z[col] = z
-                break
-        if self._top_z[col] == MAP_HEIGHT:
-            return
-        for z in range(MAP_HEIGHT - 1, -1, -1):
-            if self._solid_at(x, y, z):
-                self._bottom_z[col] = z
-                break
+        self._top_z[col] = _next_solid(column, 0)
+        self._bottom_z[col] = _prev_solid(column, MAP_HEIGHT - 1)
+
+    cdef void _shrink_column_bounds(self, int col, int z) noexcept:
+        # Called after voxel `z` was cleared: the bounds only move when it was
+        # the top or bottom voxel, and then only up to the next solid voxel.
+        cdef const uint8_t* column = _column_bits(self._solid_bits, col)
+
+        if z == self._top_z[col]:
+            self._top_z[col] = _next_solid(column, z + 1)
+            if self._top_z[col] >= MAP_HEIGHT:
+                self._bottom_z[col] = -1
+                return
+        if z == self._bottom_z[col]:
+            self._bottom_z[col] = _prev_solid(column, z - 1)
 
     cdef inline void _store_block(self, int x, int y, int z, unsigned int color):
         if not self._in_bounds(x, y, z):
             return
+        self._preserve_column(x, y)
         self._set_solid(x, y, z, True)
         self._update_column_bounds(x, y, z)
         if color:
-            self._colors[_voxel_index(x, y, z)] = color
+            self._put_color(_column_index(x, y), z, color)
+
+    cdef bint _load_source(self, object source, int threads=1):
+        cdef Py_buffer view
+        cdef bint loaded
+
+        PyObject_GetBuffer(source, &view, PyBUF_SIMPLE)
+        try:
+            loaded = self._load_buffer(<const unsigned char*>view.buf, view.len, threads)
+        finally:
+            PyBuffer_Release(&view)
+        return loaded
+
+    cdef bint _load_bands(self, const unsigned char* data, Py_ssize_t limit, int edge, int threads, Py_ssize_t* color_used):
+        # Pre-scans the band start offsets, decodes the bands on a thread pool
+        # and then packs the per-band color runs in source order, so the result
+        # matches the serial loader byte for byte.
+        cdef _BandDecoder decoder = _BandDecoder()
+        cdef int band_rows = max(LOAD_BAND_ROWS, (edge + threads - 1) // threads)
+        cdef int bands = (edge + band_rows - 1) // band_rows
+        cdef Py_ssize_t* starts
+        cdef Py_ssize_t* color_ends
+        cdef Py_ssize_t pos = 0
+        cdef Py_ssize_t color_pos = 0
+        cdef Py_ssize_t band_colors
+        cdef uint32_t shift
+        cdef int column_count = edge * edge
+        cdef int column = 0
+        cdef int band = 0
+        cdef int col
+        cdef int src_x
+        cdef int src_y
+        cdef list results
+
+        decoder.starts = _new_buffer(bands + 1, sizeof(Py_ssize_t))
+        decoder.color_ends = _new_buffer(bands, sizeof(Py_ssize_t))
+        starts = <Py_ssize_t*>PyByteArray_AS_STRING(decoder.starts)
+        color_ends = <Py_ssize_t*>PyByteArray_AS_STRING(decoder.color_ends)
+        with nogil:
+            while column < column_count and pos >= 0:
+                if column == band * band_rows * edge:
+                    starts[band] = pos
+                    band += 1
+                pos = _skip_column(data, pos, limit)
+                column += 1
+        if pos != limit:
+            return False
+        starts[bands] = limit
+
+        decoder.data = data
+        decoder.edge = edge
+        decoder.band_rows = band_rows
+        decoder.offset = self._source_offset
+        decoder.z_shift = self._z_shift
+        decoder.encoded_offset = self._encoded_offset
+        decoder.encoded_length = self._encoded_length
+        self._fill_target(&decoder.target)
+        with _ThreadPoolExecutor(min(threads, bands)) as pool:
+            results = list(pool.map(decoder.decode, range(bands)))
+        if not all(results):
+            return False
 
-    cdef bint _load_source(self, bytes data):
-        cdef tuple size_info = _get_vxl_size(data)
+        for band in range(bands):
+            band_colors = color_ends[band] - starts[band] // 4
+            shift = <uint32_t>(starts[band] // 4 - color_pos)
+            if shift:
+                memmove(self._color_data + color_pos, self._color_data + starts[band] // 4, band_colors * sizeof(uint32_t))
+                for src_y in range(band * band_rows, min(edge, (band + 1) * band_rows)):
+                    for src_x in range(edge):
+                        col = _column_index(src_x + self._source_offset, src_y + self._source_offset)
+                        self._color_offset[col] -= shift
+            color_pos += band_colors
+        color_used[0] = color_pos
+        return True
+
+    cdef bint _load_buffer(self, const unsigned char* data, Py_ssize_t limit, int threads=1):
+        cdef tuple size_info = _get_vxl_size(data, limit)
         cdef int columns = int(size_info[0])
         cdef int max_z = int(size_info[1])
         cdef int edge
         cdef int offset
         cdef int z_shift
         cdef Py_ssize_t pos = 0
-        cdef Py_ssize_t limit = len(data)
-        cdef int src_x
-        cdef int src_y
-        cdef int x
-        cdef int y
-        cdef int span_words
-        cdef int top_start
-        cdef int top_end
-        cdef int top_len
-        cdef int bottom_len
-        cdef int next_air_start
-        cdef int bottom_start
-        cdef int z
-        cdef int i
-        cdef unsigned int color
+        cdef Py_ssize_t color_pos = 0
+        cdef _MapTarget target
 
         if columns <= 0:
             return False
@@ -422,13 +1854,11 @@ cdef class VXL:
         if edge * edge != columns or edge > MAP_SIZE or max_z >= 241:
             return False
 
-        self._colors = {}
-        self._solid_bits = bytearray(VOXEL_BITS)
-        self._top_z = [MAP_HEIGHT] * MAP_AREA
-        self._bottom_z = [-1] * MAP_AREA
+        self._reset_colors()
+        self._reset_columns()
+        self._clear_dirty_columns()
+        self._advance_all_tiles()
         self._overview_dirty = True
-        self._overview_opaque = b""
-        self._overview_transparent = b""
 
         offset = (MAP_SIZE - edge) // 2
         if max_z > EMPTY_TOP_END:
@@ -441,231 +1871,150 @@ cdef class VXL:
         self._source_offset = offset
         self._z_shift = z_shift
 
-        for src_y in range(edge):
-            y = src_y + offset
-            for src_x in range(edge):
-                x = src_x + offset
-                while True:
-                    if pos + 4 > limit:
-                        return False
-
-                    span_words = data[pos]
-                    top_start = data[pos + 1]
-                    top_end = data[pos + 2]
-                    pos += 4
-
-                    if top_end >= top_start:
-                        top_len = top_end - top_start + 1
-                        if pos + (top_len * 4) > limit:
-                            return False
-                        for i in range(top_len):
-                            color = _read_u32_le(data, pos + (i * 4))
-                            self._store_block(x, y, top_start + z_shift + i, color)
-                        pos += top_len * 4
-                    else:
-                        top_len = 0
-
-                    if span_words == 0:
-                        break
-
-                    bottom_len = span_words - top_len - 1
-                    if bottom_len < 0:
-                        return False
-                    if pos + (bottom_len * 4) + 4 > limit:
-                        return False
-
-                    next_air_start = data[pos + (bottom_len * 4) + 3]
-                    bottom_start = next_air_start - bottom_len
-                    if bottom_start < top_end + 1:
-                        return False
-
-                    for z in range(top_end + 1, bottom_start):
-                        self._store_block(x, y, z + z_shift, 0)
-
-                    for i in range(bottom_len):
-                        color = _read_u32_le(data, pos + (i * 4))
-                        self._store_block(x, y, bottom_start + z_shift + i, color)
-                    pos += bottom_len * 4
+        # Every stored color comes from one 4-byte word of the source, so the
+        # source size bounds the arena and columns can be appended in order.
+        self._resize_color_arena(max(COLOR_ARENA_MIN, limit // 4))
+        self._fill_target(&target)
 
-        if pos != limit:
-            return False
+        if threads <= 0:
+            threads = _os.cpu_count() or 1
+        if threads > 1 and edge > LOAD_BAND_ROWS:
+            if not self._load_bands(data, limit, edge, threads, &color_pos):
+                return False
+        else:
+            with nogil:
+                pos = _decode_rows(
+                    data,
+                    0,
+                    limit,
+                    0,
+                    edge,
+                    edge,
+                    offset,
+                    z_shift,
+                    &target,
+                    self._encoded_offset,
+                    self._encoded_length,
+                    &color_pos,
+                )
+            if pos != limit:
+                return False
+
+        self._color_used = color_pos
+        if self._color_alloc - color_pos > COLOR_ARENA_MIN:
+            self._resize_color_arena(max(COLOR_ARENA_MIN, color_pos))
         return True
 
+    cdef inline void _overview_pixel(self, int col) noexcept:
+        cdef uint8_t* opaque_out = self._overview_opaque + (col << 2)
+        cdef uint8_t* transparent_out = self._overview_transparent + (col << 2)
+        cdef int top_z = self._top_z[col]
+        cdef int alpha_byte
+        cdef unsigned int color = 0
+
+        if top_z < MAP_HEIGHT:
+            color = self._color_at(col, top_z)
+        opaque_out[0] = transparent_out[0] = (color >> 16) & 0xFF
+        opaque_out[1] = transparent_out[1] = (color >> 8) & 0xFF
+        opaque_out[2] = transparent_out[2] = color & 0xFF
+        opaque_out[3] = 255
+        alpha_byte = (color >> 24) & 0xFF
+        if alpha_byte >= 128:
+            transparent_out[3] = 255
+        elif alpha_byte:
+            transparent_out[3] = alpha_byte * 2 - 1
+        else:
+            transparent_out[3] = 0
+
     cdef void _ensure_overview(self):
-        cdef bytearray opaque
-        cdef bytearray transparent
+        # Patches the pixels of queued columns in place; loads, resets and
+        # ground color refreshes repaint the whole map.
+        cdef Py_ssize_t i
         cdef int col
-        cdef int out_pos
-        cdef int top_z
-        cdef int x
-        cdef int y
-        cdef int alpha
-        cdef unsigned int color
-        cdef tuple color_tuple
 
-        if not self._overview_dirty and self._overview_opaque and self._overview_transparent:
-            return
-
-        opaque = bytearray(MAP_AREA * 4)
-        transparent = bytearray(MAP_AREA * 4)
-
-        for col in range(MAP_AREA):
-            out_pos = col << 2
-            top_z = self._top_z[col]
-            if top_z >= MAP_HEIGHT:
-                opaque[out_pos + 3] = 255
-                continue
-
-            x = col & 511
-            y = col >> 9
-            color = self._colors.get(_voxel_index(x, y, top_z), 0)
-            color_tuple = _color_tuple(color)
-            opaque[out_pos] = color_tuple[0]
-            opaque[out_pos + 1] = color_tuple[1]
-            opaque[out_pos + 2] = color_tuple[2]
-            opaque[out_pos + 3] = 255
-
-            transparent[out_pos] = color_tuple[0]
-            transparent[out_pos + 1] = color_tuple[1]
-            transparent[out_pos + 2] = color_tuple[2]
-            alpha = color_tuple[3]
-            if alpha < 0:
-                alpha = 0
-            elif alpha > 255:
-                alpha = 255
-            transparent[out_pos + 3] = alpha
-
-        self._overview_opaque = bytes(opaque)
-        self._overview_transparent = bytes(transparent)
+        if self._overview_dirty:
+            for col in range(MAP_AREA):
+                self._overview_pixel(col)
+        else:
+            for i in range(self._overview_count):
+                self._overview_pixel(self._overview_columns[i])
+        for i in range(self._overview_count):
+            self._column_flags[self._overview_columns[i]] &= ~COLUMN_OVERVIEW
+        self._overview_count = 0
         self._overview_dirty = False
 
-    cdef tuple _column_runs(self, int map_x, int map_y):
-        cdef list runs = []
-        cdef int col = _column_index(map_x, map_y)
-        cdef int top_z = self._top_z[col]
-        cdef int bottom_z = self._bottom_z[col]
-        cdef int source_z
-        cdef int run_start = -1
-
-        if top_z >= MAP_HEIGHT or bottom_z < top_z:
-            return ()
-
-        top_z -= self._z_shift
-        bottom_z -= self._z_shift
-
-        if top_z < 0:
-            top_z = 0
-        if bottom_z > EMPTY_TOP_END:
-            bottom_z = EMPTY_TOP_END
-        if bottom_z < top_z:
-            return ()
-
-        for source_z in range(top_z, bottom_z + 1):
-            if self._solid_at(map_x, map_y, source_z + self._z_shift):
-                if run_start < 0:
-                    run_start = source_z
-            elif run_start >= 0:
-                runs.append((run_start, source_z - 1))
-                run_start = -1
-
-        if run_start >= 0:
-            runs.append((run_start, bottom_z))
-        return tuple(runs)
-
-    cdef unsigned int _surface_color(self, int map_x, int map_y, int source_z):
-        return self._colors.get(_voxel_index(map_x, map_y, source_z + self._z_shift), 0)
-
     cdef bytes _serialize_dirty(self):
-        cdef bytearray out = bytearray()
-        cdef int src_x
-        cdef int src_y
-        cdef int map_x
-        cdef int map_y
-        cdef tuple runs
-        cdef int run_index
-        cdef int run_count
-        cdef tuple run
-        cdef int run_start
-        cdef int run_end
-        cdef int top_end
-        cdef int bottom_start
-        cdef int z
-        cdef int prev_air_start
-        cdef int span_words
-        cdef list top_colors
-        cdef list bottom_colors
-        cdef unsigned int color
-
-        for src_y in range(self._source_size):
-            map_y = self._source_offset + src_y
-            for src_x in range(self._source_size):
-                map_x = self._source_offset + src_x
-                runs = self._column_runs(map_x, map_y)
-                if not runs:
-                    out.extend((0, EMPTY_TOP_START, EMPTY_TOP_END, 0))
-                    continue
-
-                prev_air_start = 0
-                run_count = len(runs)
-                for run_index in range(run_count):
-                    run = runs[run_index]
-                    run_start = int(run[0])
-                    run_end = int(run[1])
-
-                    if run_index == run_count - 1:
-                        out.extend((0, run_start, run_end, prev_air_start))
-                        for z in range(run_start, run_end + 1):
-                            color = self._surface_color(map_x, map_y, z)
-                            out.extend((
-                                color & 0xFF,
-                                (color >> 8) & 0xFF,
-                                (color >> 16) & 0xFF,
-                                (color >> 24) & 0xFF,
-                            ))
-                        continue
-
-                    top_end = run_start
-                    while top_end < run_end:
-                        if _voxel_index(map_x, map_y, top_end + 1 + self._z_shift) not in self._colors:
-                            break
-                        top_end += 1
-
-                    bottom_start = run_end
-                    while bottom_start > top_end + 1:
-                        if _voxel_index(map_x, map_y, bottom_start - 1 + self._z_shift) not in self._colors:
-                            break
-                        bottom_start -= 1
-
-                    top_colors = []
-                    for z in range(run_start, top_end + 1):
-                        top_colors.append(self._surface_color(map_x, map_y, z))
-
-                    bottom_colors = []
-                    for z in range(bottom_start, run_end + 1):
-                        bottom_colors.append(self._surface_color(map_x, map_y, z))
-
-                    span_words = 1 + len(top_colors) + len(bottom_colors)
-                    out.extend((span_words, run_start, top_end, prev_air_start))
-
-                    for color in top_colors:
-                        out.extend((
-                            color & 0xFF,
-                            (color >> 8) & 0xFF,
-                            (color >> 16) & 0xFF,
-                            (color >> 24) & 0xFF,
-                        ))
-
-                    for color in bottom_colors:
-                        out.extend((
-                            color & 0xFF,
-                            (color >> 8) & 0xFF,
-                            (color >> 16) & 0xFF,
-                            (color >> 24) & 0xFF,
-                        ))
-
-                    prev_air_start = run_end + 1
-
-        return bytes(out)
+        # Re-encodes only the queued columns and splices them between the
+        # untouched segments of the previous serialization.
+        cdef Py_ssize_t count = self._dirty_count
+        cdef bytearray encoded = bytearray()
+        cdef bytearray staged = _new_buffer(count * 2, sizeof(uint32_t))
+        cdef uint32_t* staged_at = <uint32_t*>PyByteArray_AS_STRING(staged)
+        cdef uint8_t* encoded_at
+        cdef Py_ssize_t encoded_used = 0
+        cdef Py_ssize_t total
+        cdef Py_ssize_t src_pos = 0
+        cdef Py_ssize_t dst_pos = 0
+        cdef Py_ssize_t delta = 0
+        cdef Py_ssize_t i
+        cdef uint32_t col
+        cdef uint32_t next_col
+        cdef uint32_t other
+        cdef uint32_t old_offset
+        cdef uint32_t old_length
+        cdef bytes out
+        cdef char* dst
+        cdef const char* src
+        cdef Py_buffer view
+        cdef _MapTarget target
+
+        qsort(self._dirty_columns, count, sizeof(uint32_t), _compare_columns)
+        self._fill_target(&target)
+
+        PyObject_GetBuffer(self._raw_data, &view, PyBUF_SIMPLE)
+        try:
+            total = view.len
+            for i in range(count):
+                if PyByteArray_GET_SIZE(encoded) < encoded_used + ENCODED_COLUMN_MAX:
+                    PyByteArray_Resize(encoded, max(ENCODED_COLUMN_MAX, (encoded_used + ENCODED_COLUMN_MAX) * 2))
+                encoded_at = <uint8_t*>PyByteArray_AS_STRING(encoded)
+                col = self._dirty_columns[i]
+                staged_at[i * 2] = <uint32_t>encoded_used
+                staged_at[i * 2 + 1] = <uint32_t>_encode_column(&target, col, self._z_shift, self._source_max_z, encoded_at + encoded_used)
+                encoded_used += staged_at[i * 2 + 1]
+                total += <Py_ssize_t>staged_at[i * 2 + 1] - <Py_ssize_t>self._encoded_length[col]
+
+            out = PyBytes_FromStringAndSize(NULL, total)
+            dst = PyBytes_AS_STRING(out)
+            src = <const char*>view.buf
+            encoded_at = <uint8_t*>PyByteArray_AS_STRING(encoded)
+
+            with nogil:
+                for i in range(count):
+                    col = self._dirty_columns[i]
+                    old_offset = self._encoded_offset[col]
+                    old_length = self._encoded_length[col]
+                    memcpy(dst + dst_pos, src + src_pos, old_offset - src_pos)
+                    dst_pos += old_offset - src_pos
+                    memcpy(dst + dst_pos, encoded_at + staged_at[i * 2], staged_at[i * 2 + 1])
+                    self._encoded_offset[col] = <uint32_t>dst_pos
+                    self._encoded_length[col] = staged_at[i * 2 + 1]
+                    self._column_flags[col] &= ~COLUMN_DIRTY
+                    dst_pos += staged_at[i * 2 + 1]
+                    src_pos = old_offset + old_length
+                    delta += <Py_ssize_t>staged_at[i * 2 + 1] - <Py_ssize_t>old_length
+
+                    # Segments up to the next rewritten column only move.
+                    next_col = self._dirty_columns[i + 1] if i + 1 < count else MAP_AREA
+                    if delta:
+                        for other in range(col + 1, next_col):
+                            self._encoded_offset[other] = <uint32_t>(self._encoded_offset[other] + delta)
+                memcpy(dst + dst_pos, src + src_pos, view.len - src_pos)
+        finally:
+            PyBuffer_Release(&view)
+
+        self._dirty_count = 0
+        return out
 
     cpdef object add_point(self, object x, object y, object z, tuple color_tuple):
         return self.set_point(x, y, z, color_tuple)
@@ -684,33 +2033,580 @@ cdef class VXL:
             packed = <unsigned int>int(color)
 
         self._store_block(xi, yi, zi, packed)
-        if not packed and _voxel_index(xi, yi, zi) in self._colors:
-            del self._colors[_voxel_index(xi, yi, zi)]
-        self._dirty = True
-        self._overview_dirty = True
+        if not packed:
+            self._drop_color(_column_index(xi, yi), zi)
+        self._touch_column(xi, yi)
+        self._journal_append(xi, yi, zi)
         return None
 
     cpdef object remove_point(self, object x, object y, object z):
         cdef int xi = int(x)
         cdef int yi = int(y)
         cdef int zi = int(z)
-        cdef int key
 
         if not self._in_bounds(xi, yi, zi):
             return None
 
-        key = _voxel_index(xi, yi, zi)
+        self._preserve_column(xi, yi)
         self._set_solid(xi, yi, zi, False)
-        if key in self._colors:
-            del self._colors[key]
-        self._recompute_column_bounds(xi, yi)
-        self._dirty = True
-        self._overview_dirty = True
+        self._drop_color(_column_index(xi, yi), zi)
+        self._shrink_column_bounds(_column_index(xi, yi), zi)
+        self._touch_column(xi, yi)
+        self._journal_append(xi, yi, zi)
         return None
 
+    cdef void _reset_journal(self):
+        # Drops the entries and the base blob; the next join state folds.
+        self._journal_count = 0
+        self._journal_coalesced = 0
+        self._journal_stale = False
+        self._journal_base = None
+        self._journal_base_chunks = {}
+
+    cdef inline void _journal_append(self, int x, int y, int z):
+        if self._journal_count == self._journal_alloc:
+            self._grow_journal()
+        self._journal_voxels[self._journal_count] = <uint32_t>(_column_index(x, y) * MAP_HEIGHT + z)
+        self._journal_generations[self._journal_count] = self.edit_generation
+        self._journal_count += 1
+
+    cdef void _journal_stamp(self, Py_ssize_t start):
+        # Batch edits bump the generation after their entries were appended.
+        cdef Py_ssize_t i
+
+        for i in range(start, self._journal_count):
+            self._journal_generations[i] = self.edit_generation
+
+    cdef void _grow_journal(self):
+        # A full journal is coalesced first; it only grows when at least half
+        # of its entries are distinct voxels.
+        self._coalesce_journal()
+        if self._journal_count * 2 <= self._journal_alloc:
+            return
+        self._journal_alloc *= 2
+        PyByteArray_Resize(self._journal_voxels_buf, self._journal_alloc * sizeof(uint32_t))
+        PyByteArray_Resize(self._journal_generations_buf, self._journal_alloc * sizeof(uint64_t))
+        self._journal_voxels = <uint32_t*>PyByteArray_AS_STRING(self._journal_voxels_buf)
+        self._journal_generations = <uint64_t*>PyByteArray_AS_STRING(self._journal_generations_buf)
+
+    cdef void _coalesce_journal(self):
+        # Keeps only the latest entry per voxel, in edit order. Sorting
+        # (voxel, position) keys groups the entries of each voxel with the
+        # latest one last.
+        cdef Py_ssize_t count = self._journal_count
+        cdef bytearray keys_buf
+        cdef bytearray keep_buf
+        cdef uint64_t* keys
+        cdef uint8_t* keep
+        cdef Py_ssize_t i
+        cdef Py_ssize_t out = 0
+
+        if count == self._journal_coalesced:
+            return
+        keys_buf = _new_buffer(count, sizeof(uint64_t))
+        keep_buf = _new_buffer(count, sizeof(uint8_t))
+        keys = <uint64_t*>PyByteArray_AS_STRING(keys_buf)
+        keep = <uint8_t*>PyByteArray_AS_STRING(keep_buf)
+        with nogil:
+            for i in range(count):
+                keys[i] = (<uint64_t>self._journal_voxels[i] << 32) | <uint64_t>i
+            qsort(keys, count, sizeof(uint64_t), _compare_keys)
+            for i in range(count):
+                if i + 1 == count or (keys[i] >> 32) != (keys[i + 1] >> 32):
+                    keep[<Py_ssize_t>(keys[i] & <uint64_t>0xFFFFFFFF)] = 1
+            for i in range(count):
+                if keep[i]:
+                    self._journal_voxels[out] = self._journal_voxels[i]
+                    self._journal_generations[out] = self._journal_generations[i]
+                    out += 1
+        self._journal_count = out
+        self._journal_coalesced = out
+
+    def get_journal_items(self, unsigned long long since=0):
+        """Return the journaled voxels edited after generation `since`.
+
+        Entries are `(x, y, z, color)` in edit order, one per voxel, where
+        `color` is the voxel's current `(r, g, b)` or `None` once removed,
+        matching the fields of a `ServerBlockItem`.
+        """
+        cdef list items = []
+        cdef Py_ssize_t i
+        cdef uint32_t index
+        cdef int col
+        cdef int x
+        cdef int y
+        cdef int z
+
+        self._coalesce_journal()
+        for i in range(self._journal_count):
+            if self._journal_generations[i] <= since:
+                continue
+            index = self._journal_voxels[i]
+            col = index // MAP_HEIGHT
+            z = index - col * MAP_HEIGHT
+            x = col & (MAP_SIZE - 1)
+            y = col >> 9
+            if self._solid_at(x, y, z):
+                items.append((x, y, z, _color_tuple(self._color_at(col, z))[:3]))
+            else:
+                items.append((x, y, z, None))
+        return items
+
+    def get_join_state(self, int chunk_size=MAP_CHUNK_SIZE, Py_ssize_t max_delta=JOURNAL_FOLD):
+        """Return `(chunks, items)` for a joining client.
+
+        `chunks` are the `(data, percent_complete)` payloads of the compressed
+        base map and `items` the journal entries edited since that base. The
+        journal is folded into a new base (and emptied) first when it holds
+        more than `max_delta` voxels, after a snapshot restore, or when no
+        base exists yet.
+        """
+        cdef tuple chunks
+
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        self._coalesce_journal()
+        if self._journal_base is None or self._journal_stale or self._journal_count > max_delta:
+            self._journal_base = self._compressed_map()
+            self._journal_base_chunks = {}
+            self._journal_count = 0
+            self._journal_coalesced = 0
+            self._journal_stale = False
+
+        chunks = self._journal_base_chunks.get(chunk_size)
+        if chunks is None:
+            chunks = _split_chunks(self._journal_base, chunk_size)
+            self._journal_base_chunks[chunk_size] = chunks
+        return chunks, self.get_journal_items()
+
+    cdef void _drop_snapshots(self):
+        self._snapshots = []
+        memset(self._tile_shared, 0, TILE_COUNT)
+
+    cdef inline void _preserve_column(self, int x, int y):
+        cdef int tile = _tile_index(x, y)
+
+        if self._tile_shared[tile]:
+            self._preserve_tile(tile)
+
+    cdef void _preserve_tile(self, int tile):
+        # Called before a tile shared with a live snapshot is first modified:
+        # the snapshots that still share it receive one common copy.
+        cdef bytes data = None
+        cdef list live = []
+        cdef _Snapshot snapshot
+
+        for ref in self._snapshots:
+            snapshot = ref()
+            if snapshot is None:
+                continue
+            live.append(ref)
+            if tile in snapshot.tiles:
+                continue
+            if data is None:
+                data = self._capture_tile(tile)
+            snapshot.tiles[tile] = data
+            snapshot.stamps[tile] = self._tile_edits[tile]
+        self._snapshots = live
+        self._tile_shared[tile] = 0
+
+    cdef bytes _capture_tile(self, int tile):
+        # Layout: solid bits, top Z, bottom Z and color masks row by row, then
+        # the colors of every column in column order.
+        cdef int x0 = (tile % TILE_ROW) << TILE_SHIFT
+        cdef int y0 = (tile // TILE_ROW) << TILE_SHIFT
+        cdef Py_ssize_t fixed = TILE_COLUMNS * (COLUMN_BYTES + 2 * sizeof(int16_t) + COLOR_MASK_WORDS * sizeof(uint32_t))
+        cdef Py_ssize_t colors = 0
+        cdef bytearray out
+        cdef uint8_t* at
+        cdef uint32_t* color_at
+        cdef int row
+        cdef int col
+        cdef int i
+        cdef int count
+
+        for row in range(TILE_SIZE):
+            col = _column_index(x0, y0 + row)
+            for i in range(TILE_SIZE):
+                colors += self._color_count(col + i)
+
+        out = _new_buffer(fixed + colors * sizeof(uint32_t), sizeof(uint8_t))
+        at = <uint8_t*>PyByteArray_AS_STRING(out)
+        for row in range(TILE_SIZE):
+            col = _column_index(x0, y0 + row)
+            memcpy(at, self._solid_bits + col * COLUMN_BYTES, TILE_SIZE * COLUMN_BYTES)
+            at += TILE_SIZE * COLUMN_BYTES
+            memcpy(at, self._top_z + col, TILE_SIZE * sizeof(int16_t))
+            at += TILE_SIZE * sizeof(int16_t)
+            memcpy(at, self._bottom_z + col, TILE_SIZE * sizeof(int16_t))
+            at += TILE_SIZE * sizeof(int16_t)
+            memcpy(at, self._color_mask + col * COLOR_MASK_WORDS, TILE_SIZE * COLOR_MASK_WORDS * sizeof(uint32_t))
+            at += TILE_SIZE * COLOR_MASK_WORDS * sizeof(uint32_t)
+
+        color_at = <uint32_t*>at
+        for row in range(TILE_SIZE):
+            col = _column_index(x0, y0 + row)
+            for i in range(TILE_SIZE):
+                count = self._color_count(col + i)
+                memcpy(color_at, self._color_data + self._color_offset[col + i], count * sizeof(uint32_t))
+                color_at += count
+        return bytes(out)
+
+    cdef void _write_tile(self, int tile, bytes data):
+        # Writes a `_capture_tile` copy back. Columns that already match it
+        # are left alone, so only real differences reach the serializer and
+        # the overview.
+        cdef int x0 = (tile % TILE_ROW) << TILE_SHIFT
+        cdef int y0 = (tile // TILE_ROW) << TILE_SHIFT
+        cdef const uint8_t* row_at
+        cdef const uint8_t* bits_at
+        cdef const int16_t* top_at
+        cdef const int16_t* bottom_at
+        cdef const uint32_t* mask_at
+        cdef const uint32_t* color_at = <const uint32_t*>(
+            <const uint8_t*>PyBytes_AS_STRING(data)
+            + TILE_COLUMNS * (COLUMN_BYTES + 2 * sizeof(int16_t) + COLOR_MASK_WORDS * sizeof(uint32_t))
+        )
+        cdef int row
+        cdef int col
+        cdef int i
+        cdef int word
+        cdef int count
+
+        for row in range(TILE_SIZE):
+            row_at = (
+                <const uint8_t*>PyBytes_AS_STRING(data)
+                + row * TILE_SIZE * (COLUMN_BYTES + 2 * sizeof(int16_t) + COLOR_MASK_WORDS * sizeof(uint32_t))
+            )
+            bits_at = row_at
+            top_at = <const int16_t*>(bits_at + TILE_SIZE * COLUMN_BYTES)
+            bottom_at = top_at + TILE_SIZE
+            mask_at = <const uint32_t*>(bottom_at + TILE_SIZE)
+            col = _column_index(x0, y0 + row)
+            for i in range(TILE_SIZE):
+                count = 0
+                for word in range(COLOR_MASK_WORDS):
+                    count += _popcount32(mask_at[word])
+                if (
+                    memcmp(self._solid_bits + col * COLUMN_BYTES, bits_at, COLUMN_BYTES)
+                    or memcmp(self._color_mask + col * COLOR_MASK_WORDS, mask_at, COLOR_MASK_WORDS * sizeof(uint32_t))
+                    or memcmp(self._color_data + self._color_offset[col], color_at, count * sizeof(uint32_t))
+                ):
+                    memcpy(self._solid_bits + col * COLUMN_BYTES, bits_at, COLUMN_BYTES)
+                    self._top_z[col] = top_at[0]
+                    self._bottom_z[col] = bottom_at[0]
+                    self._reserve_column_colors(col, count)
+                    memcpy(self._color_data + self._color_offset[col], color_at, count * sizeof(uint32_t))
+                    memcpy(self._color_mask + col * COLOR_MASK_WORDS, mask_at, COLOR_MASK_WORDS * sizeof(uint32_t))
+                    self._touch_column(x0 + i, y0 + row)
+                bits_at += COLUMN_BYTES
+                top_at += 1
+                bottom_at += 1
+                mask_at += COLOR_MASK_WORDS
+                color_at += count
+                col += 1
+
+    def snapshot(self):
+        """Return a handle for rolling the map back with `restore()`.
+
+        The handle shares the map state: a 32x32-column tile is copied into it
+        only when the tile is first edited afterwards, so a snapshot costs
+        memory in proportion to the edits made since. Loading a map
+        invalidates every snapshot.
+        """
+        cdef _Snapshot snapshot = _Snapshot()
+
+        memset(self._tile_shared, 1, TILE_COUNT)
+        self._snapshots.append(_weakref.ref(snapshot))
+        return snapshot
+
+    def restore(self, object handle):
+        """Roll the map back to a `snapshot()`; the handle stays usable.
+
+        Only the tiles edited since the snapshot are rewritten, and their
+        columns are queued for serialization and the overview.
+        """
+        cdef _Snapshot snapshot
+        cdef object tile
+        cdef bytes data
+
+        if not isinstance(handle, _Snapshot):
+            raise TypeError("restore() expects a handle returned by snapshot()")
+        snapshot = handle
+        if not any(ref() is snapshot for ref in self._snapshots):
+            raise ValueError("snapshot does not belong to the loaded map")
+
+        for tile, data in snapshot.tiles.items():
+            if snapshot.stamps[tile] == self._tile_edits[tile]:
+                continue
+            self._preserve_column((tile % TILE_ROW) << TILE_SHIFT, (tile // TILE_ROW) << TILE_SHIFT)
+            self._write_tile(tile, data)
+            snapshot.stamps[tile] = self._tile_edits[tile]
+            # Tile writes are not journaled voxel by voxel; the next join
+            # state folds the journal into a fresh base instead.
+            self._journal_stale = True
+        if self._color_waste > (self._color_used >> 1):
+            self._compact_colors()
+
+    def get_column_spans(self, object x, object y):
+        """Return the solid runs of a column as inclusive `(top_z, bottom_z)` pairs, top first."""
+        cdef int xi = int(x)
+        cdef int yi = int(y)
+        cdef const uint8_t* column
+        cdef list spans = []
+        cdef int z
+        cdef int end
+
+        if not self._in_bounds(xi, yi, 0):
+            return spans
+        column = _column_bits(self._solid_bits, _column_index(xi, yi))
+        z = _next_solid(column, 0)
+        while z < MAP_HEIGHT:
+            end = _next_air(column, z)
+            spans.append((z, end - 1))
+            z = _next_solid(column, end)
+        return spans
+
+    def get_solid_region(self, int x1, int y1, int z1, int x2, int y2, int z2):
+        """Return the solid state of the inclusive box as a uint8 view.
+
+        The view has shape `(y2 - y1 + 1, x2 - x1 + 1, z2 - z1 + 1)` and is
+        indexed `[y - y1, x - x1, z - z1]`, following the column layout; voxels
+        outside the map read as air, like `get_solid`. The result is a copy.
+        """
+        cdef int width = x2 - x1 + 1
+        cdef int height = y2 - y1 + 1
+        cdef int depth = z2 - z1 + 1
+        cdef bytearray out
+        cdef uint8_t* data
+
+        if width <= 0 or height <= 0 or depth <= 0:
+            raise ValueError("region must not be empty")
+        out = _new_buffer(<Py_ssize_t>width * height * depth, sizeof(uint8_t))
+        data = <uint8_t*>PyByteArray_AS_STRING(out)
+        with nogil:
+            _fill_solid_region(self._solid_bits, data, x1, y1, z1, x2, y2, z2)
+        return _builtins.memoryview(out).cast("B", (height, width, depth)).toreadonly()
+
+    def get_heightmap(self, int x1, int y1, int x2, int y2):
+        """Return the top solid Z of every column in the inclusive rectangle.
+
+        The int16 view has shape `(y2 - y1 + 1, x2 - x1 + 1)` and is indexed
+        `[y - y1, x - x1]`. Empty columns and columns outside the map read as
+        `240`. Each row of the rectangle is one `memcpy` from `_top_z`.
+        """
+        cdef int width = x2 - x1 + 1
+        cdef int height = y2 - y1 + 1
+        cdef int left = max(x1, 0)
+        cdef int right = min(x2, MAP_SIZE - 1)
+        cdef bytearray out
+        cdef int16_t* data
+        cdef int16_t* row
+        cdef Py_ssize_t i
+        cdef int y
+
+        if width <= 0 or height <= 0:
+            raise ValueError("region must not be empty")
+        out = _new_buffer(<Py_ssize_t>width * height, sizeof(int16_t))
+        data = <int16_t*>PyByteArray_AS_STRING(out)
+        with nogil:
+            if left > x1 or right < x2 or y1 < 0 or y2 >= MAP_SIZE:
+                for i in range(<Py_ssize_t>width * height):
+                    data[i] = MAP_HEIGHT
+            if left <= right:
+                for y in range(max(y1, 0), min(y2, MAP_SIZE - 1) + 1):
+                    row = data + <Py_ssize_t>(y - y1) * width + (left - x1)
+                    memcpy(row, self._top_z + _column_index(left, y), (right - left + 1) * sizeof(int16_t))
+        return _builtins.memoryview(out).cast("h", (height, width)).toreadonly()
+
+    def get_checksum(self):
+        """Return a checksum of the map state as a signed 32-bit integer.
+
+        The checksum is the sum of per-column hashes over solid bits, color
+        masks and colors. Edits only queue their column; the next call rehashes
+        the queued columns and adjusts the sum, so no serialization is needed.
+        It fits `InitialInfo.checksum` and `MapDataValidation.crc` as is, but
+        it is not a CRC of the `.vxl` bytes.
+        """
+        cdef uint64_t hash
+        cdef uint32_t folded
+        cdef Py_ssize_t i
+        cdef int col
+
+        if not self._checksum_valid:
+            if self._column_hashes_buf is None:
+                self._column_hashes_buf = _new_buffer(MAP_AREA, sizeof(uint64_t))
+                self._hash_columns_buf = _new_buffer(MAP_AREA, sizeof(uint32_t))
+                self._column_hashes = <uint64_t*>PyByteArray_AS_STRING(self._column_hashes_buf)
+                self._hash_columns = <uint32_t*>PyByteArray_AS_STRING(self._hash_columns_buf)
+            self._checksum_sum = 0
+            with nogil:
+                for col in range(MAP_AREA):
+                    hash = _column_hash(
+                        _column_bits(self._solid_bits, col),
+                        self._color_mask + col * COLOR_MASK_WORDS,
+                        self._color_data + self._color_offset[col],
+                        col,
+                    )
+                    self._column_hashes[col] = hash
+                    self._checksum_sum += hash
+            self._hash_count = 0
+            self._checksum_valid = True
+        else:
+            with nogil:
+                for i in range(self._hash_count):
+                    col = self._hash_columns[i]
+                    self._column_flags[col] &= ~COLUMN_HASH
+                    hash = _column_hash(
+                        _column_bits(self._solid_bits, col),
+                        self._color_mask + col * COLOR_MASK_WORDS,
+                        self._color_data + self._color_offset[col],
+                        col,
+                    )
+                    self._checksum_sum += hash - self._column_hashes[col]
+                    self._column_hashes[col] = hash
+            self._hash_count = 0
+        folded = <uint32_t>(self._checksum_sum ^ (self._checksum_sum >> 32))
+        return <int32_t>folded
+
+    def iter_dirty_chunks(self, unsigned long long since_version=0):
+        """Yield the `CChunk`s edited after `since_version`, in tile order.
+
+        Chunk versions are `edit_generation` values, so passing the
+        generation read after the previous call yields exactly the chunks
+        edited since. Loading a map advances every chunk.
+        """
+        cdef int tile
+
+        for tile in range(TILE_COUNT):
+            if self._tile_versions[tile] > since_version:
+                yield self._chunk(tile)
+
+    cdef object _chunk(self, int tile):
+        cdef CChunk chunk = self._chunks[tile]
+
+        if chunk is None:
+            chunk = CChunk()
+            chunk._map = self
+            chunk._tile = tile
+            chunk._x1 = (tile % TILE_ROW) << TILE_SHIFT
+            chunk._y1 = (tile // TILE_ROW) << TILE_SHIFT
+            chunk._x2 = chunk._x1 + TILE_SIZE
+            chunk._y2 = chunk._y1 + TILE_SIZE
+            chunk._z2 = MAP_HEIGHT
+            self._chunks[tile] = chunk
+        return chunk
+
     cpdef object remove_point_nochecks(self, object x, object y, object z):
         return self.remove_point(x, y, z)
 
+    cdef list _apply_batch(self, object points, object colors, int mode, bint report=True):
+        # Applies a batch of voxel edits in one loop. Each column is queued for
+        # serialization once, and only voxels whose state actually changed are
+        # reported (`report=False` skips building the list).
+        cdef object point_view = _coerce_points(points)
+        cdef object color_view = None
+        cdef Py_buffer point_buf
+        cdef Py_buffer color_buf
+        cdef const int32_t* coords
+        cdef const uint32_t* color_values = NULL
+        cdef unsigned int uniform = 0
+        cdef Py_ssize_t count = len(point_view) // 3
+        cdef bytearray touched = _new_buffer(count, sizeof(uint32_t))
+        cdef uint32_t* touched_at = <uint32_t*>PyByteArray_AS_STRING(touched)
+        cdef Py_ssize_t touched_count = 0
+        cdef Py_ssize_t journal_start = self._journal_count
+        cdef list changed = []
+        cdef Py_ssize_t i
+        cdef int x
+        cdef int y
+        cdef int z
+        cdef int col
+        cdef bint was_solid
+        cdef unsigned int old_color
+        cdef unsigned int color
+
+        if mode != BATCH_REMOVE:
+            if isinstance(colors, tuple):
+                uniform = _pack_color_tuple(colors)
+            elif isinstance(colors, int):
+                uniform = <unsigned int>colors
+            else:
+                color_view = _coerce_colors(colors)
+                if len(color_view) != count:
+                    raise ValueError("colors must have shape (N,)")
+
+        PyObject_GetBuffer(point_view, &point_buf, PyBUF_SIMPLE)
+        if color_view is not None:
+            PyObject_GetBuffer(color_view, &color_buf, PyBUF_SIMPLE)
+            color_values = <const uint32_t*>color_buf.buf
+        try:
+            coords = <const int32_t*>point_buf.buf
+            for i in range(count):
+                x = coords[i * 3]
+                y = coords[i * 3 + 1]
+                z = coords[i * 3 + 2]
+                if not self._in_bounds(x, y, z):
+                    continue
+
+                col = _column_index(x, y)
+                was_solid = self._solid_at(x, y, z)
+                old_color = self._color_at(col, z)
+                if mode == BATCH_REMOVE:
+                    if not was_solid and not old_color:
+                        continue
+                    self._preserve_column(x, y)
+                    self._set_solid(x, y, z, False)
+                    self._drop_color(col, z)
+                    self._shrink_column_bounds(col, z)
+                else:
+                    color = color_values[i] if color_values != NULL else uniform
+                    if not color and mode == BATCH_COLOR:
+                        color = old_color
+                    if was_solid and color == old_color:
+                        continue
+                    self._preserve_column(x, y)
+                    if not was_solid:
+                        self._set_solid(x, y, z, True)
+                        self._update_column_bounds(x, y, z)
+                    self._put_color(col, z, color)
+
+                if report:
+                    changed.append((x, y, z))
+                self._journal_append(x, y, z)
+                if not self._column_flags[col] & COLUMN_BATCH:
+                    self._column_flags[col] |= COLUMN_BATCH
+                    touched_at[touched_count] = col
+                    touched_count += 1
+        finally:
+            PyBuffer_Release(&point_buf)
+            if color_view is not None:
+                PyBuffer_Release(&color_buf)
+
+        for i in range(touched_count):
+            col = touched_at[i]
+            self._column_flags[col] &= ~COLUMN_BATCH
+            self._touch_column(col & (MAP_SIZE - 1), col >> 9)
+        self._journal_stamp(journal_start)
+        return changed
+
+    def set_points(self, object points, object colors):
+        """Batch `set_point` over an (N, 3) int32 buffer and (N,) colors.
+
+        `colors` may also be a single color for every point. Returns the
+        `(x, y, z)` voxels whose state changed.
+        """
+        return self._apply_batch(points, colors, BATCH_SET)
+
+    def remove_points(self, object points):
+        """Batch `remove_point`; returns the `(x, y, z)` voxels that were removed."""
+        return self._apply_batch(points, None, BATCH_REMOVE)
+
+    def color_blocks(self, object points, object colors=0xFFFFFF):
+        """Batch `color_block`; returns the `(x, y, z)` voxels whose state changed."""
+        return self._apply_batch(points, colors, BATCH_COLOR)
+
     cpdef object color_block(self, object x, object y, object z, object color=0xFFFFFF):
         cdef int xi = int(x)
         cdef int yi = int(y)
@@ -726,15 +2622,107 @@ cdef class VXL:
             return None
 
         self._store_block(xi, yi, zi, packed)
-        self._dirty = True
-        self._overview_dirty = True
+        self._touch_column(xi, yi)
+        self._journal_append(xi, yi, zi)
         return None
 
+    cdef void _ensure_check_buffers(self):
+        # The visited bitset mirrors the solid bitmap layout and is only
+        # allocated by the first connectivity check; every check clears the
+        # bits it set, so it never needs a full reset.
+        if self._check_visited_buf is not None:
+            return
+        self._check_visited_buf = _new_buffer(VOXEL_BITS, sizeof(uint8_t))
+        self._check_stack_buf = _new_buffer(CHECK_NODE_LIMIT, sizeof(uint32_t))
+        self._check_nodes_buf = _new_buffer(CHECK_NODE_LIMIT * 6, sizeof(uint32_t))
+        self._check_visited = <uint8_t*>PyByteArray_AS_STRING(self._check_visited_buf)
+        self._check_stack = <uint32_t*>PyByteArray_AS_STRING(self._check_stack_buf)
+        self._check_nodes = <uint32_t*>PyByteArray_AS_STRING(self._check_nodes_buf)
+
     cpdef object check_only(self, object x, object y, object z):
-        return None
+        """Return the voxels cut off from the ground by removing (x, y, z).
+
+        Each solid neighbour's component is searched until it reaches the
+        ground plane; components that never do are returned as `(x, y, z)`
+        voxels and replace the set removed by `clear_checked_geometry()`.
+        The map is not modified, and (x, y, z) itself is treated as removed.
+        """
+        cdef int xi = int(x)
+        cdef int yi = int(y)
+        cdef int zi = int(z)
+        cdef list floating = []
+        cdef Py_ssize_t total = 0
+        cdef Py_ssize_t count
+        cdef Py_ssize_t i
+        cdef uint32_t index
+        cdef uint32_t center = 0
+        cdef bint center_marked = False
+        cdef int32_t* points
+        cdef int col
+        cdef int k
+        cdef int nx
+        cdef int ny
+        cdef int nz
+
+        self._checked_points = bytearray()
+        if not self._in_bounds(xi, yi, zi):
+            return floating
+        self._ensure_check_buffers()
+
+        if self._solid_at(xi, yi, zi):
+            center = <uint32_t>(_column_index(xi, yi) * MAP_HEIGHT + zi)
+            self._check_visited[center >> 3] |= 1 << (center & 7)
+            center_marked = True
+
+        for k in range(6):
+            nx = xi + (k == 1) - (k == 0)
+            ny = yi + (k == 3) - (k == 2)
+            nz = zi + (k == 5) - (k == 4)
+            if _find_floating(
+                self._solid_bits,
+                self._check_visited,
+                self._check_stack,
+                self._check_nodes + total,
+                &count,
+                nx,
+                ny,
+                nz,
+            ):
+                total += count
+            else:
+                # Supported voxels are unmarked again, so a later neighbour
+                # reaching them repeats the walk to the ground instead of
+                # mistaking them for part of its own component.
+                _clear_visited(self._check_visited, self._check_nodes + total, count)
+
+        _clear_visited(self._check_visited, self._check_nodes, total)
+        if center_marked:
+            self._check_visited[center >> 3] &= ~(1 << (center & 7))
+        if not total:
+            return floating
+
+        self._checked_points = _new_buffer(total * 3, sizeof(int32_t))
+        points = <int32_t*>PyByteArray_AS_STRING(self._checked_points)
+        for i in range(total):
+            index = self._check_nodes[i]
+            col = index // MAP_HEIGHT
+            nx = col & (MAP_SIZE - 1)
+            ny = col >> 9
+            nz = index - col * MAP_HEIGHT
+            points[i * 3] = nx
+            points[i * 3 + 1] = ny
+            points[i * 3 + 2] = nz
+            floating.append((nx, ny, nz))
+        return floating
 
     cpdef void clear_checked_geometry(self):
-        return
+        """Remove the floating voxels found by the last `check_only()` call."""
+        cdef bytearray points = self._checked_points
+
+        if not points:
+            return
+        self._checked_points = bytearray()
+        self._apply_batch(_builtins.memoryview(points).cast("i"), None, BATCH_REMOVE, False)
 
     cpdef bint get_solid(self, object x, object y, object z):
         return self._solid_at(int(x), int(y), int(z))
@@ -749,7 +2737,7 @@ cdef class VXL:
         cdef int zi = int(z)
         if not self._in_bounds(xi, yi, zi):
             return 0
-        return self._colors.get(_voxel_index(xi, yi, zi), 0)
+        return self._color_at(_column_index(xi, yi), zi)
 
     cpdef tuple get_color_tuple(self, object x, object y, object z):
         return _color_tuple(self.get_color(x, y, z))
@@ -799,22 +2787,89 @@ cdef class VXL:
         return
 
     def get_overview(self, transparent=None):
+        # Both views are live, read-only windows on the persistent buffers.
         if transparent is None:
             self._ensure_overview()
-            return self._overview_opaque
+            return self._overview_opaque_view
         if not isinstance(transparent, int):
             raise TypeError("an integer is required")
         self._ensure_overview()
-        return self._overview_transparent
+        return self._overview_transparent_view
 
     cpdef bint get_prefab_touches_world(self, object kv6, int x, int y, int z, int rx=0, int ry=0, int rz=0, int scale=1):
-        return False
+        cdef object voxels = _prefab_voxels(kv6)
+        cdef Py_buffer buf
+        cdef int matrix[9]
+        cdef Py_ssize_t count
+        cdef bint touches
+
+        _prefab_matrix(rx, ry, rz, matrix)
+        PyObject_GetBuffer(voxels, &buf, PyBUF_SIMPLE)
+        try:
+            count = buf.len // (PREFAB_FIELDS * sizeof(int16_t))
+            with nogil:
+                touches = _prefab_touches(
+                    self._solid_bits,
+                    <const int16_t*>buf.buf,
+                    count,
+                    matrix,
+                    x,
+                    y,
+                    z,
+                    scale,
+                )
+        finally:
+            PyBuffer_Release(&buf)
+        return touches
+
+    cdef void _stamp_prefab(self, object kv6, int x, int y, int z, int rx, int ry, int rz, int scale, int mode):
+        # Expands the prefab into world points and colors in one C pass and
+        # hands them to the batch-edit path.
+        cdef object voxels = _prefab_voxels(kv6)
+        cdef Py_buffer buf
+        cdef int matrix[9]
+        cdef Py_ssize_t count
+        cdef bytearray points
+        cdef bytearray colors
+        cdef int32_t* point_at
+        cdef uint32_t* color_at
+
+        if scale < 1:
+            scale = 1
+        _prefab_matrix(rx, ry, rz, matrix)
+        PyObject_GetBuffer(voxels, &buf, PyBUF_SIMPLE)
+        try:
+            count = buf.len // (PREFAB_FIELDS * sizeof(int16_t))
+            points = _new_buffer(count * scale * scale * scale * 3, sizeof(int32_t))
+            colors = _new_buffer(count * scale * scale * scale, sizeof(uint32_t))
+            point_at = <int32_t*>PyByteArray_AS_STRING(points)
+            color_at = <uint32_t*>PyByteArray_AS_STRING(colors)
+            with nogil:
+                _expand_prefab(
+                    <const int16_t*>buf.buf,
+                    count,
+                    matrix,
+                    x,
+                    y,
+                    z,
+                    scale,
+                    point_at,
+                    color_at,
+                )
+        finally:
+            PyBuffer_Release(&buf)
+        self._apply_batch(
+            _builtins.memoryview(points).cast("i"),
+            _builtins.memoryview(colors).cast("i"),
+            mode,
+            False,
+        )
 
     cpdef void place_prefab_in_world(self, object kv6, int x, int y, int z, int rx=0, int ry=0, int rz=0, int scale=1, int flags=0, float tolerance=0.0):
-        return
+        self._stamp_prefab(kv6, x, y, z, rx, ry, rz, scale, BATCH_SET)
 
     cpdef void erase_prefab_from_world(self, object kv6, int x, int y, int z, int rx=0, int ry=0, int rz=0, int scale=1, int flags=0, float tolerance=0.0):
-        return
+        self._stamp_prefab(kv6, x, y, z, rx, ry, rz, scale, BATCH_REMOVE)
 
     cpdef list get_ground_colors(self):
         return _ground_colors
@@ -841,12 +2896,116 @@ cdef class VXL:
             return (<CChunk>chunk).to_block_list()
         return []
 
-    cpdef bytes generate_vxl(self, bint compress=True):
-        if not self._dirty and self._raw_data:
+    cpdef bytes generate_vxl(self, bint compress=True, int level=-1, int threads=0):
+        if self._dirty_count:
+            self._raw_data = self._serialize_dirty()
+        if compress:
+            if level == -1 and threads == 0:
+                return self._compressed_map()
+            return _deflate_map(self._raw_data, level, threads)
+        if isinstance(self._raw_data, bytes):
             return self._raw_data
-        self._raw_data = self._serialize_dirty()
-        self._dirty = False
-        return self._raw_data
+        return bytes(self._raw_data)
+
+    cdef bytes _compressed_map(self):
+        cdef bytes blob
+
+        if self._map_blob is not None and self._map_cache_generation == self.edit_generation:
+            return self._map_blob
+        if self._dirty_count:
+            self._raw_data = self._serialize_dirty()
+        blob = _deflate_map(self._raw_data, -1, 0)
+        self._store_compressed_map(self.edit_generation, blob)
+        return blob
+
+    cdef void _store_compressed_map(self, unsigned long long generation, bytes blob):
+        # Streams that finish after a later edit must not publish their blob.
+        if generation != self.edit_generation:
+            return
+        if self._map_cache_generation != generation:
+            self._map_chunk_cache = {}
+        self._map_cache_generation = generation
+        self._map_blob = blob
+
+    def get_map_chunks(self, int chunk_size=MAP_CHUNK_SIZE):
+        """Return the compressed `(data, percent_complete)` payloads for `MapDataChunk`.
+
+        The tuple is built once per edit generation and chunk size and shared by
+        every caller until the next edit.
+        """
+        cdef bytes blob
+        cdef tuple chunks
+
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        blob = self._compressed_map()
+        chunks = self._map_chunk_cache.get(chunk_size)
+        if chunks is None:
+            chunks = _split_chunks(blob, chunk_size)
+            self._map_chunk_cache[chunk_size] = chunks
+        return chunks
+
+    def iter_map_chunks(self, int chunk_size=MAP_CHUNK_SIZE, bint compress=True):
+        """Yield `(data, percent_complete)` payloads for `MapDataChunk`.
+
+        The stream covers the map as of the first iteration; later edits are
+        not part of it. Compressed streams form one zlib stream across chunks
+        and are served from the shared `get_map_chunks` cache when it is current.
+        Otherwise every stream of the same generation reads one shared
+        compression that is built as the leading stream needs it.
+        """
+        cdef object source
+        cdef _MapStream stream
+        cdef object data
+        cdef Py_ssize_t total
+        cdef Py_ssize_t pos = 0
+        cdef Py_ssize_t end
+        cdef Py_ssize_t step
+        cdef Py_ssize_t mark = 0
+
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        if compress and self._map_blob is not None and self._map_cache_generation == self.edit_generation:
+            yield from self.get_map_chunks(chunk_size)
+            return
+
+        if not compress:
+            if self._dirty_count:
+                self._raw_data = self._serialize_dirty()
+            source = _builtins.memoryview(self._raw_data)
+            total = len(source)
+            while pos < total:
+                step = min(chunk_size, total - pos)
+                pos += step
+                yield bytes(source[pos - step:pos]), <int>(pos * 100 // total)
+            return
+
+        stream = self._map_stream
+        if stream is None or stream.generation != self.edit_generation:
+            if self._dirty_count:
+                self._raw_data = self._serialize_dirty()
+            stream = _MapStream(self._raw_data, self.edit_generation)
+            self._map_stream = stream
+
+        while True:
+            end = pos + chunk_size
+            while stream.blob is None and len(stream.data) < end:
+                if not stream._advance():
+                    # The reader that completes the stream publishes it.
+                    self._store_compressed_map(stream.generation, stream.blob)
+                    if self._map_stream is stream:
+                        self._map_stream = None
+            data = stream.data if stream.blob is None else stream.blob
+            if pos >= len(data):
+                return
+            end = min(end, len(data))
+            # A chunk reports the progress of the step that completed it.
+            while stream.marks[mark][0] < end:
+                mark += 1
+            yield bytes(data[pos:end]), stream.marks[mark][1]
+            pos = end
 
     cpdef void destroy(self):
         self._reset_blank()
@@ -5,12 +5,23 @@
 Native-shaped restoration of aoslib.world.
 """
 
+import array as _pyarray
 import json
 import sys
 import time
 import math as _math
 import random as _random
 
+from cpython.buffer cimport PyObject_CheckBuffer
+from cpython.bytearray cimport PyByteArray_AS_STRING
+from cpython.pyport cimport PY_SSIZE_T_MAX
+from libc.math cimport INFINITY, ceil, fabs, isfinite, sqrt
+from libc.math cimport floor as _c_floor
+from libc.string cimport memmove, memset
+from libc.stdint cimport int8_t, int32_t, uint8_t, uint32_t
+
+from aoslib.vxl cimport VXL, solid_at
+from shared.glm cimport Vector3
 from shared.constants import *
 from shared import glm as _glm
 from aoslib import vxl as _vxl
@@ -23,6 +34,51 @@ _PLAYER_RADIUS = 0.45
 _PLAYER_HEIGHT = 2.7
 _PLAYER_CROUCH_HEIGHT = 1.8
 _PLAYER_CROUCH_SHIFT = 0.9
+_WORLD_TIMESTEP = 1.0 / 60.0
+_WORLD_MAX_SUBSTEPS = 8
+
+DEF PLAYER_UP = 1
+DEF PLAYER_DOWN = 2
+DEF PLAYER_LEFT = 4
+DEF PLAYER_RIGHT = 8
+DEF PLAYER_JUMP = 16
+DEF PLAYER_CROUCH = 32
+DEF PLAYER_SNEAK = 64
+DEF PLAYER_SPRINT = 128
+DEF PLAYER_BURDENED = 256
+DEF PLAYER_HOVER = 512
+DEF PLAYER_JETPACK_ACTIVE = 1024
+DEF PLAYER_PARACHUTE_ACTIVE = 2048
+DEF PLAYER_WADE = 4096
+DEF PLAYER_AIRBORNE = 8192
+DEF PLAYER_JUMP_THIS_FRAME = 16384
+DEF PLAYER_LOCKED = 32768
+DEF PLAYER_WAS_AIRBORNE = 65536
+DEF PLAYER_FOREIGN = 131072
+DEF PLAYER_STEP_FLAGS = PLAYER_WADE | PLAYER_AIRBORNE | PLAYER_JUMP_THIS_FRAME
+DEF PLAYER_PARAMS = 10
+DEF STEP_NOT_FINITE = -1
+DEF STEP_ZERO_DIVISION = -2
+DEF GRID_CELL_SIZE = 8.0
+DEF GRID_SIZE = 64
+DEF GRID_CELLS = GRID_SIZE * GRID_SIZE
+# Pushes need a horizontal gap under 0.9; the extra margin absorbs rounding.
+DEF GRID_REACH = 1.0
+
+
+ctypedef struct _PlayerRules:
+    double radius
+    double height
+    double crouch_height
+    double water_z
+    double gravity
+
+
+ctypedef struct _PlayerGrid:
+    const double* others
+    const uint32_t* cell_start
+    const uint32_t* cell_rows
+    uint32_t* found
 
 
 def A2():
@@ -210,64 +266,50 @@ def _normalize_xy(vector):
     return vector.x / mag, vector.y / mag
 
 
-def _within_bounds(x, y):
-    return 0 <= x < MAP_X and 0 <= y < MAP_Y
-
-
-def _is_solid(map_obj, x, y, z):
-    if not _within_bounds(x, y):
-        return True
-    if z < 0 or z >= MAP_Z or map_obj is None:
-        return False
-    return bool(map_obj.get_solid(int(x), int(y), int(z)))
-
-
 def _water_solid(z):
     return int(z) >= int(Z_ABOVE_WATERPLANE)
 
 
-def _raycast(world_map, position, direction, length, accurate, water_is_solid):
-    if world_map is None:
-        return None
+cdef bint _cast_ray(
+    const uint8_t* bits,
+    double sx,
+    double sy,
+    double sz,
+    int x,
+    int y,
+    int z,
+    double dx,
+    double dy,
+    double dz,
+    double length,
+    int water_z,
+    int* hit,
+    double* distance,
+) noexcept nogil:
+    # Voxel DDA from the start cell (x, y, z) along the unit direction. Fills
+    # hit block and entry face and the distance travelled on a hit.
+    cdef int step_x = 1 if dx > 0.0 else -1 if dx < 0.0 else 0
+    cdef int step_y = 1 if dy > 0.0 else -1 if dy < 0.0 else 0
+    cdef int step_z = 1 if dz > 0.0 else -1 if dz < 0.0 else 0
+    cdef double next_x = ((x + (step_x > 0)) - sx) / dx if step_x else INFINITY
+    cdef double next_y = ((y + (step_y > 0)) - sy) / dy if step_y else INFINITY
+    cdef double next_z = ((z + (step_z > 0)) - sz) / dz if step_z else INFINITY
+    cdef double delta_x = fabs(1.0 / dx) if step_x else INFINITY
+    cdef double delta_y = fabs(1.0 / dy) if step_y else INFINITY
+    cdef double delta_z = fabs(1.0 / dz) if step_z else INFINITY
+    cdef double travelled = 0.0
+    cdef int last_face = 0
 
-    start = _as_vector3(position, "position")
-    direction = _as_vector3(direction, "direction")
-    mag = _math.sqrt((direction.x * direction.x) + (direction.y * direction.y) + (direction.z * direction.z))
-    if mag <= 0.0:
-        return None
-
-    dx = direction.x / mag
-    dy = direction.y / mag
-    dz = direction.z / mag
-    x = int(_math.floor(start.x))
-    y = int(_math.floor(start.y))
-    z = int(_math.floor(start.z))
-
-    step_x = 1 if dx > 0.0 else -1 if dx < 0.0 else 0
-    step_y = 1 if dy > 0.0 else -1 if dy < 0.0 else 0
-    step_z = 1 if dz > 0.0 else -1 if dz < 0.0 else 0
-
-    next_x = ((x + (step_x > 0)) - start.x) / dx if step_x else float("inf")
-    next_y = ((y + (step_y > 0)) - start.y) / dy if step_y else float("inf")
-    next_z = ((z + (step_z > 0)) - start.z) / dz if step_z else float("inf")
-    delta_x = abs(1.0 / dx) if step_x else float("inf")
-    delta_y = abs(1.0 / dy) if step_y else float("inf")
-    delta_z = abs(1.0 / dz) if step_z else float("inf")
-
-    last_face = 0
-    travelled = 0.0
     while travelled <= length:
-        solid = False
-        if _within_bounds(x, y) and 0 <= z < MAP_Z:
-            solid = bool(world_map.get_solid(x, y, z))
-            if not solid and water_is_solid and _water_solid(z):
-                solid = True
-        if solid:
-            block = _glm.IntVector3(x, y, z)
-            if accurate:
-                hit = _glm.Vector3(start.x + (dx * travelled), start.y + (dy * travelled), start.z + (dz * travelled))
-                return hit, block, last_face
-            return block, last_face
+        if solid_at(bits, x, y, z) or (
+            water_z >= 0 and 0 <= x < 512 and 0 <= y < 512 and water_z <= z < 240
+        ):
+            hit[0] = x
+            hit[1] = y
+            hit[2] = z
+            hit[3] = last_face
+            distance[0] = travelled
+            return True
 
         if next_x <= next_y and next_x <= next_z:
             travelled = next_x
@@ -285,13 +327,83 @@ def _raycast(world_map, position, direction, length, accurate, water_is_solid):
             z += step_z
             last_face = 4 if step_z > 0 else 5
 
-    return None
+    return False
+
+
+def _raycast(world_map, position, direction, length, accurate, water_is_solid):
+    cdef const uint8_t* bits
+    cdef double sx
+    cdef double sy
+    cdef double sz
+    cdef double dx
+    cdef double dy
+    cdef double dz
+    cdef double mag
+    cdef double max_length = length
+    cdef double travelled = 0.0
+    cdef int water_z = int(Z_ABOVE_WATERPLANE) if water_is_solid else -1
+    cdef int x
+    cdef int y
+    cdef int z
+    cdef int hit[4]
+    cdef bint found
+
+    if world_map is None:
+        return None
+
+    start = _as_vector3(position, "position")
+    direction = _as_vector3(direction, "direction")
+    mag = sqrt((direction.x * direction.x) + (direction.y * direction.y) + (direction.z * direction.z))
+    sx = start.x
+    sy = start.y
+    sz = start.z
+    # Far or non-finite origins cannot reach the map within int range.
+    if not (mag > 0.0 and isfinite(mag) and fabs(sx) < 1e9 and fabs(sy) < 1e9 and fabs(sz) < 1e9):
+        return None
+
+    dx = direction.x / mag
+    dy = direction.y / mag
+    dz = direction.z / mag
+    x = <int>_c_floor(sx)
+    y = <int>_c_floor(sy)
+    z = <int>_c_floor(sz)
+    bits = (<VXL>world_map)._solid_bits
+
+    with nogil:
+        found = _cast_ray(bits, sx, sy, sz, x, y, z, dx, dy, dz, max_length, water_z, hit, &travelled)
+    if not found:
+        return None
+
+    block = _glm.IntVector3(hit[0], hit[1], hit[2])
+    if accurate:
+        return _glm.Vector3(sx + (dx * travelled), sy + (dy * travelled), sz + (dz * travelled)), block, hit[3]
+    return block, hit[3]
+
+
+cdef object _coerce_doubles(object values, str name):
+    # Flat float64 view of a buffer or a sequence of numbers or triples.
+    cdef object view
+    cdef str code
+
+    if not PyObject_CheckBuffer(values):
+        values = _pyarray.array("d", [float(value) for row in values for value in (row if isinstance(row, (tuple, list)) else (row,))])
+    view = memoryview(values)
+    code = view.format.lstrip("@=<>!")
+    if code not in ("d", "f"):
+        raise TypeError("%s must be a buffer of floats" % name)
+    if code != "d" or not view.c_contiguous:
+        view = memoryview(_pyarray.array("d", memoryview(view.tobytes()).cast(code)))
+    return view.cast("B").cast("d")
 
 
 cdef class World:
     cdef object _map
     cdef double _timer
     cdef list _objects
+    cdef double _timestep
+    cdef int _max_substeps
+    cdef double _accumulator
+    cdef PlayerArray _player_array
 
     def __init__(self, map):
         global _GLOBAL_GRAVITY
@@ -301,6 +413,10 @@ cdef class World:
         self._map = map
         self._timer = 0.0
         self._objects = []
+        self._timestep = _WORLD_TIMESTEP
+        self._max_substeps = _WORLD_MAX_SUBSTEPS
+        self._accumulator = 0.0
+        self._player_array = PlayerArray()
 
     property map:
         def __get__(self):
@@ -316,6 +432,28 @@ cdef class World:
         def __set__(self, value):
             self._timer = float(value)
 
+    property timestep:
+        def __get__(self):
+            return self._timestep
+        def __set__(self, value):
+            value = float(value)
+            if not (value > 0.0 and isfinite(value)):
+                raise ValueError("timestep must be a positive number of seconds")
+            self._timestep = value
+
+    property player_array:
+        def __get__(self):
+            return self._player_array
+
+    property max_substeps:
+        def __get__(self):
+            return self._max_substeps
+        def __set__(self, value):
+            value = int(value)
+            if value < 1:
+                raise ValueError("max_substeps must be at least 1")
+            self._max_substeps = value
+
     def set_gravity(self, gravity):
         global _GLOBAL_GRAVITY
         _GLOBAL_GRAVITY = float(gravity)
@@ -326,11 +464,80 @@ cdef class World:
     def create_object(self, cls, *args, **kwargs):
         obj = cls(self, *args, **kwargs)
         self._objects.append(obj)
+        if type(obj) is Player:
+            self._player_array._stale = True
         return obj
 
     def update(self, dt):
-        self._timer += float(dt)
-        return None
+        """Advance the world by `dt` seconds in fixed `timestep` steps.
+
+        Leftover time carries over to the next call. At most `max_substeps`
+        steps run per call and a larger backlog is dropped. Objects made with
+        `create_object` are stepped by type and deleted ones are pruned.
+
+        Returns the events of those steps in order, as `(kind, object, value)`:
+        `("fuse", grenade, None)` when a fuse runs out (the grenade is then
+        deleted), `("land", player, None)` when an airborne player touches
+        down and `("damage", player, amount)` for fall damage.
+        """
+        cdef double frame = dt
+        cdef double count
+        cdef int steps = 0
+
+        self._timer += frame
+        self._accumulator += frame
+        if self._accumulator >= self._timestep:
+            count = _c_floor(self._accumulator / self._timestep)
+            if count > self._max_substeps:
+                steps = self._max_substeps
+                self._accumulator = 0.0
+            else:
+                steps = <int>count
+                self._accumulator -= count * self._timestep
+        elif self._accumulator != self._accumulator:
+            self._accumulator = 0.0
+        return _step_world(self, self._timestep, steps)
+
+    def query_radius(self, position, radius):
+        """Live players within `radius` of `position`, in creation order.
+
+        Covers players made with `create_object` at their current positions.
+        The rows are reloaded only after a player was moved, created or
+        revived outside `update`, and re-filed after a world step.
+        """
+        cdef object center = _as_vector3(position, "position")
+        cdef double r = radius
+
+        if not r >= 0.0:
+            return []
+        if not (isfinite(center.x) and isfinite(center.y) and isfinite(center.z)):
+            return []
+        self._player_array._refresh(self)
+        return self._player_array._query(
+            center.x - r,
+            center.y - r,
+            center.z - r,
+            center.x + r,
+            center.y + r,
+            center.z + r,
+            r,
+        )
+
+    def query_box(self, x1, y1, z1, x2, y2, z2):
+        """Live players inside the box (bounds included), like `query_radius`."""
+        cdef double low_x = min(x1, x2)
+        cdef double low_y = min(y1, y2)
+        cdef double low_z = min(z1, z2)
+        cdef double high_x = max(x1, x2)
+        cdef double high_y = max(y1, y2)
+        cdef double high_z = max(z1, z2)
+
+        # min/max drop a NaN in either slot, so check the bounds as given.
+        for bound in (x1, y1, z1, x2, y2, z2):
+            if bound != bound:
+                return []
+        self._player_array._refresh(self)
+        return self._player_array._query(low_x, low_y, low_z, high_x, high_y, high_z, -1.0)
 
     def hitscan(self, position, direction):
         return _raycast(self._map, position, direction, _RAY_DEFAULT_LENGTH, False, False)
@@ -338,6 +545,112 @@ cdef class World:
     def hitscan_accurate(self, position, direction, length=_RAY_DEFAULT_LENGTH, water_is_solid=False):
         return _raycast(self._map, position, direction, float(length), True, bool(water_is_solid))
 
+    def hitscan_batch(self, origins, directions, lengths=_RAY_DEFAULT_LENGTH, water_is_solid=False):
+        """Cast N rays at once; returns `(blocks, faces, distances)`.
+
+        `origins` and `directions` are (N, 3) float buffers (float64 is used in
+        place) or sequences of triples, and `lengths` is one length or an (N,)
+        buffer. The results are an (N, 3) int32 view of hit blocks, an (N,)
+        int8 view of entry faces and an (N,) float64 view of distances along
+        the ray, matching `hitscan_accurate`. Misses have face -1, block
+        (-1, -1, -1) and distance -1.0.
+        """
+        cdef object origin_view = _coerce_doubles(origins, "origins")
+        cdef object direction_view = _coerce_doubles(directions, "directions")
+        cdef object length_view
+        cdef const double[:] origin_at = origin_view
+        cdef const double[:] direction_at = direction_view
+        cdef const double[:] length_at
+        cdef double uniform_length = 0.0
+        cdef bint per_ray = False
+        cdef Py_ssize_t count = len(origin_view) // 3
+        cdef bytearray blocks
+        cdef bytearray faces
+        cdef bytearray distances
+        cdef int32_t* block_out
+        cdef int8_t* face_out
+        cdef double* distance_out
+        cdef const uint8_t* bits = NULL
+        cdef int water_z = int(Z_ABOVE_WATERPLANE) if water_is_solid else -1
+        cdef double sx
+        cdef double sy
+        cdef double sz
+        cdef double dx
+        cdef double dy
+        cdef double dz
+        cdef double mag
+        cdef int hit[4]
+        cdef Py_ssize_t i
+
+        if len(origin_view) % 3 or len(direction_view) != len(origin_view):
+            raise ValueError("origins and directions must have the same shape (N, 3)")
+        if isinstance(lengths, (int, float)):
+            uniform_length = lengths
+        else:
+            length_view = _coerce_doubles(lengths, "lengths")
+            if len(length_view) != count:
+                raise ValueError("lengths must have shape (N,)")
+            length_at = length_view
+            per_ray = True
+        if self._map is not None:
+            bits = (<VXL>self._map)._solid_bits
+
+        blocks = bytearray(count * 3 * sizeof(int32_t))
+        faces = bytearray(count * sizeof(int8_t))
+        distances = bytearray(count * sizeof(double))
+        block_out = <int32_t*>PyByteArray_AS_STRING(blocks)
+        face_out = <int8_t*>PyByteArray_AS_STRING(faces)
+        distance_out = <double*>PyByteArray_AS_STRING(distances)
+        with nogil:
+            for i in range(count):
+                sx = origin_at[i * 3]
+                sy = origin_at[i * 3 + 1]
+                sz = origin_at[i * 3 + 2]
+                dx = direction_at[i * 3]
+                dy = direction_at[i * 3 + 1]
+                dz = direction_at[i * 3 + 2]
+                mag = sqrt((dx * dx) + (dy * dy) + (dz * dz))
+                # Far or non-finite origins cannot reach the map within int range.
+                if (
+                    bits != NULL
+                    and mag > 0.0
+                    and isfinite(mag)
+                    and fabs(sx) < 1e9
+                    and fabs(sy) < 1e9
+                    and fabs(sz) < 1e9
+                    and _cast_ray(
+                        bits,
+                        sx,
+                        sy,
+                        sz,
+                        <int>_c_floor(sx),
+                        <int>_c_floor(sy),
+                        <int>_c_floor(sz),
+                        dx / mag,
+                        dy / mag,
+                        dz / mag,
+                        length_at[i] if per_ray else uniform_length,
+                        water_z,
+                        hit,
+                        &distance_out[i],
+                    )
+                ):
+                    block_out[i * 3] = hit[0]
+                    block_out[i * 3 + 1] = hit[1]
+                    block_out[i * 3 + 2] = hit[2]
+                    face_out[i] = hit[3]
+                else:
+                    block_out[i * 3] = block_out[i * 3 + 1] = block_out[i * 3 + 2] = -1
+                    face_out[i] = -1
+                    distance_out[i] = -1.0
+        if not count:
+            return memoryview(blocks).cast("i"), memoryview(faces).cast("b"), memoryview(distances).cast("d")
+        return (
+            memoryview(blocks).cast("i", (count, 3)),
+            memoryview(faces).cast("b"),
+            memoryview(distances).cast("d"),
+        )
+
     def get_block_face_center_position(self, position, face):
         cube = _as_intvector3(position)
         face = int(face)
@@ -391,6 +704,8 @@ cdef class Object:
             return bool(self._deleted)
         def __set__(self, value):
             self._deleted = bool(value)
+            if isinstance(self, Player):
+                _mark_rows_stale(<Player>self)
 
     def initialize(self, *args, **kwargs):
         return None
@@ -420,81 +735,257 @@ def _player_height(crouch, wade):
     return _PLAYER_HEIGHT
 
 
-def _aabb_collides(map_obj, x, y, z, radius, height):
-    min_x = int(_math.floor(x - radius))
-    max_x = int(_math.floor(x + radius))
-    min_y = int(_math.floor(y - radius))
-    max_y = int(_math.floor(y + radius))
-    min_z = int(_math.floor(z))
-    max_z = int(_math.floor(z + height - 1e-6))
-
-    if max_x < 0 or max_y < 0 or min_x >= MAP_X or min_y >= MAP_Y:
+cdef int _MAP_CELLS_X = MAP_X
+cdef int _MAP_CELLS_Y = MAP_Y
+cdef int _MAP_CELLS_Z = MAP_Z
+
+
+cdef inline const uint8_t* _map_bits(object map_obj) except? NULL:
+    # A missing map still has solid edges, so it reads as an empty bitmap.
+    if map_obj is None:
+        return NULL
+    return (<VXL?>map_obj)._solid_bits
+
+
+cdef int _check_finite(double value) except -1:
+    # Same errors the int(floor(...)) cell lookups used to raise.
+    if isfinite(value):
+        return 0
+    if value != value:
+        raise ValueError("cannot convert float NaN to integer")
+    raise OverflowError("cannot convert float infinity to integer")
+
+
+cdef inline int _cell(double value, int limit) noexcept nogil:
+    # Every cell past an edge answers the same, so clamping one cell beyond
+    # it keeps the result and the int cast in range.
+    value = _c_floor(value)
+    if value < -1.0:
+        return -1
+    if value > limit:
+        return limit
+    return <int>value
+
+
+cdef inline bint _cell_solid(const uint8_t* bits, int x, int y, int z) noexcept nogil:
+    if x < 0 or y < 0 or x >= _MAP_CELLS_X or y >= _MAP_CELLS_Y:
+        return True
+    if z < 0 or z >= _MAP_CELLS_Z or bits == NULL:
+        return False
+    return solid_at(bits, x, y, z)
+
+
+cdef bint _box_collides(const uint8_t* bits, double x, double y, double z, double radius, double height) noexcept nogil:
+    cdef double low_x = _c_floor(x - radius)
+    cdef double high_x = _c_floor(x + radius)
+    cdef double low_y = _c_floor(y - radius)
+    cdef double high_y = _c_floor(y + radius)
+    cdef int min_x
+    cdef int max_x
+    cdef int min_y
+    cdef int max_y
+    cdef int min_z
+    cdef int max_z
+    cdef int bx
+    cdef int by
+    cdef int bz
+
+    if high_x < 0.0 or high_y < 0.0 or low_x >= _MAP_CELLS_X or low_y >= _MAP_CELLS_Y:
         return True
 
+    min_x = _cell(low_x, _MAP_CELLS_X)
+    max_x = _cell(high_x, _MAP_CELLS_X)
+    min_y = _cell(low_y, _MAP_CELLS_Y)
+    max_y = _cell(high_y, _MAP_CELLS_Y)
+    min_z = _cell(z, _MAP_CELLS_Z)
+    max_z = _cell(z + height - 1e-6, _MAP_CELLS_Z)
     for bx in range(min_x, max_x + 1):
         for by in range(min_y, max_y + 1):
             for bz in range(min_z, max_z + 1):
-                if _is_solid(map_obj, bx, by, bz):
+                if _cell_solid(bits, bx, by, bz):
                     return True
     return False
 
 
-def _grounded(map_obj, position, crouch, wade):
-    height = _player_height(crouch, wade)
-    feet = position.z + height
-    sample_z = int(_math.floor(feet + 1e-4))
-    for bx in (int(_math.floor(position.x - _PLAYER_RADIUS)), int(_math.floor(position.x + _PLAYER_RADIUS))):
-        for by in (int(_math.floor(position.y - _PLAYER_RADIUS)), int(_math.floor(position.y + _PLAYER_RADIUS))):
-            if _is_solid(map_obj, bx, by, sample_z):
-                return True
-    return feet >= MAP_Z
-
-
-def _move_box(position, velocity, dt, map_obj, crouch, wade, can_climb):
-    height = _player_height(crouch, wade)
-    dx = velocity.x * dt * 32.0
-    dy = velocity.y * dt * 32.0
-    dz = velocity.z * dt * 32.0
-    steps = int(max(1.0, _math.ceil(max(abs(dx), abs(dy), abs(dz)) / 0.25)))
-    sx = dx / steps
-    sy = dy / steps
-    sz = dz / steps
-    collided_down = False
-
-    for _ in range(steps):
-        nx = position.x + sx
-        if not _aabb_collides(map_obj, nx, position.y, position.z, _PLAYER_RADIUS, height):
-            position.x = nx
-        elif can_climb and not _aabb_collides(map_obj, nx, position.y, position.z - 1.0, _PLAYER_RADIUS, height):
-            position.x = nx
-            position.z -= 1.0
+cdef bint _box_grounded(const uint8_t* bits, double x, double y, double z, double radius, double height) noexcept nogil:
+    cdef double feet = z + height
+    cdef int sample_z = _cell(feet + 1e-4, _MAP_CELLS_Z)
+    cdef int min_x = _cell(x - radius, _MAP_CELLS_X)
+    cdef int max_x = _cell(x + radius, _MAP_CELLS_X)
+    cdef int min_y = _cell(y - radius, _MAP_CELLS_Y)
+    cdef int max_y = _cell(y + radius, _MAP_CELLS_Y)
+
+    if (
+        _cell_solid(bits, min_x, min_y, sample_z)
+        or _cell_solid(bits, min_x, max_y, sample_z)
+        or _cell_solid(bits, max_x, min_y, sample_z)
+        or _cell_solid(bits, max_x, max_y, sample_z)
+    ):
+        return True
+    return feet >= _MAP_CELLS_Z
+
+
+cdef int _sweep_box(
+    const uint8_t* bits,
+    double* state,
+    double step_x,
+    double step_y,
+    double step_z,
+    Py_ssize_t steps,
+    double radius,
+    double height,
+    bint can_climb,
+    double* invalid,
+) noexcept nogil:
+    # Moves state (position then velocity) through the map one axis at a
+    # time. Returns 1 when a downward step was blocked, 0 otherwise and -1
+    # with the offending box in invalid once a position stops being finite.
+    cdef bint collided_down = False
+    cdef double n
+    cdef Py_ssize_t i
+
+    for i in range(steps):
+        n = state[0] + step_x
+        if not (isfinite(n) and isfinite(state[1]) and isfinite(state[2])):
+            invalid[0] = n
+            invalid[1] = state[1]
+            invalid[2] = state[2]
+            return -1
+        if not _box_collides(bits, n, state[1], state[2], radius, height):
+            state[0] = n
+        elif can_climb and not _box_collides(bits, n, state[1], state[2] - 1.0, radius, height):
+            state[0] = n
+            state[2] -= 1.0
         else:
-            velocity.x = 0.0
-
-        ny = position.y + sy
-        if not _aabb_collides(map_obj, position.x, ny, position.z, _PLAYER_RADIUS, height):
-            position.y = ny
-        elif can_climb and not _aabb_collides(map_obj, position.x, ny, position.z - 1.0, _PLAYER_RADIUS, height):
-            position.y = ny
-            position.z -= 1.0
+            state[3] = 0.0
+
+        n = state[1] + step_y
+        if not isfinite(n):
+            invalid[0] = state[0]
+            invalid[1] = n
+            invalid[2] = state[2]
+            return -1
+        if not _box_collides(bits, state[0], n, state[2], radius, height):
+            state[1] = n
+        elif can_climb and not _box_collides(bits, state[0], n, state[2] - 1.0, radius, height):
+            state[1] = n
+            state[2] -= 1.0
         else:
-            velocity.y = 0.0
-
-        nz = position.z + sz
-        if not _aabb_collides(map_obj, position.x, position.y, nz, _PLAYER_RADIUS, height):
-            position.z = nz
+            state[4] = 0.0
+
+        n = state[2] + step_z
+        if not isfinite(n):
+            invalid[0] = state[0]
+            invalid[1] = state[1]
+            invalid[2] = n
+            return -1
+        if not _box_collides(bits, state[0], state[1], n, radius, height):
+            state[2] = n
         else:
-            if sz > 0.0:
+            if step_z > 0.0:
                 collided_down = True
-            velocity.z = 0.0
+            state[5] = 0.0
 
-    if position.z > MAP_Z:
-        position.z = float(MAP_Z)
-        velocity.z = 0.0
+    if state[2] > _MAP_CELLS_Z:
+        state[2] = <double>_MAP_CELLS_Z
+        state[5] = 0.0
         collided_down = True
     return collided_down
 
 
+def _aabb_collides(map_obj, x, y, z, radius, height):
+    cdef const uint8_t* bits = _map_bits(map_obj)
+    cdef double box_x = x
+    cdef double box_y = y
+    cdef double box_z = z
+
+    _check_finite(box_x)
+    _check_finite(box_y)
+    _check_finite(box_z)
+    return _box_collides(bits, box_x, box_y, box_z, radius, height)
+
+
+def _grounded(map_obj, position, crouch, wade):
+    cdef const uint8_t* bits = _map_bits(map_obj)
+    cdef double x = position.x
+    cdef double y = position.y
+    cdef double z = position.z
+
+    _check_finite(z)
+    _check_finite(x)
+    _check_finite(y)
+    return _box_grounded(bits, x, y, z, _PLAYER_RADIUS, _player_height(crouch, wade))
+
+
+cdef int _move_state(
+    const uint8_t* bits,
+    double* state,
+    double dt,
+    double radius,
+    double height,
+    bint can_climb,
+    double* invalid,
+) noexcept nogil:
+    # _sweep_box for one frame of velocity; a non-finite step count is
+    # reported through invalid before anything moves.
+    cdef double dx = state[3] * dt * 32.0
+    cdef double dy = state[4] * dt * 32.0
+    cdef double dz = state[5] * dt * 32.0
+    cdef double largest
+    cdef double steps
+
+    # Python's max() keeps the first operand when comparisons fail on NaN.
+    largest = fabs(dx)
+    if fabs(dy) > largest:
+        largest = fabs(dy)
+    if fabs(dz) > largest:
+        largest = fabs(dz)
+    if not isfinite(largest / 0.25):
+        invalid[0] = invalid[1] = invalid[2] = largest / 0.25
+        return -1
+    steps = ceil(largest / 0.25)
+    if not steps > 1.0:
+        steps = 1.0
+    return _sweep_box(
+        bits,
+        state,
+        dx / steps,
+        dy / steps,
+        dz / steps,
+        <Py_ssize_t>steps if steps < <double>PY_SSIZE_T_MAX else PY_SSIZE_T_MAX,
+        radius,
+        height,
+        can_climb,
+        invalid,
+    )
+
+
+def _move_box(position, velocity, dt, map_obj, crouch, wade, can_climb):
+    cdef const uint8_t* bits = _map_bits(map_obj)
+    cdef double state[6]
+    cdef double invalid[3]
+    cdef int result
+
+    state[0] = position.x
+    state[1] = position.y
+    state[2] = position.z
+    state[3] = velocity.x
+    state[4] = velocity.y
+    state[5] = velocity.z
+    result = _move_state(bits, state, dt, _PLAYER_RADIUS, _player_height(crouch, wade), can_climb, invalid)
+    position.x = state[0]
+    position.y = state[1]
+    position.z = state[2]
+    velocity.x = state[3]
+    velocity.y = state[4]
+    velocity.z = state[5]
+    if result < 0:
+        _check_finite(invalid[0])
+        _check_finite(invalid[1])
+        _check_finite(invalid[2])
+    return result == 1
+
+
 def _sign(value):
     if value < 0.0:
         return -1.0
@@ -549,6 +1040,177 @@ def _collide_with_players(player, positions, dt):
     return collisions
 
 
+cdef inline bint _push_one(
+    double px,
+    double py,
+    double own_center_z,
+    double own_height,
+    double* velocity,
+    const double* row,
+    double scale,
+) noexcept nogil:
+    # One pair of _collide_with_players against a packed (x, y, z, height)
+    # row; returns whether the velocity was pushed.
+    cdef double dx = (px + (velocity[0] * scale)) - row[0]
+    cdef double dy = (py + (velocity[1] * scale)) - row[1]
+    cdef double dist_sq = (dx * dx) + (dy * dy)
+    cdef double push = 0.9 - sqrt(dist_sq)
+    cdef double other_center_z
+    cdef double vertical_overlap
+    cdef double length
+    cdef double sign
+    cdef double nx
+    cdef double ny
+
+    if not push > 0.0:
+        return False
+
+    other_center_z = row[2] + ((row[3] - 0.45) - (0.5 * row[3]))
+    vertical_overlap = ((0.5 * row[3]) + (0.5 * own_height)) - fabs(own_center_z - other_center_z)
+    if not vertical_overlap > 0.0:
+        return False
+
+    if vertical_overlap <= push:
+        sign = -1.0 if own_center_z < other_center_z else 1.0 if own_center_z > other_center_z else 0.0
+        velocity[2] += sign * (vertical_overlap / scale)
+    else:
+        length = sqrt(dist_sq)
+        if length <= 0.0:
+            nx, ny = 1.0, 0.0
+        else:
+            nx = dx / length
+            ny = dy / length
+        velocity[0] += nx * (push / scale)
+        velocity[1] += ny * (push / scale)
+    return True
+
+
+cdef inline double _push_scale(double dt) noexcept nogil:
+    cdef double scale = dt * 32.0
+    if 1e-6 > scale:
+        return 1e-6
+    return scale
+
+
+cdef int _push_rows(
+    double px,
+    double py,
+    double pz,
+    double own_height,
+    double* velocity,
+    const double* others,
+    Py_ssize_t count,
+    Py_ssize_t skip,
+    double dt,
+) noexcept nogil:
+    # _collide_with_players over packed (x, y, z, height) rows, skipping the
+    # player's own row.
+    cdef double own_center_z = pz + ((own_height - 0.45) - (0.5 * own_height))
+    cdef double scale = _push_scale(dt)
+    cdef Py_ssize_t index
+    cdef int collisions = 0
+
+    for index in range(count):
+        if index != skip and _push_one(px, py, own_center_z, own_height, velocity, others + (index * 4), scale):
+            collisions += 1
+    return collisions
+
+
+cdef inline int _grid_cell(double value) noexcept nogil:
+    value = _c_floor(value / GRID_CELL_SIZE)
+    if not value >= 0.0:
+        return 0
+    if value >= GRID_SIZE:
+        return GRID_SIZE - 1
+    return <int>value
+
+
+cdef Py_ssize_t _grid_rows(
+    const uint32_t* cell_start,
+    const uint32_t* cell_rows,
+    double x1,
+    double y1,
+    double x2,
+    double y2,
+    Py_ssize_t after,
+    Py_ssize_t skip,
+    uint32_t* found,
+) noexcept nogil:
+    # Rows filed in the cells under [x1, x2] x [y1, y2] with an index above
+    # `after`, in ascending order. Edge cells also hold the rows beyond the
+    # map, so the clamped range still covers them.
+    cdef int cx1 = _grid_cell(x1)
+    cdef int cx2 = _grid_cell(x2)
+    cdef int cy1 = _grid_cell(y1)
+    cdef int cy2 = _grid_cell(y2)
+    cdef int cx
+    cdef int cy
+    cdef uint32_t k
+    cdef uint32_t row
+    cdef Py_ssize_t count = 0
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+
+    for cy in range(cy1, cy2 + 1):
+        for cx in range(cx1, cx2 + 1):
+            for k in range(cell_start[cx + (cy * GRID_SIZE)], cell_start[cx + (cy * GRID_SIZE) + 1]):
+                row = cell_rows[k]
+                if <Py_ssize_t>row > after and <Py_ssize_t>row != skip:
+                    found[count] = row
+                    count += 1
+    for i in range(1, count):
+        row = found[i]
+        j = i
+        while j > 0 and found[j - 1] > row:
+            found[j] = found[j - 1]
+            j -= 1
+        found[j] = row
+    return count
+
+
+cdef int _push_grid(
+    double px,
+    double py,
+    double pz,
+    double own_height,
+    double* velocity,
+    const double* others,
+    const uint32_t* cell_start,
+    const uint32_t* cell_rows,
+    uint32_t* found,
+    Py_ssize_t skip,
+    double dt,
+) noexcept nogil:
+    # _push_rows restricted to the grid cells around the predicted position.
+    # A push moves that position, so the remaining higher rows are gathered
+    # again from there; rows are still visited in index order and every row
+    # the full scan would push is reached, which keeps the result identical.
+    cdef double own_center_z = pz + ((own_height - 0.45) - (0.5 * own_height))
+    cdef double scale = _push_scale(dt)
+    cdef double qx
+    cdef double qy
+    cdef Py_ssize_t after = -1
+    cdef Py_ssize_t count
+    cdef Py_ssize_t k
+    cdef bint pushed = True
+    cdef int collisions = 0
+
+    while pushed:
+        pushed = False
+        qx = px + (velocity[0] * scale)
+        qy = py + (velocity[1] * scale)
+        if not (isfinite(qx) and isfinite(qy)):
+            break
+        count = _grid_rows(cell_start, cell_rows, qx - GRID_REACH, qy - GRID_REACH, qx + GRID_REACH, qy + GRID_REACH, after, skip, found)
+        for k in range(count):
+            after = found[k]
+            if _push_one(px, py, own_center_z, own_height, velocity, others + (after * 4), scale):
+                collisions += 1
+                pushed = True
+                break
+    return collisions
+
+
 def _default_class_value(table, fallback):
     try:
         return table[CLASS_SOLDIER]
@@ -766,8 +1428,16 @@ cdef class Player(Object):
         def __get__(self):
             return bool(self._wade)
 
+    property position:
+        def __get__(self):
+            return self._position
+        def __set__(self, value):
+            _vector_set(self._position, _as_vector3(value, "position"))
+            _mark_rows_stale(self)
+
     def set_position(self, x, y, z):
         self._position = _glm.Vector3(float(x), float(y), float(z))
+        _mark_rows_stale(self)
 
     def set_velocity(self, x, y, z):
         self._velocity = _glm.Vector3(float(x), float(y), float(z))
@@ -793,6 +1463,7 @@ cdef class Player(Object):
         if target:
             if not self._airborne:
                 self._position.z += _PLAYER_CROUCH_SHIFT
+                _mark_rows_stale(self)
             self._crouch = True
             return None
         if self._parent is None or self._parent.map is None or not _aabb_collides(
@@ -805,10 +1476,12 @@ cdef class Player(Object):
         ):
             self._position.z -= _PLAYER_CROUCH_SHIFT
             self._crouch = False
+            _mark_rows_stale(self)
         return None
 
     def set_dead(self, dead):
         self._alive = not bool(dead)
+        _mark_rows_stale(self)
         return None
 
     def set_exploded(self, exploded):
@@ -882,118 +1555,753 @@ cdef class Player(Object):
         return float(_CUBE_SQ_DISTANCE)
 
     def update(self, dt, positions):
+        # A standalone step pushes against `positions` with a full scan and
+        # never the World's grid: the caller's list decides who collides.
         if not self._alive:
             return None
+        _mark_rows_stale(self)
+        return self._advance(float(dt), positions, NULL, 0, -1)
+
+    cdef object _advance(self, double dt, object positions, const double* others, Py_ssize_t count, Py_ssize_t skip):
+        # One movement step through the same row kernels as PlayerArray.
+        # World.update passes the other players as packed (x, y, z, height)
+        # rows in `others` instead of a positions list.
+        cdef _PlayerRules rules
+        cdef const uint8_t* bits
+        cdef double position[3]
+        cdef double velocity[3]
+        cdef double orientation[3]
+        cdef double strafe[2]
+        cdef double timers[2]
+        cdef double params[PLAYER_PARAMS]
+        cdef double lock[6]
+        cdef double invalid[3]
+        cdef double height = 0.0
+        cdef double damage = 0.0
+        cdef uint32_t flags
+        cdef int result
 
-        dt = float(dt)
         map_obj = self._parent.map if self._parent is not None else None
-        self._wade = (self._position.z + _player_height(self._crouch, False)) >= Z_ABOVE_WATERPLANE
-        grounded = _grounded(map_obj, self._position, self._crouch, self._wade)
-        self._airborne = not grounded
-        self._jump_this_frame = (not self._airborne) and self._jump
-
-        if self._jump and grounded:
-            self._velocity.z = self._jump_multiplier * -0.36
-            self._airborne = True
-            grounded = False
-            self._fall_distance = 0.0
-
-        ox, oy = _normalize_xy(self._orientation)
-        sx, sy = self._s.x, self._s.y
-        accel = self._accel_multiplier
-        if (self._crouch and not self._wade) or self._sneak:
-            accel = self._crouch_sneak_multiplier
-        elif self._sprint and not self._burdened:
-            accel = self._sprint_multiplier
-        accel *= dt
-        if self._airborne:
-            accel *= 0.5
-
-        if (self._up or self._down) and (self._left or self._right):
-            accel *= 0.70710677
-
-        if self._up:
-            self._velocity.x += ox * accel
-            self._velocity.y += oy * accel
-        if self._down:
-            self._velocity.x -= ox * accel
-            self._velocity.y -= oy * accel
-        if self._left:
-            self._velocity.x -= sx * accel
-            self._velocity.y -= sy * accel
-        if self._right:
-            self._velocity.x += sx * accel
-            self._velocity.y += sy * accel
-
-        if self._climb_timer > 0.0:
-            self._velocity.x *= self._climb_slowdown
-            self._velocity.y *= self._climb_slowdown
-
-        if not self._wade:
-            gravity_step = dt * _GLOBAL_GRAVITY
-            if self._hover:
-                gravity_step *= 0.75
-            if self._jetpack_active:
-                gravity_step *= 0.05
-            self._velocity.z += gravity_step
-        elif self._crouch:
-            self._velocity.z += ((_GLOBAL_GRAVITY + 1.0) * 0.025) * 0.5
-        else:
-            self._velocity.z = 0.0
-
-        self._velocity.z /= (dt + 1.0)
-        if self._airborne:
-            friction = self._water_friction if (self._wade or self._jetpack_active or self._parachute_active) else 4.0
-        else:
-            friction = self._water_friction if (self._hover or self._jetpack_active) else 2.0
-        divisor = 1.0 + (dt * friction)
-        self._velocity.x /= divisor
-        self._velocity.y /= divisor
-
-        _collide_with_players(self, positions, dt)
-        start_z = self._position.z
-        collided_down = _move_box(
-            self._position,
-            self._velocity,
-            dt,
-            map_obj,
-            self._crouch,
-            self._wade,
-            not self._crouch and self._orientation.z < 0.5,
-        )
-
-        if self._lock_box is not None and len(self._lock_box) == 6:
-            x1, y1, z1, x2, y2, z2 = self._lock_box
-            self._position.x = min(max(self._position.x, x1), x2)
-            self._position.y = min(max(self._position.y, y1), y2)
-            self._position.z = min(max(self._position.z, z1), z2)
-
-        if self._position.z > start_z:
-            self._fall_distance += self._position.z - start_z
-        elif self._position.z < start_z - 0.1:
-            self._fall_distance = 0.0
-
-        self._climb_timer = max(0.0, self._climb_timer - dt)
-        self._wade = (self._position.z + _player_height(self._crouch, False)) >= Z_ABOVE_WATERPLANE
-        landed = collided_down or _grounded(map_obj, self._position, self._crouch, self._wade)
-        damage = 0.0
-        if landed:
-            self._airborne = False
-            if self._fall_distance > self._fall_min_distance:
-                span = max(1e-6, self._fall_max_distance - self._fall_min_distance)
-                ratio = min(1.0, (self._fall_distance - self._fall_min_distance) / span)
-                damage = ratio * self._fall_max_damage
-                if self._wade:
-                    damage *= self._fall_on_water_multiplier
-            self._fall_distance = 0.0
-        else:
-            self._airborne = True
+        bits = _map_bits(map_obj)
+        _fill_rules(&rules)
+        _pack_player(self, position, velocity, orientation, strafe, &flags, timers, params, lock)
+        result = _row_prepare(bits, &rules, position, velocity, orientation, strafe, &flags, timers, params, dt, &height, invalid)
+        if result == 0:
+            if others != NULL:
+                _push_rows(position[0], position[1], position[2], height, velocity, others, count, skip, dt)
+            elif positions:
+                _unpack_player(self, position, velocity, flags, timers)
+                _collide_with_players(self, positions, dt)
+                velocity[0] = self._velocity.x
+                velocity[1] = self._velocity.y
+                velocity[2] = self._velocity.z
+            result = _row_move(bits, &rules, position, velocity, orientation, &flags, timers, params, lock, height, dt, &damage, invalid)
+        _unpack_player(self, position, velocity, flags, timers)
+        if result < 0:
+            _raise_step_error(result, invalid)
 
         if damage == 0.0:
             return 0
         return damage
 
 
+cdef inline void _mark_rows_stale(Player player) noexcept:
+    # The player moved or came back outside a World step; the next proximity
+    # query reloads the rows instead of reusing the last filing.
+    if player._parent is not None:
+        (<World>player._parent)._player_array._stale = True
+
+
+cdef inline void _fill_rules(_PlayerRules* rules) noexcept:
+    rules.radius = _PLAYER_RADIUS
+    rules.height = _PLAYER_HEIGHT
+    rules.crouch_height = _PLAYER_CROUCH_HEIGHT
+    rules.water_z = Z_ABOVE_WATERPLANE
+    rules.gravity = _GLOBAL_GRAVITY
+
+
+cdef int _pack_player(
+    Player player,
+    double* position,
+    double* velocity,
+    double* orientation,
+    double* strafe,
+    uint32_t* flags,
+    double* timers,
+    double* params,
+    double* lock,
+) except -1:
+    # Copies a Player into one row of step state.
+    cdef Vector3 position_vector = <Vector3?>player._position
+    cdef Vector3 velocity_vector = <Vector3?>player._velocity
+    cdef Vector3 orientation_vector = <Vector3?>player._orientation
+    cdef Vector3 strafe_vector = <Vector3?>player._s
+    cdef uint32_t state = 0
+    cdef int axis
+
+    position[0] = position_vector._x
+    position[1] = position_vector._y
+    position[2] = position_vector._z
+    velocity[0] = velocity_vector._x
+    velocity[1] = velocity_vector._y
+    velocity[2] = velocity_vector._z
+    orientation[0] = orientation_vector._x
+    orientation[1] = orientation_vector._y
+    orientation[2] = orientation_vector._z
+    strafe[0] = strafe_vector._x
+    strafe[1] = strafe_vector._y
+    timers[0] = player._climb_timer
+    timers[1] = player._fall_distance
+    params[0] = player._accel_multiplier
+    params[1] = player._sprint_multiplier
+    params[2] = player._crouch_sneak_multiplier
+    params[3] = player._jump_multiplier
+    params[4] = player._water_friction
+    params[5] = player._fall_min_distance
+    params[6] = player._fall_max_distance
+    params[7] = player._fall_max_damage
+    params[8] = player._fall_on_water_multiplier
+    params[9] = player._climb_slowdown
+    if player._lock_box is not None and len(player._lock_box) == 6:
+        for axis in range(6):
+            lock[axis] = player._lock_box[axis]
+        state |= PLAYER_LOCKED
+    if player._up:
+        state |= PLAYER_UP
+    if player._down:
+        state |= PLAYER_DOWN
+    if player._left:
+        state |= PLAYER_LEFT
+    if player._right:
+        state |= PLAYER_RIGHT
+    if player._jump:
+        state |= PLAYER_JUMP
+    if player._crouch:
+        state |= PLAYER_CROUCH
+    if player._sneak:
+        state |= PLAYER_SNEAK
+    if player._sprint:
+        state |= PLAYER_SPRINT
+    if player._burdened:
+        state |= PLAYER_BURDENED
+    if player._hover:
+        state |= PLAYER_HOVER
+    if player._jetpack_active:
+        state |= PLAYER_JETPACK_ACTIVE
+    if player._parachute_active:
+        state |= PLAYER_PARACHUTE_ACTIVE
+    if player._wade:
+        state |= PLAYER_WADE
+    if player._airborne:
+        state |= PLAYER_AIRBORNE | PLAYER_WAS_AIRBORNE
+    if player._jump_this_frame:
+        state |= PLAYER_JUMP_THIS_FRAME
+    flags[0] = state
+    return 0
+
+
+cdef int _unpack_player(
+    Player player,
+    const double* position,
+    const double* velocity,
+    uint32_t flags,
+    const double* timers,
+) except -1:
+    # Writes the stepped parts of a row back; the vectors are updated in place.
+    cdef Vector3 position_vector = <Vector3>player._position
+    cdef Vector3 velocity_vector = <Vector3>player._velocity
+
+    position_vector._x = position[0]
+    position_vector._y = position[1]
+    position_vector._z = position[2]
+    velocity_vector._x = velocity[0]
+    velocity_vector._y = velocity[1]
+    velocity_vector._z = velocity[2]
+    player._climb_timer = timers[0]
+    player._fall_distance = timers[1]
+    player._wade = (flags & PLAYER_WADE) != 0
+    player._airborne = (flags & PLAYER_AIRBORNE) != 0
+    player._jump_this_frame = (flags & PLAYER_JUMP_THIS_FRAME) != 0
+    return 0
+
+
+cdef int _raise_step_error(int result, const double* invalid) except -1:
+    # The errors the attribute-based step raised at the same point.
+    if result == STEP_ZERO_DIVISION:
+        raise ZeroDivisionError("float division by zero")
+    _check_finite(invalid[0])
+    _check_finite(invalid[1])
+    _check_finite(invalid[2])
+    return 0
+
+
+cdef int _row_prepare(
+    const uint8_t* bits,
+    const _PlayerRules* rules,
+    const double* position,
+    double* velocity,
+    const double* orientation,
+    const double* strafe,
+    uint32_t* flags,
+    double* timers,
+    const double* params,
+    double dt,
+    double* height,
+    double* invalid,
+) noexcept nogil:
+    # First half of a player step, up to the player push: ground check,
+    # jump, input acceleration, gravity and friction. State flags are
+    # updated as the step goes, so a failing row is left as far along as the
+    # step got. Returns STEP_NOT_FINITE (with the offending values in
+    # `invalid`, in check order) or STEP_ZERO_DIVISION where it cannot go on.
+    cdef uint32_t state = flags[0]
+    cdef bint crouch = (state & PLAYER_CROUCH) != 0
+    cdef bint wade
+    cdef bint grounded
+    cdef bint airborne
+    cdef double ox
+    cdef double oy
+    cdef double mag
+    cdef double accel
+    cdef double gravity_step
+    cdef double friction
+    cdef double divisor
+
+    wade = (position[2] + (rules.crouch_height if crouch else rules.height)) >= rules.water_z
+    state = (state & ~PLAYER_WADE) | (PLAYER_WADE if wade else 0)
+    flags[0] = state
+    if not (isfinite(position[0]) and isfinite(position[1]) and isfinite(position[2])):
+        invalid[0] = position[2]
+        invalid[1] = position[0]
+        invalid[2] = position[1]
+        return STEP_NOT_FINITE
+    height[0] = rules.crouch_height if crouch and not wade else rules.height
+    grounded = _box_grounded(bits, position[0], position[1], position[2], rules.radius, height[0])
+    airborne = not grounded
+    state &= ~(PLAYER_AIRBORNE | PLAYER_JUMP_THIS_FRAME)
+    if (not airborne) and (state & PLAYER_JUMP):
+        state |= PLAYER_JUMP_THIS_FRAME
+
+    if (state & PLAYER_JUMP) and grounded:
+        velocity[2] = params[3] * -0.36
+        airborne = True
+        grounded = False
+        timers[1] = 0.0
+    if airborne:
+        state |= PLAYER_AIRBORNE
+    flags[0] = state
+
+    mag = sqrt((orientation[0] * orientation[0]) + (orientation[1] * orientation[1]))
+    if mag <= 0.0:
+        ox, oy = 0.0, 0.0
+    else:
+        ox = orientation[0] / mag
+        oy = orientation[1] / mag
+    accel = params[0]
+    if (crouch and not wade) or (state & PLAYER_SNEAK):
+        accel = params[2]
+    elif (state & PLAYER_SPRINT) and not (state & PLAYER_BURDENED):
+        accel = params[1]
+    accel *= dt
+    if airborne:
+        accel *= 0.5
+
+    if (state & (PLAYER_UP | PLAYER_DOWN)) and (state & (PLAYER_LEFT | PLAYER_RIGHT)):
+        accel *= 0.70710677
+
+    if state & PLAYER_UP:
+        velocity[0] += ox * accel
+        velocity[1] += oy * accel
+    if state & PLAYER_DOWN:
+        velocity[0] -= ox * accel
+        velocity[1] -= oy * accel
+    if state & PLAYER_LEFT:
+        velocity[0] -= strafe[0] * accel
+        velocity[1] -= strafe[1] * accel
+    if state & PLAYER_RIGHT:
+        velocity[0] += strafe[0] * accel
+        velocity[1] += strafe[1] * accel
+
+    if timers[0] > 0.0:
+        velocity[0] *= params[9]
+        velocity[1] *= params[9]
+
+    if not wade:
+        gravity_step = dt * rules.gravity
+        if state & PLAYER_HOVER:
+            gravity_step *= 0.75
+        if state & PLAYER_JETPACK_ACTIVE:
+            gravity_step *= 0.05
+        velocity[2] += gravity_step
+    elif crouch:
+        velocity[2] += ((rules.gravity + 1.0) * 0.025) * 0.5
+    else:
+        velocity[2] = 0.0
+
+    if dt + 1.0 == 0.0:
+        return STEP_ZERO_DIVISION
+    velocity[2] /= (dt + 1.0)
+    if airborne:
+        friction = params[4] if (wade or (state & (PLAYER_JETPACK_ACTIVE | PLAYER_PARACHUTE_ACTIVE))) else 4.0
+    else:
+        friction = params[4] if (state & (PLAYER_HOVER | PLAYER_JETPACK_ACTIVE)) else 2.0
+    divisor = 1.0 + (dt * friction)
+    if divisor == 0.0:
+        return STEP_ZERO_DIVISION
+    velocity[0] /= divisor
+    velocity[1] /= divisor
+    return 0
+
+
+cdef int _row_move(
+    const uint8_t* bits,
+    const _PlayerRules* rules,
+    double* position,
+    double* velocity,
+    const double* orientation,
+    uint32_t* flags,
+    double* timers,
+    const double* params,
+    const double* lock,
+    double height,
+    double dt,
+    double* damage,
+    double* invalid,
+) noexcept nogil:
+    # Second half of a player step, after the player push: box sweep, lock
+    # box, fall distance, landing and fall damage. Failures are reported
+    # like _row_prepare's.
+    cdef uint32_t state = flags[0]
+    cdef bint crouch = (state & PLAYER_CROUCH) != 0
+    cdef bint wade
+    cdef bint landed
+    cdef double box[6]
+    cdef double start_z = position[2]
+    cdef double value
+    cdef double span
+    cdef double ratio
+    cdef int moved
+    cdef int axis
+
+    box[0] = position[0]
+    box[1] = position[1]
+    box[2] = position[2]
+    box[3] = velocity[0]
+    box[4] = velocity[1]
+    box[5] = velocity[2]
+    moved = _move_state(bits, box, dt, rules.radius, height, not crouch and orientation[2] < 0.5, invalid)
+    position[0] = box[0]
+    position[1] = box[1]
+    position[2] = box[2]
+    velocity[0] = box[3]
+    velocity[1] = box[4]
+    velocity[2] = box[5]
+    if moved < 0:
+        return STEP_NOT_FINITE
+
+    if state & PLAYER_LOCKED:
+        # min(max(value, low), high) with Python's NaN behaviour.
+        for axis in range(3):
+            value = position[axis]
+            if lock[axis] > value:
+                value = lock[axis]
+            if lock[axis + 3] < value:
+                value = lock[axis + 3]
+            position[axis] = value
+
+    if position[2] > start_z:
+        timers[1] += position[2] - start_z
+    elif position[2] < start_z - 0.1:
+        timers[1] = 0.0
+
+    value = timers[0] - dt
+    timers[0] = value if value > 0.0 else 0.0
+    wade = (position[2] + (rules.crouch_height if crouch else rules.height)) >= rules.water_z
+    state = (state & ~PLAYER_WADE) | (PLAYER_WADE if wade else 0)
+    flags[0] = state
+    if moved == 1:
+        landed = True
+    else:
+        if not (isfinite(position[0]) and isfinite(position[1]) and isfinite(position[2])):
+            invalid[0] = position[2]
+            invalid[1] = position[0]
+            invalid[2] = position[1]
+            return STEP_NOT_FINITE
+        landed = _box_grounded(
+            bits,
+            position[0],
+            position[1],
+            position[2],
+            rules.radius,
+            rules.crouch_height if crouch and not wade else rules.height,
+        )
+    damage[0] = 0.0
+    if landed:
+        state &= ~PLAYER_AIRBORNE
+        if timers[1] > params[5]:
+            span = params[6] - params[5]
+            if not span > 1e-6:
+                span = 1e-6
+            ratio = (timers[1] - params[5]) / span
+            if not ratio < 1.0:
+                ratio = 1.0
+            damage[0] = ratio * params[7]
+            if wade:
+                damage[0] *= params[8]
+        timers[1] = 0.0
+    else:
+        state |= PLAYER_AIRBORNE
+    flags[0] = state
+    return 0
+
+
+cdef int _step_player_row(
+    const uint8_t* bits,
+    const _PlayerRules* rules,
+    double* position,
+    double* velocity,
+    const double* orientation,
+    const double* strafe,
+    uint32_t* flags,
+    double* timers,
+    const double* params,
+    const double* lock,
+    const _PlayerGrid* grid,
+    Py_ssize_t row,
+    double dt,
+    double* damage,
+) noexcept nogil:
+    # Player._advance on one PlayerArray row, pushing against the grid.
+    # Returns a negative value, leaving the row half stepped, wherever the
+    # step would raise; the caller replays that player through
+    # Player._advance from its untouched attributes.
+    cdef double invalid[3]
+    cdef double height = 0.0
+    cdef int result
+
+    if flags[0] & PLAYER_FOREIGN:
+        return -1
+    result = _row_prepare(bits, rules, position, velocity, orientation, strafe, flags, timers, params, dt, &height, invalid)
+    if result < 0:
+        return result
+    _push_grid(
+        position[0],
+        position[1],
+        position[2],
+        height,
+        velocity,
+        grid.others,
+        grid.cell_start,
+        grid.cell_rows,
+        grid.found,
+        row,
+        dt,
+    )
+    return _row_move(bits, rules, position, velocity, orientation, flags, timers, params, lock, height, dt, damage, invalid)
+
+
+cdef class PlayerArray:
+    """Structure-of-arrays state for the players a World steps natively.
+
+    Each row holds one live `Player`: position, velocity and orientation as
+    float64 triples, the strafe vector, input and state bits, timers and
+    movement multipliers. Rows are loaded from the `Player` objects before
+    every step and written back after it, so the objects stay the API and
+    changes made between ticks are picked up.
+    """
+
+    cdef list _players
+    cdef Py_ssize_t _count
+    cdef Py_ssize_t _capacity
+    cdef bint _stale
+    cdef bint _unfiled
+    cdef bytearray _positions_buf
+    cdef bytearray _velocities_buf
+    cdef bytearray _orientations_buf
+    cdef bytearray _strafe_buf
+    cdef bytearray _flags_buf
+    cdef bytearray _timers_buf
+    cdef bytearray _params_buf
+    cdef bytearray _lock_buf
+    cdef bytearray _others_buf
+    cdef bytearray _damage_buf
+    cdef bytearray _cell_start_buf
+    cdef bytearray _cell_rows_buf
+    cdef bytearray _found_buf
+    cdef double* _positions
+    cdef double* _velocities
+    cdef double* _orientations
+    cdef double* _strafe
+    cdef uint32_t* _flags
+    cdef double* _timers
+    cdef double* _params
+    cdef double* _lock
+    cdef double* _others
+    cdef double* _damage
+    cdef uint32_t* _cell_start
+    cdef uint32_t* _cell_rows
+    cdef uint32_t* _found
+
+    def __init__(self):
+        self._players = []
+        self._count = 0
+        self._capacity = 0
+        self._stale = True
+        self._unfiled = False
+        self._cell_start_buf = bytearray((GRID_CELLS + 1) * sizeof(uint32_t))
+        self._cell_start = <uint32_t*>PyByteArray_AS_STRING(self._cell_start_buf)
+        self._reserve(0)
+
+    def __len__(self):
+        return self._count
+
+    property players:
+        def __get__(self):
+            return list(self._players)
+
+    property positions:
+        def __get__(self):
+            return self._rows(self._positions_buf, 3)
+
+    property velocities:
+        def __get__(self):
+            return self._rows(self._velocities_buf, 3)
+
+    property orientations:
+        def __get__(self):
+            return self._rows(self._orientations_buf, 3)
+
+    property flags:
+        def __get__(self):
+            return memoryview(self._flags_buf)[:self._count * sizeof(uint32_t)].cast("I").toreadonly()
+
+    cdef object _rows(self, bytearray data, int width):
+        view = memoryview(data)[:self._count * width * sizeof(double)]
+        if not self._count:
+            return view.cast("d").toreadonly()
+        return view.cast("d", (self._count, width)).toreadonly()
+
+    cdef void _reserve(self, Py_ssize_t count):
+        # Fresh buffers rather than resizing, so views handed out earlier
+        # keep their old rows instead of blocking the growth.
+        if count <= self._capacity and self._positions_buf is not None:
+            return
+        self._capacity = max(count, self._capacity * 2, 16)
+        self._positions_buf = bytearray(self._capacity * 3 * sizeof(double))
+        self._velocities_buf = bytearray(self._capacity * 3 * sizeof(double))
+        self._orientations_buf = bytearray(self._capacity * 3 * sizeof(double))
+        self._strafe_buf = bytearray(self._capacity * 2 * sizeof(double))
+        self._flags_buf = bytearray(self._capacity * sizeof(uint32_t))
+        self._timers_buf = bytearray(self._capacity * 2 * sizeof(double))
+        self._params_buf = bytearray(self._capacity * PLAYER_PARAMS * sizeof(double))
+        self._lock_buf = bytearray(self._capacity * 6 * sizeof(double))
+        self._others_buf = bytearray(self._capacity * 4 * sizeof(double))
+        self._damage_buf = bytearray(self._capacity * sizeof(double))
+        self._cell_rows_buf = bytearray(self._capacity * sizeof(uint32_t))
+        self._found_buf = bytearray(self._capacity * sizeof(uint32_t))
+        self._positions = <double*>PyByteArray_AS_STRING(self._positions_buf)
+        self._velocities = <double*>PyByteArray_AS_STRING(self._velocities_buf)
+        self._orientations = <double*>PyByteArray_AS_STRING(self._orientations_buf)
+        self._strafe = <double*>PyByteArray_AS_STRING(self._strafe_buf)
+        self._flags = <uint32_t*>PyByteArray_AS_STRING(self._flags_buf)
+        self._timers = <double*>PyByteArray_AS_STRING(self._timers_buf)
+        self._params = <double*>PyByteArray_AS_STRING(self._params_buf)
+        self._lock = <double*>PyByteArray_AS_STRING(self._lock_buf)
+        self._others = <double*>PyByteArray_AS_STRING(self._others_buf)
+        self._damage = <double*>PyByteArray_AS_STRING(self._damage_buf)
+        self._cell_rows = <uint32_t*>PyByteArray_AS_STRING(self._cell_rows_buf)
+        self._found = <uint32_t*>PyByteArray_AS_STRING(self._found_buf)
+
+    cdef int _load(self, list players, World world) except -1:
+        cdef Py_ssize_t index
+        cdef Player player
+        cdef double* other
+
+        self._reserve(len(players))
+        self._players = players
+        self._count = len(players)
+        for index in range(self._count):
+            player = <Player>players[index]
+            self._load_row(index, player, world)
+            other = self._others + (index * 4)
+            other[0] = self._positions[index * 3]
+            other[1] = self._positions[index * 3 + 1]
+            other[2] = self._positions[index * 3 + 2]
+            other[3] = _player_height(player._crouch, player._wade)
+        self._file_rows()
+        self._stale = False
+        self._unfiled = False
+        return 0
+
+    cdef int _refresh(self, World world) except -1:
+        # Brings the grid up to date for a proximity query: a full reload
+        # after a move outside World.update, a re-filing after a step (whose
+        # rows already hold the stepped positions), otherwise nothing.
+        if self._stale:
+            self._load(_live_players(world), world)
+        elif self._unfiled:
+            self._file_rows()
+            self._unfiled = False
+        return 0
+
+    cdef void _file_rows(self) noexcept:
+        # Counting sort of the rows into the XY grid by their loaded position;
+        # each cell keeps its rows in index order. Non-finite rows are left
+        # out, they can never be pushed against or matched.
+        cdef Py_ssize_t index
+        cdef int cell
+        cdef uint32_t* start = self._cell_start
+        cdef const double* position
+
+        memset(start, 0, (GRID_CELLS + 1) * sizeof(uint32_t))
+        for index in range(self._count):
+            position = self._positions + (index * 3)
+            if isfinite(position[0]) and isfinite(position[1]):
+                start[_grid_cell(position[0]) + (_grid_cell(position[1]) * GRID_SIZE) + 1] += 1
+        for cell in range(GRID_CELLS):
+            start[cell + 1] += start[cell]
+        for index in range(self._count):
+            position = self._positions + (index * 3)
+            if isfinite(position[0]) and isfinite(position[1]):
+                cell = _grid_cell(position[0]) + (_grid_cell(position[1]) * GRID_SIZE)
+                self._cell_rows[start[cell]] = <uint32_t>index
+                start[cell] += 1
+        # Filing advanced every start to the next cell's; shift them back.
+        memmove(start + 1, start, GRID_CELLS * sizeof(uint32_t))
+        start[0] = 0
+
+    cdef list _query(self, double x1, double y1, double z1, double x2, double y2, double z2, double radius):
+        # Live players whose loaded position lies in the box, and within
+        # `radius` of the box centre unless radius is negative.
+        cdef double cx = (x1 + x2) * 0.5
+        cdef double cy = (y1 + y2) * 0.5
+        cdef double cz = (z1 + z2) * 0.5
+        cdef double dx
+        cdef double dy
+        cdef double dz
+        cdef const double* position
+        cdef Py_ssize_t count
+        cdef Py_ssize_t k
+        cdef Player player
+        cdef list result = []
+
+        count = _grid_rows(self._cell_start, self._cell_rows, x1, y1, x2, y2, -1, -1, self._found)
+        for k in range(count):
+            position = self._positions + (self._found[k] * 3)
+            if not (
+                x1 <= position[0] <= x2
+                and y1 <= position[1] <= y2
+                and z1 <= position[2] <= z2
+            ):
+                continue
+            if radius >= 0.0:
+                dx = position[0] - cx
+                dy = position[1] - cy
+                dz = position[2] - cz
+                if (dx * dx) + (dy * dy) + (dz * dz) > radius * radius:
+                    continue
+            player = <Player>self._players[self._found[k]]
+            if player._alive and not player._deleted:
+                result.append(player)
+        return result
+
+    cdef int _load_row(self, Py_ssize_t index, Player player, World world) except -1:
+        _pack_player(
+            player,
+            self._positions + (index * 3),
+            self._velocities + (index * 3),
+            self._orientations + (index * 3),
+            self._strafe + (index * 2),
+            self._flags + index,
+            self._timers + (index * 2),
+            self._params + (index * PLAYER_PARAMS),
+            self._lock + (index * 6),
+        )
+        if player._parent is not world:
+            self._flags[index] |= PLAYER_FOREIGN
+        return 0
+
+    cdef Py_ssize_t _step(self, const uint8_t* bits, const _PlayerRules* rules, double dt, Py_ssize_t start) noexcept nogil:
+        # Steps rows from start on; returns the first row that has to go
+        # through Player._advance, or the row count.
+        cdef Py_ssize_t index
+        cdef _PlayerGrid grid
+
+        grid.others = self._others
+        grid.cell_start = self._cell_start
+        grid.cell_rows = self._cell_rows
+        grid.found = self._found
+
+        for index in range(start, self._count):
+            if _step_player_row(
+                bits,
+                rules,
+                self._positions + (index * 3),
+                self._velocities + (index * 3),
+                self._orientations + (index * 3),
+                self._strafe + (index * 2),
+                self._flags + index,
+                self._timers + (index * 2),
+                self._params + (index * PLAYER_PARAMS),
+                self._lock + (index * 6),
+                &grid,
+                index,
+                dt,
+                self._damage + index,
+            ) < 0:
+                return index
+        return self._count
+
+    cdef int _store(self, Py_ssize_t start, Py_ssize_t stop, list events) except -1:
+        cdef Py_ssize_t index
+        cdef Player player
+        cdef uint32_t state
+
+        for index in range(start, stop):
+            player = <Player>self._players[index]
+            state = self._flags[index]
+            _unpack_player(
+                player,
+                self._positions + (index * 3),
+                self._velocities + (index * 3),
+                state,
+                self._timers + (index * 2),
+            )
+            if (state & PLAYER_WAS_AIRBORNE) and not player._airborne:
+                events.append(("land", player, None))
+            if self._damage[index] != 0.0:
+                events.append(("damage", player, self._damage[index]))
+        return 0
+
+    cdef int _advance(self, World world, double dt, list events) except -1:
+        # One step for every row: native rows in one pass, the rare row that
+        # must raise or lives in another world through Player._advance.
+        cdef _PlayerRules rules
+        cdef const uint8_t* bits = _map_bits(world._map)
+        cdef Py_ssize_t start = 0
+        cdef Py_ssize_t stop
+        cdef Player player
+        cdef bint was_airborne
+
+        _fill_rules(&rules)
+        while start < self._count:
+            with nogil:
+                stop = self._step(bits, &rules, dt, start)
+            self._store(start, stop, events)
+            if stop == self._count:
+                break
+            player = <Player>self._players[stop]
+            was_airborne = player._airborne
+            damage = player._advance(dt, None, self._others, self._count, stop)
+            if was_airborne and not player._airborne:
+                events.append(("land", player, None))
+            if damage:
+                events.append(("damage", player, damage))
+            self._load_row(stop, player, world)
+            start = stop + 1
+        return 0
+
+
 cdef class PlayerMovementHistory:
     cdef public int loop_count
     cdef object _position
@@ -1322,3 +2630,77 @@ cdef class Debris(Object):
     def update(self, dt, players):
         self._velocity.z += _GLOBAL_GRAVITY * float(dt)
         return 0
+
+
+cdef bint _is_deleted(object obj):
+    if isinstance(obj, Object):
+        return (<Object>obj)._deleted
+    return bool(getattr(obj, "deleted", False))
+
+
+cdef list _live_players(World world):
+    return [
+        obj
+        for obj in world._objects
+        if type(obj) is Player and (<Player>obj)._alive and not (<Player>obj)._deleted
+    ]
+
+
+cdef list _step_world(World world, double step, int steps):
+    # Objects are split by exact type once per call so each step runs one
+    # loop per kind; subclasses go through their own update().
+    cdef list players = []
+    cdef list grenades = []
+    cdef list blocks = []
+    cdef list debris = []
+    cdef list others = []
+    cdef list events = []
+    cdef list alive
+    cdef Grenade grenade
+    cdef double fuse
+    cdef int tick
+
+    for obj in world._objects:
+        if _is_deleted(obj):
+            continue
+        kind = type(obj)
+        if kind is Player:
+            players.append(obj)
+        elif kind is Grenade:
+            grenades.append(obj)
+        elif kind is FallingBlocks:
+            blocks.append(obj)
+        elif kind is Debris:
+            debris.append(obj)
+        else:
+            others.append(obj)
+
+    for tick in range(steps):
+        alive = [obj for obj in players if (<Player>obj)._alive and not (<Player>obj)._deleted]
+        world._player_array._load(alive, world)
+        world._player_array._advance(world, step, events)
+        world._player_array._unfiled = True
+
+        for obj in grenades:
+            grenade = <Grenade>obj
+            if grenade._deleted:
+                continue
+            fuse = grenade._fuse - step
+            grenade._fuse = fuse if fuse > 0.0 else 0.0
+            grenade._velocity.z += _GLOBAL_GRAVITY * step
+            if grenade._fuse <= 0.0:
+                events.append(("fuse", grenade, None))
+                grenade.delete()
+
+        for obj in blocks:
+            if not (<FallingBlocks>obj)._deleted:
+                (<FallingBlocks>obj)._velocity.z += _GLOBAL_GRAVITY * step
+        for obj in debris:
+            if not (<Debris>obj)._deleted:
+                (<Debris>obj)._velocity.z += _GLOBAL_GRAVITY * step
+        for obj in others:
+            if not _is_deleted(obj):
+                obj.update(step, players)
+
+    world._objects = [obj for obj in world._objects if not _is_deleted(obj)]
+    return events
@@ -0,0 +1,425 @@
+"""
+VXL performance benchmarks.
+
+Run against the Python 3 restoration:
+    py .\tests\bench_vxl.py
+"""
+
+import array
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MAPS_DIR = os.path.join(PROJECT_ROOT, "maps")
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import aoslib.kv6 as kv6
+import aoslib.vxl as vxl
+
+
+LOAD_ROUNDS = 5
+GENERATE_ROUNDS = 5
+GENERATE_EDITS = 100
+COMPRESS_ROUNDS = 3
+BATCH_ROUNDS = 5
+COMPRESS_MAP = "CityOfChicago.vxl"
+FLOATING_ROUNDS = 3
+FLOATING_MAP = "CastleWars.vxl"
+PREFAB_ROUNDS = 5
+SNAPSHOT_ROUNDS = 5
+SNAPSHOT_EDITS = 3000
+JOIN_CLIENTS = 10
+REGION_ROUNDS = 5
+REGION_SIZE = 32
+CHUNK_ROUNDS = 5
+CHECKSUM_ROUNDS = 5
+PREFAB_PATH = os.path.join(PROJECT_ROOT, "prefab.kv6")
+
+
+def map_paths():
+    return sorted(glob.glob(os.path.join(MAPS_DIR, "*.vxl")))
+
+
+def best_of(rounds, func):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000.0
+
+
+def bench_load():
+    print("-- map load (best of %d) --" % LOAD_ROUNDS)
+    for path in map_paths():
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        elapsed = best_of(LOAD_ROUNDS, lambda: vxl.VXL(-1, raw, len(raw), 2))
+        print("%-20s %8.2f ms" % (os.path.basename(path), elapsed))
+
+
+def bench_threaded_load():
+    path = os.path.join(MAPS_DIR, COMPRESS_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    cpus = os.cpu_count() or 1
+    print("-- %s load by thread count (best of %d, %d CPUs) --" % (COMPRESS_MAP, LOAD_ROUNDS, cpus))
+    for threads in sorted(set([1, 2, 4, cpus])):
+        elapsed = best_of(LOAD_ROUNDS, lambda: vxl.VXL(-1, raw, len(raw), 2, threads=threads))
+        print("%-20s %8.2f ms" % ("threads=%d" % threads, elapsed))
+
+
+def bench_generate():
+    print("-- generate_vxl after %d edits (best of %d) --" % (GENERATE_EDITS, GENERATE_ROUNDS))
+    for path in map_paths():
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        map_obj = vxl.VXL(-1, raw, len(raw), 2)
+
+        def edit_and_generate():
+            for index in range(GENERATE_EDITS):
+                map_obj.set_point(128 + index, 256, 200, 0x7F000000 | index)
+            map_obj.generate_vxl(False)
+
+        elapsed = best_of(GENERATE_ROUNDS, edit_and_generate)
+        print("%-20s %8.2f ms" % (os.path.basename(path), elapsed))
+
+
+def bench_overview():
+    print("-- get_overview after %d edits (best of %d) --" % (GENERATE_EDITS, GENERATE_ROUNDS))
+    for path in map_paths():
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        map_obj = vxl.VXL(-1, raw, len(raw), 2)
+        map_obj.get_overview()
+
+        def edit_and_draw():
+            for index in range(GENERATE_EDITS):
+                map_obj.set_point(128 + index, 256, 200, 0x7F000000 | index)
+            map_obj.get_overview()
+
+        elapsed = best_of(GENERATE_ROUNDS, edit_and_draw)
+        print("%-20s %8.2f ms" % (os.path.basename(path), elapsed))
+
+
+def bench_batch():
+    path = map_paths()[0]
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    crater = [(x, y, z) for x in range(248, 256) for y in range(248, 256) for z in range(180, 240)]
+    crater_buffer = array.array("i", [value for point in crater for value in point])
+    print("-- %d-voxel crater on %s (best of %d) --" % (len(crater), os.path.basename(path), BATCH_ROUNDS))
+
+    def single_edits():
+        map_obj = vxl.VXL(-1, raw, len(raw), 2)
+        start = time.perf_counter()
+        for x, y, z in crater:
+            map_obj.remove_point(x, y, z)
+        return time.perf_counter() - start
+
+    def batch_edits():
+        map_obj = vxl.VXL(-1, raw, len(raw), 2)
+        start = time.perf_counter()
+        map_obj.remove_points(crater_buffer)
+        return time.perf_counter() - start
+
+    for label, func in (("remove_point", single_edits), ("remove_points", batch_edits)):
+        elapsed = min(func() for _ in range(BATCH_ROUNDS)) * 1000.0
+        print("%-20s %8.2f ms" % (label, elapsed))
+
+
+def bench_compress():
+    path = os.path.join(MAPS_DIR, COMPRESS_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    cpus = os.cpu_count() or 1
+    print("-- generate_vxl(compress=True, level=6) on %s, %d CPU(s) (best of %d) --" % (COMPRESS_MAP, cpus, COMPRESS_ROUNDS))
+    for threads in sorted(set([1, 2, 4, cpus])):
+        elapsed = best_of(COMPRESS_ROUNDS, lambda: map_obj.generate_vxl(True, 6, threads))
+        size = len(map_obj.generate_vxl(True, 6, threads))
+        print("%2d thread(s) %8.2f ms %8.1f MB/s %9d bytes" % (
+            threads,
+            elapsed,
+            len(raw) / (elapsed * 1000.0),
+            size,
+        ))
+
+
+def bench_floating():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    # A 3x3 tunnel through the solid castle foundation, checked voxel by voxel.
+    tunnel = [(x, y, z) for y in range(30, 76) for x in range(75, 78) for z in range(200, 203)]
+    print("-- check_only while digging %d voxels on %s (best of %d) --" % (len(tunnel), FLOATING_MAP, FLOATING_ROUNDS))
+    result = {}
+
+    def dig():
+        map_obj = vxl.VXL(-1, raw, len(raw), 2)
+        checks = 0
+        floating = 0
+        elapsed = 0.0
+        worst = 0.0
+        for x, y, z in tunnel:
+            if not map_obj.get_solid(x, y, z):
+                continue
+            map_obj.remove_point(x, y, z)
+            start = time.perf_counter()
+            found = map_obj.check_only(x, y, z)
+            spent = time.perf_counter() - start
+            elapsed += spent
+            worst = max(worst, spent)
+            checks += 1
+            if found:
+                floating += len(found)
+                map_obj.clear_checked_geometry()
+        result["checks"] = checks
+        result["floating"] = floating
+        result["worst"] = worst
+        return elapsed
+
+    elapsed = min(dig() for _ in range(FLOATING_ROUNDS)) * 1000.0
+    print("%6d checks %8.2f ms %8.4f ms/check %8.4f ms worst %6d floating voxels" % (
+        result["checks"],
+        elapsed,
+        elapsed / max(result["checks"], 1),
+        result["worst"] * 1000.0,
+        result["floating"],
+    ))
+
+
+def bench_prefab():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path) or not os.path.exists(PREFAB_PATH):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    # prefab.kv6 grown into a 32x32x8 UGC-sized slab.
+    prefab = kv6.KV6(PREFAB_PATH, False, load_display=False, invscale=1)
+    prefab.add_points([(x, y, z, 90, 120, 60) for x in range(32) for y in range(32) for z in range(8)])
+    voxels = prefab.get_points().shape[0]
+    print("-- %d-voxel prefab on %s (best of %d) --" % (voxels, FLOATING_MAP, PREFAB_ROUNDS))
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+
+    def place():
+        map_obj.place_prefab_in_world(prefab, 256, 256, 150, 0, 0, 1)
+
+    def touches():
+        map_obj.get_prefab_touches_world(prefab, 256, 256, 150, 0, 0, 1)
+
+    def erase():
+        map_obj.erase_prefab_from_world(prefab, 256, 256, 150, 0, 0, 1)
+
+    def stamp_and_erase():
+        place()
+        erase()
+
+    for label, func in (
+        ("touches", touches),
+        ("place + erase", stamp_and_erase),
+    ):
+        elapsed = best_of(PREFAB_ROUNDS, func)
+        print("%-20s %8.3f ms" % (label, elapsed))
+
+
+def bench_snapshot():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    edits = [(100 + index * 37 % 200, 100 + index * 53 % 200, 150 + index % 90) for index in range(SNAPSHOT_EDITS)]
+    print("-- round reset after %d edits on %s (best of %d) --" % (SNAPSHOT_EDITS, FLOATING_MAP, SNAPSHOT_ROUNDS))
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    snapshot = map_obj.snapshot()
+
+    def reload():
+        start = time.perf_counter()
+        vxl.VXL(-1, raw, len(raw), 2)
+        return time.perf_counter() - start
+
+    def restore():
+        for x, y, z in edits:
+            map_obj.remove_point(x, y, z)
+        start = time.perf_counter()
+        map_obj.restore(snapshot)
+        return time.perf_counter() - start
+
+    for label, func in (
+        ("reload", reload),
+        ("restore", restore),
+    ):
+        elapsed = min(func() for _ in range(SNAPSHOT_ROUNDS)) * 1000.0
+        print("%-20s %8.2f ms" % (label, elapsed))
+    print("%-20s %8d tiles" % ("snapshot size", len(snapshot)))
+
+
+def bench_cache():
+    paths = map_paths()
+    print("-- %d-map rotation from paths, cold vs .vxlc cache --" % len(paths))
+    cache_dir = tempfile.mkdtemp()
+    try:
+        copies = []
+        for path in paths:
+            copy = os.path.join(cache_dir, os.path.basename(path))
+            shutil.copyfile(path, copy)
+            copies.append(copy)
+
+        for label in ("cold (writes cache)", "cached"):
+            start = time.perf_counter()
+            maps = [vxl.VXL(1, path, 2) for path in copies]
+            elapsed = (time.perf_counter() - start) * 1000.0
+            print("%-20s %8.2f ms" % (label, elapsed))
+        maps = None
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def bench_join():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    print("-- %d joins with a block placed before each on %s --" % (JOIN_CLIENTS, FLOATING_MAP))
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    map_obj.get_join_state()
+
+    def join_with(func):
+        start = time.perf_counter()
+        for index in range(JOIN_CLIENTS):
+            map_obj.set_point(200 + index, 200, 100, 0x7F102030 + index)
+            func()
+        return (time.perf_counter() - start) * 1000.0
+
+    for label, func in (
+        ("get_map_chunks", map_obj.get_map_chunks),
+        ("get_join_state", map_obj.get_join_state),
+    ):
+        print("%-20s %8.2f ms" % (label, join_with(func)))
+
+
+def bench_region():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    last = 100 + REGION_SIZE - 1
+    print("-- %dx%dx240 solid box on %s (best of %d) --" % (REGION_SIZE, REGION_SIZE, FLOATING_MAP, REGION_ROUNDS))
+
+    def per_voxel():
+        get_solid = map_obj.get_solid
+        for x in range(100, last + 1):
+            for y in range(100, last + 1):
+                for z in range(240):
+                    get_solid(x, y, z)
+
+    for label, func in (
+        ("get_solid loop", per_voxel),
+        ("get_solid_region", lambda: map_obj.get_solid_region(100, 100, 0, last, last, 239)),
+        ("get_heightmap", lambda: map_obj.get_heightmap(0, 0, 511, 511)),
+    ):
+        print("%-20s %8.2f ms" % (label, best_of(REGION_ROUNDS, func)))
+
+
+def bench_chunks():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    print("-- chunk block lists on %s (best of %d) --" % (FLOATING_MAP, CHUNK_ROUNDS))
+
+    def all_chunks():
+        for chunk in map_obj.iter_dirty_chunks():
+            chunk.to_block_list()
+            chunk.get_colors()
+
+    def dirty_chunks():
+        since = map_obj.edit_generation
+        for index in range(SNAPSHOT_EDITS):
+            map_obj.set_point(200 + index % 40, 200 + index // 40 % 40, 100, 0x7F102030)
+        for chunk in map_obj.iter_dirty_chunks(since):
+            chunk.to_block_list()
+            chunk.get_colors()
+
+    for label, func in (
+        ("all 256 chunks", all_chunks),
+        ("%d edits + dirty" % SNAPSHOT_EDITS, dirty_chunks),
+    ):
+        print("%-20s %8.2f ms" % (label, best_of(CHUNK_ROUNDS, func)))
+
+
+def bench_checksum():
+    path = os.path.join(MAPS_DIR, FLOATING_MAP)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    map_obj = vxl.VXL(-1, raw, len(raw), 2)
+    map_obj.get_checksum()
+    print("-- map checksum after %d edits on %s (best of %d) --" % (GENERATE_EDITS, FLOATING_MAP, CHECKSUM_ROUNDS))
+
+    def edit():
+        for index in range(GENERATE_EDITS):
+            map_obj.set_point(200 + index, 200, 100, 0x7F102030 + index)
+
+    def serialized():
+        edit()
+        zlib.crc32(map_obj.generate_vxl(False))
+
+    def rolling():
+        edit()
+        map_obj.get_checksum()
+
+    for label, func in (
+        ("generate_vxl + crc32", serialized),
+        ("get_checksum", rolling),
+    ):
+        print("%-20s %8.2f ms" % (label, best_of(CHECKSUM_ROUNDS, func)))
+
+
+def main():
+    if not map_paths():
+        print("No maps found in %s" % MAPS_DIR)
+        return 1
+    bench_load()
+    bench_threaded_load()
+    bench_cache()
+    bench_generate()
+    bench_overview()
+    bench_batch()
+    bench_compress()
+    bench_floating()
+    bench_prefab()
+    bench_snapshot()
+    bench_join()
+    bench_region()
+    bench_chunks()
+    bench_checksum()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+World performance benchmarks.
+
+Run against the Python 3 restoration:
+    py .\tests\bench_world.py
+"""
+
+import array
+import os
+import random
+import sys
+import time
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MAPS_DIR = os.path.join(PROJECT_ROOT, "maps")
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import aoslib.vxl as vxl
+import aoslib.world as world
+
+
+RAY_MAP = "CastleWars.vxl"
+RAY_COUNT = 20000
+RAY_ROUNDS = 3
+RAY_LENGTH = 128.0
+PLAYER_COUNT = 32
+PLAYER_TICKS = 200
+PLAYER_DT = 1.0 / 60.0
+
+
+def best_of(rounds, func):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def load_world(name):
+    path = os.path.join(MAPS_DIR, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    return world.World(vxl.VXL(-1, raw, len(raw), 2))
+
+
+def bench_hitscan():
+    test_world = load_world(RAY_MAP)
+    if test_world is None:
+        print("No map found at %s" % os.path.join(MAPS_DIR, RAY_MAP))
+        return
+    rng = random.Random(0)
+    origins = [(rng.uniform(0, 512), rng.uniform(0, 512), rng.uniform(100, 230)) for _ in range(RAY_COUNT)]
+    directions = [(rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-0.3, 1)) for _ in range(RAY_COUNT)]
+    origin_buffer = array.array("d", [value for origin in origins for value in origin])
+    direction_buffer = array.array("d", [value for direction in directions for value in direction])
+    print("-- %d rays of length %d on %s (best of %d) --" % (RAY_COUNT, RAY_LENGTH, RAY_MAP, RAY_ROUNDS))
+
+    def single():
+        hitscan = test_world.hitscan_accurate
+        for index in range(RAY_COUNT):
+            hitscan(origins[index], directions[index], RAY_LENGTH)
+
+    def batch():
+        test_world.hitscan_batch(origin_buffer, direction_buffer, RAY_LENGTH)
+
+    for label, func in (
+        ("hitscan_accurate", single),
+        ("hitscan_batch", batch),
+    ):
+        elapsed = best_of(RAY_ROUNDS, func)
+        print("%-20s %12.0f rays/s" % (label, RAY_COUNT / elapsed))
+
+
+def bench_players():
+    test_world = load_world(RAY_MAP)
+    if test_world is None:
+        print("No map found at %s" % os.path.join(MAPS_DIR, RAY_MAP))
+        return
+    rng = random.Random(0)
+    players = []
+    for _ in range(PLAYER_COUNT):
+        player = world.Player(test_world)
+        x, y = rng.uniform(64, 448), rng.uniform(64, 448)
+        z = 0.0
+        while z < 239 and not test_world.map.get_solid(int(x), int(y), int(z) + 3):
+            z += 1.0
+        player.set_position(x, y, z)
+        player.set_orientation((rng.uniform(-1, 1), rng.uniform(-1, 1), 0.0))
+        player.set_walk(True, False, rng.random() < 0.5, False)
+        players.append(player)
+    print("-- %d players x %d ticks on %s (best of %d) --" % (PLAYER_COUNT, PLAYER_TICKS, RAY_MAP, RAY_ROUNDS))
+
+    def run():
+        for tick in range(PLAYER_TICKS):
+            for player in players:
+                player.jump = tick % 40 == 0
+                player.update(PLAYER_DT, [])
+
+    elapsed = best_of(RAY_ROUNDS, run)
+    print("%-20s %12.0f updates/s" % ("Player.update", PLAYER_COUNT * PLAYER_TICKS / elapsed))
+
+
+def bench_world_update():
+    test_world = load_world(RAY_MAP)
+    if test_world is None:
+        print("No map found at %s" % os.path.join(MAPS_DIR, RAY_MAP))
+        return
+    rng = random.Random(0)
+    test_world.timestep = PLAYER_DT
+    for _ in range(PLAYER_COUNT):
+        player = test_world.create_object(world.Player)
+        player.set_position(rng.uniform(64, 448), rng.uniform(64, 448), 20.0)
+        player.set_walk(True, False, False, False)
+    for _ in range(64):
+        test_world.create_object(world.Grenade, (256.0, 256.0, 20.0), (0.0, 0.0, 0.0), 1e9)
+    for _ in range(256):
+        test_world.create_object(world.Debris, (256.0, 256.0, 20.0), (0.0, 0.0, 0.0), 0, 1.0, 0.0)
+    print("-- World.update: %d players, 64 grenades, 256 debris x %d ticks (best of %d) --" % (PLAYER_COUNT, PLAYER_TICKS, RAY_ROUNDS))
+    manual = [world.Player(test_world) for _ in range(PLAYER_COUNT)]
+    bodies = [world.Grenade(test_world, (256.0, 256.0, 20.0), (0.0, 0.0, 0.0), 1e9) for _ in range(64)]
+    bodies += [world.Debris(test_world, (256.0, 256.0, 20.0), (0.0, 0.0, 0.0), 0, 1.0, 0.0) for _ in range(256)]
+    for player in manual:
+        player.set_position(rng.uniform(64, 448), rng.uniform(64, 448), 20.0)
+        player.set_walk(True, False, False, False)
+
+    def python_loop():
+        for _ in range(PLAYER_TICKS):
+            positions = [(p.position.x, p.position.y, p.position.z) for p in manual]
+            for index, player in enumerate(manual):
+                player.update(PLAYER_DT, positions[:index] + positions[index + 1:])
+            for body in bodies:
+                if not body.deleted:
+                    body.update(PLAYER_DT, manual)
+
+    def engine():
+        for _ in range(PLAYER_TICKS):
+            test_world.update(PLAYER_DT)
+
+    for label, func in (
+        ("python tick loop", python_loop),
+        ("World.update", engine),
+    ):
+        elapsed = best_of(RAY_ROUNDS, func)
+        print("%-20s %12.0f ticks/s" % (label, PLAYER_TICKS / elapsed))
+
+
+def bench_player_scaling():
+    print("-- World.update player scaling on %s (best of %d) --" % (RAY_MAP, RAY_ROUNDS))
+    for count in (16, 32, 64, 128, 256):
+        test_world = load_world(RAY_MAP)
+        if test_world is None:
+            print("No map found at %s" % os.path.join(MAPS_DIR, RAY_MAP))
+            return
+        rng = random.Random(count)
+        test_world.timestep = PLAYER_DT
+        for _ in range(count):
+            player = test_world.create_object(world.Player)
+            player.set_position(rng.uniform(64, 448), rng.uniform(64, 448), 20.0)
+            player.set_orientation((rng.uniform(-1, 1), rng.uniform(-1, 1), 0.0))
+            player.set_walk(True, False, rng.random() < 0.5, False)
+
+        def engine():
+            for _ in range(PLAYER_TICKS):
+                test_world.update(PLAYER_DT)
+
+        elapsed = best_of(RAY_ROUNDS, engine)
+        print("%4d players %12.1f us/tick %8.2f us/player" % (
+            count,
+            elapsed * 1e6 / PLAYER_TICKS,
+            elapsed * 1e6 / (PLAYER_TICKS * count),
+        ))
+
+
+def bench_queries():
+    test_world = world.World(vxl.VXL(-1, b"", 0, 2))
+    rng = random.Random(0)
+    players = [test_world.create_object(world.Player) for _ in range(128)]
+    for player in players:
+        player.set_position(rng.uniform(0, 512), rng.uniform(0, 512), rng.uniform(0, 60))
+    centers = [(rng.uniform(0, 512), rng.uniform(0, 512), rng.uniform(0, 60)) for _ in range(RAY_COUNT)]
+    print("-- %d radius queries over %d players (best of %d) --" % (RAY_COUNT, len(players), RAY_ROUNDS))
+
+    def scan():
+        for center in centers:
+            [
+                player
+                for player in players
+                if (player.position.x - center[0]) ** 2
+                + (player.position.y - center[1]) ** 2
+                + (player.position.z - center[2]) ** 2
+                <= 256.0
+            ]
+
+    def grid():
+        query = test_world.query_radius
+        for center in centers:
+            query(center, 16.0)
+
+    for label, func in (
+        ("python scan", scan),
+        ("World.query_radius", grid),
+    ):
+        elapsed = best_of(RAY_ROUNDS, func)
+        print("%-20s %12.0f queries/s" % (label, RAY_COUNT / elapsed))
+
+
+def main():
+    bench_hitscan()
+    bench_players()
+    bench_world_update()
+    bench_player_scaling()
+    bench_queries()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
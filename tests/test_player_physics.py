@@ -72,6 +72,120 @@ class TestPlayerPhysics(unittest.TestCase):
         self.assertEqual(accurate[2], 4)
         self.assertAlmostEqual(accurate[0].z, 4.0, places=5)
 
+    def test_hitscan_batch_matches_hitscan_accurate(self):
+        self.map.set_point(4, 4, 4, (10, 20, 30))
+        origins = [(4.5, 4.5, 0.0), (4.5, 4.5, 0.0), (1.5, 1.5, 2.0), (-5.0, 4.5, 4.5)]
+        directions = [(0.0, 0.0, 1.0), (0.0, 0.0, -1.0), (1.0, 1.0, 3.0), (1.0, 0.0, 0.0)]
+        blocks, faces, distances = self.world.hitscan_batch(origins, directions, [10.0, 10.0, 20.0, 3.0])
+        self.assertEqual(blocks.shape, (4, 3))
+        for index in range(4):
+            expected = self.world.hitscan_accurate(origins[index], directions[index], [10.0, 10.0, 20.0, 3.0][index])
+            if expected is None:
+                self.assertEqual(faces[index], -1)
+                self.assertEqual(blocks[index, 0], -1)
+                continue
+            hit, block, face = expected
+            self.assertEqual((blocks[index, 0], blocks[index, 1], blocks[index, 2]), block.xyz)
+            self.assertEqual(faces[index], face)
+            self.assertAlmostEqual(distances[index], glm.Vector3(*origins[index]).distance(hit), places=4)
+        self.assertEqual(faces[1], -1)
+        self.assertEqual(faces[3], -1)
+
+    def test_hitscan_far_origin_misses(self):
+        for origin in ((1e30, 0.0, 0.0), (float("nan"), 4.5, 4.5)):
+            self.assertIsNone(self.world.hitscan_accurate(origin, (1.0, 0.0, 0.0)))
+            self.assertIsNone(self.world.hitscan(origin, (1.0, 0.0, 0.0)))
+
+    def test_world_update_fixed_steps_and_events(self):
+        self.world.timestep = 0.1
+        self.world.max_substeps = 4
+        stepped = self.world.create_object(world.Player)
+        manual = world.Player(self.world)
+        for player in (stepped, manual):
+            player.set_position(8.5, 8.5, 6.0)
+            player.set_velocity(0.0, 0.0, 0.0)
+        grenade = self.world.create_object(world.Grenade, glm.Vector3(2.0, 2.0, 2.0), glm.Vector3(0.0, 0.0, 0.0), 0.25)
+        debris = self.world.create_object(world.Debris, glm.Vector3(3.0, 3.0, 3.0), glm.Vector3(0.0, 0.0, 0.0), 0, 1.0, 0.0)
+
+        self.assertEqual(self.world.update(0.05), [])
+        self.assertEqual(stepped.position.z, 6.0)
+        events = self.world.update(0.26)
+        for _ in range(3):
+            manual.update(0.1, [])
+        self.assertEqual(stepped.position.xyz, manual.position.xyz)
+        self.assertEqual(stepped.velocity.xyz, manual.velocity.xyz)
+        self.assertAlmostEqual(debris.velocity.z, 0.3, places=9)
+        self.assertEqual(events, [("fuse", grenade, None)])
+        self.assertTrue(grenade.deleted)
+
+        events = self.world.update(1000.0)
+        for _ in range(4):
+            manual.update(0.1, [])
+        self.assertEqual(stepped.position.xyz, manual.position.xyz)
+        for _ in range(10):
+            events.extend(self.world.update(0.1))
+        self.assertIn(("land", stepped, None), events)
+        self.assertFalse(stepped.airborne)
+
+    def test_player_array_matches_player_update(self):
+        self.world.timestep = 0.05
+        stepped = [self.world.create_object(world.Player) for _ in range(3)]
+        manual = [world.Player(self.world) for _ in range(3)]
+        for group in (stepped, manual):
+            for index, player in enumerate(group):
+                player.set_position(4.5 + (index * 0.5), 4.5, 9.3 - index)
+                player.set_orientation(glm.Vector3(1.0, 0.5 * index, 0.0))
+                player.set_walk(True, False, index == 1, False)
+            group[2].jump = True
+            group[0].set_locked_to_box((4.0, 4.0, 0.0, 6.0, 6.0, 20.0))
+
+        for _ in range(40):
+            self.world.update(0.05)
+            rows = [(p.position.x, p.position.y, p.position.z, world._player_height(p.crouch, p.wade)) for p in manual]
+            for index, player in enumerate(manual):
+                player.update(0.05, rows[:index] + rows[index + 1:])
+        for a, b in zip(stepped, manual):
+            self.assertEqual(a.position.xyz, b.position.xyz)
+            self.assertEqual(a.velocity.xyz, b.velocity.xyz)
+            self.assertEqual(a.airborne, b.airborne)
+
+        array = self.world.player_array
+        self.assertEqual(len(array), 3)
+        self.assertEqual(array.positions.shape, (3, 3))
+        self.assertEqual(array.positions[1, 0], stepped[1].position.x)
+        self.assertEqual(array.velocities[2, 2], stepped[2].velocity.z)
+        self.assertIs(array.players[0], stepped[0])
+
+    def test_world_proximity_queries(self):
+        players = [self.world.create_object(world.Player) for _ in range(4)]
+        for player, position in zip(players, [(10.0, 10.0, 5.0), (13.0, 10.0, 5.0), (7.5, 8.0, 5.0), (300.0, 300.0, 5.0)]):
+            player.set_position(*position)
+        players[2].set_dead(True)
+
+        self.assertEqual(self.world.query_radius(glm.Vector3(10.0, 10.0, 5.0), 3.0), players[:2])
+        self.assertEqual(self.world.query_radius((10.0, 10.0, 5.0), 2.9), players[:1])
+        self.assertEqual(self.world.query_box(14.0, 11.0, 6.0, 6.0, 9.0, 4.0), players[:2])
+        self.assertEqual(self.world.query_box(0.0, 0.0, 0.0, 512.0, 512.0, 240.0), [players[0], players[1], players[3]])
+        self.assertEqual(self.world.query_radius((10.0, 10.0, 5.0), -1.0), [])
+        self.assertEqual(self.world.query_radius((float("nan"), 0.0, 0.0), 5.0), [])
+        self.assertEqual(self.world.query_box(float("nan"), 0.0, 0.0, 10.0, 10.0, 10.0), [])
+        self.assertEqual(self.world.query_box(0.0, 0.0, 0.0, 10.0, 10.0, float("nan")), [])
+
+        players[3].set_position(10.0, 11.0, 5.0)
+        self.assertIn(players[3], self.world.query_radius((10.0, 11.0, 5.0), 1.0))
+        players[0].position = (200.0, 10.0, 5.0)
+        self.assertNotIn(players[0], self.world.query_radius((10.0, 10.0, 5.0), 1.0))
+        self.assertEqual(self.world.query_box(199.0, 9.0, 4.0, 201.0, 11.0, 6.0), players[:1])
+        players[2].set_dead(False)
+        self.assertEqual(self.world.query_radius((7.5, 8.0, 5.0), 0.5), players[2:3])
+
+        players[1].set_velocity(0.0, 40.0, 0.0)
+        self.world.update(self.world.timestep)
+        moved = players[1].position
+        self.assertGreater(moved.y, 10.5)
+        self.assertEqual(self.world.query_radius(moved, 0.01), players[1:2])
+        self.assertNotIn(players[1], self.world.query_radius((13.0, 10.0, 5.0), 0.01))
+
     def test_check_valid_position_bounds(self):
         self.assertTrue(self.player.check_valid_position(glm.Vector3(0.0, 0.0, 0.0)))
         self.assertFalse(self.player.check_valid_position(glm.Vector3(-1.0, 0.0, 0.0)))
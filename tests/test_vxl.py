@@ -9,9 +9,13 @@ Workflow:
 """
 
 import json
+import mmap
 import os
+import shutil
 import struct
 import sys
+import tempfile
+import zlib
 
 
 IS_PY2 = sys.version_info[0] < 3
@@ -29,6 +33,8 @@ else:
     MAP_PATH = os.path.join(AOSDUMP_ROOT, "maps", "Classic.vxl")
     REF_ROOT = AOSDUMP_ROOT
 
+PREFAB_PATH = os.path.join(PROJECT_ROOT, "prefab.kv6")
+
 import aoslib.vxl as vxl
 
 
@@ -89,6 +95,24 @@ VXL_API = [
     "update_static_light_colour",
 ]
 
+VXL_EXTENSION_API = [
+    "color_blocks",
+    "edit_generation",
+    "get_checksum",
+    "get_column_spans",
+    "get_heightmap",
+    "get_join_state",
+    "get_journal_items",
+    "get_map_chunks",
+    "get_solid_region",
+    "iter_dirty_chunks",
+    "iter_map_chunks",
+    "remove_points",
+    "restore",
+    "set_points",
+    "snapshot",
+]
+
 CCHUNK_API = [
     "delete",
     "draw",
@@ -102,6 +126,10 @@ CCHUNK_API = [
     "z2",
 ]
 
+CCHUNK_EXTENSION_API = [
+    "version",
+]
+
 FORBIDDEN_MODULE_NAMES = [
     "Enum",
     "MapPacker",
@@ -144,7 +172,7 @@ def to_bytes(data):
         return data
     if isinstance(data, bytes):
         return data
-    if isinstance(data, bytearray):
+    if isinstance(data, (bytearray, memoryview)):
         return bytes(data)
     if isinstance(data, str):
         return data.encode("utf-8")
@@ -223,6 +251,14 @@ def public_dir(value):
     return sorted(name for name in dir(value) if not name.startswith("_"))
 
 
+def original_vxl_dir(value):
+    return [name for name in public_dir(value) if name not in VXL_EXTENSION_API]
+
+
+def original_cchunk_dir(value):
+    return [name for name in public_dir(value) if name not in CCHUNK_EXTENSION_API]
+
+
 def module_api_dir():
     return sorted(name for name in MODULE_API if hasattr(vxl, name))
 
@@ -263,8 +299,8 @@ def build_invalid_fixture():
 
 def run_surface_tests(blank):
     check_reference("module_api", json_bytes(module_api_dir()), "json")
-    check_reference("vxl_api", json_bytes(public_dir(blank)), "json")
-    check_reference("cchunk_api", json_bytes(public_dir(vxl.CChunk())), "json")
+    check_reference("vxl_api", json_bytes(original_vxl_dir(blank)), "json")
+    check_reference("cchunk_api", json_bytes(original_cchunk_dir(vxl.CChunk())), "json")
 
     check_condition(
         "module API exact",
@@ -273,14 +309,26 @@ def run_surface_tests(blank):
     )
     check_condition(
         "VXL API exact",
-        public_dir(blank) == VXL_API,
+        original_vxl_dir(blank) == VXL_API,
         "VXL public names changed",
     )
+    if not IS_PY2:
+        check_condition(
+            "VXL extension API present",
+            public_dir(blank) == sorted(VXL_API + VXL_EXTENSION_API),
+            "VXL extension names changed",
+        )
     check_condition(
         "CChunk API exact",
-        public_dir(vxl.CChunk()) == CCHUNK_API,
+        original_cchunk_dir(vxl.CChunk()) == CCHUNK_API,
         "CChunk public names changed",
     )
+    if not IS_PY2:
+        check_condition(
+            "CChunk extension API present",
+            public_dir(vxl.CChunk()) == sorted(CCHUNK_API + CCHUNK_EXTENSION_API),
+            "CChunk extension names changed",
+        )
 
     forbidden_module = {name: hasattr(vxl, name) for name in FORBIDDEN_MODULE_NAMES}
     forbidden_vxl = {name: hasattr(blank, name) for name in FORBIDDEN_VXL_NAMES}
@@ -347,13 +395,13 @@ def run_blank_reference_tests(blank):
 
     check_reference("module_color_cases", json_bytes(color_cases), "json")
     check_reference("blank_state", json_bytes(blank_state), "json")
-    check_reference("blank_generate_vxl", blank.generate_vxl(), "bin")
+    check_reference("blank_generate_vxl", blank.generate_vxl(False), "bin")
     check_reference("blank_overview", blank.get_overview(), "bin")
     check_reference("blank_overview_transparent", blank.get_overview(0), "bin")
 
     check_condition(
         "blank generate_vxl bytes",
-        blank.generate_vxl() == BLANK_VXL,
+        blank.generate_vxl(False) == BLANK_VXL,
         "blank serialization changed",
     )
     check_condition(
@@ -377,7 +425,7 @@ def run_py3_loader_tests():
 
     check_condition(
         "real map path/bytes roundtrip",
-        by_path.generate_vxl() == by_bytes.generate_vxl() == raw_map,
+        by_path.generate_vxl(False) == by_bytes.generate_vxl(False) == raw_map,
         "path and bytes load differ",
     )
     check_condition(
@@ -410,6 +458,18 @@ def run_py3_loader_tests():
             "loaded point mismatch at %s" % (solid,),
         )
 
+    with open(MAP_PATH, "rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    by_mmap = vxl.VXL(-1, mapped, len(mapped), 2)
+    by_view = vxl.VXL(-1, memoryview(bytearray(raw_map)), len(raw_map), 2)
+    check_condition(
+        "real map buffer sources roundtrip",
+        by_mmap.generate_vxl(False) == by_view.generate_vxl(False) == raw_map,
+        "mmap/memoryview load differs from bytes load",
+    )
+    del by_mmap
+    mapped.close()
+
     fixture = build_loader_fixture()
     fixture_map = vxl.VXL(-1, fixture, len(fixture), 2)
     shift_fixture = build_shift_fixture()
@@ -418,7 +478,7 @@ def run_py3_loader_tests():
 
     check_condition(
         "fixture roundtrip bytes",
-        fixture_map.generate_vxl() == fixture,
+        fixture_map.generate_vxl(False) == fixture,
         "fixture did not roundtrip cleanly",
     )
     check_condition(
@@ -426,6 +486,20 @@ def run_py3_loader_tests():
         shift_map.get_point(base, base, 239) == (True, (10, 20, 30, 253)),
         str(shift_map.get_point(base, base, 239)),
     )
+    floor_fixture = b"\x00\x05\x0A\x00" + b"".join(pack_u32(0x7F000000 | z) for z in range(5, 11))
+    floor_map = vxl.VXL(-1, floor_fixture, len(floor_fixture), 2)
+    for z in (238, 239):
+        floor_map.set_point(base, base, z, 0)
+    floor_bytes = floor_map.generate_vxl(False)
+    floor_reload = vxl.VXL(-1, floor_bytes, len(floor_bytes), 2)
+    check_condition(
+        "uncolored floor keeps z shift",
+        all(
+            floor_reload.get_point(base, base, z) == floor_map.get_point(base, base, z)
+            for z in range(240)
+        ),
+        str(floor_reload.get_column_spans(base, base)),
+    )
     check_condition(
         "fixture hidden solid gap",
         fixture_map.get_point(base, base + 1, 1) == (True, (0, 0, 0, 0)),
@@ -439,14 +513,482 @@ def run_py3_loader_tests():
         "fixture colors decoded incorrectly",
     )
 
+    column = base + ((base + 1) << 9)
+    check_condition(
+        "fixture typed column buffers",
+        fixture_map._top_z_view[column] == 0
+        and fixture_map._bottom_z_view[column] == 2
+        and fixture_map._top_z_view[0] == 240
+        and fixture_map._bottom_z_view[0] == -1
+        and len(fixture_map._solid_view) == (512 * 512 * 240) // 8,
+        "typed column buffers out of sync with loaded map",
+    )
+
     invalid = build_invalid_fixture()
     invalid_map = vxl.VXL(-1, invalid, len(invalid), 2)
     check_condition(
         "invalid fixture falls back to blank",
-        invalid_map.generate_vxl() == BLANK_VXL,
+        invalid_map.generate_vxl(False) == BLANK_VXL,
         "invalid map did not fall back to blank output",
     )
 
+    color_map = make_blank_vxl()
+    for z in range(0, 240, 3):
+        color_map.set_point(base, base, z, 0x7F000000 | z)
+    color_map.remove_point(base, base, 30)
+    color_map.set_point(base, base, 31, 0x7F0000FF)
+    color_map.color_block(base, base, 33, 0x7F00FF00)
+    color_map.set_point(base, base, 36, 0)
+    check_condition(
+        "column color store edits",
+        color_map.get_color(base, base, 27) == 0x7F00001B
+        and color_map.get_color(base, base, 30) == 0
+        and color_map.get_color(base, base, 31) == 0x7F0000FF
+        and color_map.get_color(base, base, 33) == 0x7F00FF00
+        and color_map.get_point(base, base, 36) == (True, (0, 0, 0, 0))
+        and color_map.get_color(base, base, 237) == 0x7F0000ED,
+        "column color store returned unexpected colors",
+    )
+
+    overview = color_map.get_overview()
+    pixel = (base + (base << 9)) * 4
+    before = bytes(overview[pixel:pixel + 4])
+    color_map.set_point(base, base, 0, 0x7F0A0B0C)
+    check_condition(
+        "incremental overview views",
+        color_map.get_overview() is overview
+        and before == b"\x00\x00\x00\xFF"
+        and bytes(overview[pixel:pixel + 4]) == b"\x0A\x0B\x0C\xFF"
+        and bytes(color_map.get_overview(0)[pixel:pixel + 4]) == b"\x0A\x0B\x0C\xFD",
+        "overview pixel was not patched in place",
+    )
+    color_map.remove_point(base, base, 0)
+
+    span_map = make_blank_vxl()
+    for z in (10, 11, 12, 20, 239):
+        span_map.set_point(base, base, z, 0x7F000000 | z)
+    span_map.remove_point(base, base, 10)
+    span_map.remove_point(base, base, 239)
+    span_map.remove_point(base, base, 11)
+    check_condition(
+        "column spans and bounds",
+        span_map.get_column_spans(base, base) == [(12, 12), (20, 20)]
+        and span_map._top_z_view[base + (base << 9)] == 12
+        and span_map._bottom_z_view[base + (base << 9)] == 20
+        and span_map.get_column_spans(-1, 0) == []
+        and fixture_map.get_column_spans(base, base + 1) == [(0, 2)],
+        str(span_map.get_column_spans(base, base)),
+    )
+
+    color_bytes = color_map.generate_vxl(False)
+    color_reload = vxl.VXL(-1, color_bytes, len(color_bytes), 2)
+    check_condition(
+        "edited column reencodes",
+        all(
+            color_reload.get_point(base, base, z) == color_map.get_point(base, base, z)
+            for z in range(240)
+        ),
+        "edited column did not survive generate_vxl",
+    )
+
+    edited = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    edits = [(256, 256, 200), (256, 257, 230), (100, 400, 190)]
+    for x, y, z in edits:
+        edited.set_point(x, y, z, 0x7F123456)
+    edited.remove_point(256, 256, 239)
+    edited.color_block(100, 400, 190, 0x7F654321)
+    edited_bytes = edited.generate_vxl(False)
+    edited_reload = vxl.VXL(-1, edited_bytes, len(edited_bytes), 2)
+    check_condition(
+        "incremental generate_vxl",
+        edited_bytes[:4096] == raw_map[:4096]
+        and edited.generate_vxl(False) is edited_bytes
+        and all(
+            edited_reload.get_point(x, y, z) == edited.get_point(x, y, z)
+            for x, y, _ in edits
+            for z in range(240)
+        ),
+        "dirty columns were not spliced into the source serialization",
+    )
+
+    edited.set_point(300, 300, 200, 0x7F0000FF)
+    chunks = list(edited.iter_map_chunks(4096))
+    raw_chunks = list(edited.iter_map_chunks(4096, False))
+    check_condition(
+        "streamed map chunks",
+        zlib.decompress(b"".join(data for data, _ in chunks)) == edited.generate_vxl(False)
+        and b"".join(data for data, _ in raw_chunks) == edited.generate_vxl(False)
+        and all(len(data) <= 4096 for data, _ in chunks + raw_chunks)
+        and [percent for _, percent in chunks] == sorted(percent for _, percent in chunks)
+        and chunks[-1][1] == raw_chunks[-1][1] == 100,
+        "iter_map_chunks does not reproduce generate_vxl",
+    )
+
+    generation = edited.edit_generation
+    cached = edited.get_map_chunks(4096)
+    shared = edited.get_map_chunks(4096)
+    edited.color_block(300, 300, 200, 0x7F00FF00)
+    refreshed = edited.get_map_chunks(4096)
+    check_condition(
+        "compressed chunk cache per edit generation",
+        cached is shared
+        and [data for data, _ in cached] == [data for data, _ in chunks]
+        and edited.edit_generation == generation + 1
+        and refreshed is not cached
+        and zlib.decompress(b"".join(data for data, _ in refreshed)) == edited.generate_vxl(False),
+        "map chunk cache was not shared or not invalidated by an edit",
+    )
+
+    edited.color_block(300, 300, 200, 0x7F0000FE)
+    leader = edited.iter_map_chunks(4096)
+    follower = edited.iter_map_chunks(4096)
+    led = [next(leader), next(leader)]
+    followed = list(follower)
+    led.extend(leader)
+    check_condition(
+        "interleaved map streams",
+        led == followed
+        and zlib.decompress(b"".join(data for data, _ in led)) == edited.generate_vxl(False)
+        and [data for data, _ in edited.get_map_chunks(4096)] == [data for data, _ in followed],
+        "concurrent iter_map_chunks readers did not share one compression",
+    )
+
+    check_condition(
+        "generate_vxl compression",
+        zlib.decompress(edited.generate_vxl(True)) == edited.generate_vxl(False)
+        and edited.generate_vxl() == edited.generate_vxl(True, -1)
+        and zlib.decompress(edited.generate_vxl(True, 1, 4)) == edited.generate_vxl(False)
+        and zlib.decompress(edited.generate_vxl(True, 9, 1)) == edited.generate_vxl(False),
+        "compressed map does not inflate to the raw map",
+    )
+
+    single = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    batched = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    crater = [(x, y, z) for x in range(250, 254) for y in range(250, 254) for z in range(200, 240)]
+    line = [(260 + index, 260, 180) for index in range(50)]
+    for x, y, z in crater:
+        single.remove_point(x, y, z)
+    for x, y, z in line:
+        single.set_point(x, y, z, 0x7F102030)
+    single.color_block(260, 260, 180, 0x7F405060)
+    removed = batched.remove_points(crater)
+    placed = batched.set_points(
+        memoryview(struct.pack("=%di" % (len(line) * 3), *[v for point in line for v in point])).cast("i"),
+        0x7F102030,
+    )
+    recolored = batched.color_blocks([(260, 260, 180), (-1, 0, 0)], [0x7F405060, 0x7F405060])
+    opaque = [(10, 10, 50), (11, 10, 50)]
+    single.set_point(10, 10, 50, 0xFF112233)
+    single.set_point(11, 10, 50, (1, 2, 3))
+    batched.set_points(opaque, [0xFF112233, (1, 2, 3)])
+    check_condition(
+        "batch voxel edits",
+        all(
+            single.get_point(x, y, z) == batched.get_point(x, y, z)
+            for x, y, z in crater + line + opaque
+        )
+        and bytes(single._top_z_view) == bytes(batched._top_z_view)
+        and bytes(single._bottom_z_view) == bytes(batched._bottom_z_view)
+        and removed == [point for point in crater if by_bytes.get_solid(*point)]
+        and placed == [point for point in line if by_bytes.get_point(*point) != single.get_point(*point)]
+        and recolored == [(260, 260, 180)]
+        and batched.set_points(line[1:], 0x7F102030) == [],
+        "batch edits diverge from single-voxel edits",
+    )
+
+    floating_map = make_blank_vxl()
+    for z in range(230, 240):
+        floating_map.set_point(10, 10, z, 0x7F112233)
+    arm = [(11, 10, 230), (12, 10, 230), (13, 10, 230), (13, 10, 229)]
+    for point in arm:
+        floating_map.set_point(*point, color=0x7F445566)
+    supported = floating_map.check_only(10, 10, 235)
+    floating_map.remove_point(11, 10, 230)
+    floating = floating_map.check_only(11, 10, 230)
+    floating_map.clear_checked_geometry()
+    check_condition(
+        "floating block detection",
+        sorted(supported) == sorted([(10, 10, z) for z in range(230, 235)] + arm)
+        and floating_map.get_solid(10, 10, 235)
+        and sorted(floating) == sorted(arm[1:])
+        and not any(floating_map.get_solid(*point) for point in arm)
+        and floating_map.get_solid(10, 10, 230)
+        and floating_map.check_only(10, 10, 239) == [],
+        "check_only did not isolate the detached voxels",
+    )
+
+    import aoslib.kv6 as kv6
+
+    prefab = kv6.KV6(PREFAB_PATH, False, load_display=False, invscale=1)
+    prefab_points = prefab.get_points()
+    model = [tuple(prefab_points[index]) for index in range(prefab_points.shape[0])]
+    # Quarter turn about z, then every model voxel becomes a 2x2x2 block.
+    stamped = dict(
+        ((100 - (py * 2 + j), 120 + px * 2 + i, 200 + pz * 2 + k), (r, g, b, 255))
+        for px, py, pz, r, g, b in model
+        for i in range(2)
+        for j in range(2)
+        for k in range(2)
+    )
+    stamp_map = make_blank_vxl()
+    touches_before = stamp_map.get_prefab_touches_world(prefab, 100, 120, 200, 0, 0, 1, 2)
+    stamp_map.place_prefab_in_world(prefab, 100, 120, 200, 0, 0, 1, 2)
+    placed_ok = all(stamp_map.get_point(*point) == (True, color) for point, color in stamped.items())
+    touches_after = stamp_map.get_prefab_touches_world(prefab, 100, 120, 200, 0, 0, 1, 2)
+    stamp_map.erase_prefab_from_world(prefab, 100, 120, 200, 0, 0, 1, 2)
+    check_condition(
+        "prefab stamping",
+        not touches_before
+        and placed_ok
+        and touches_after
+        and not any(stamp_map.get_solid(*point) for point in stamped)
+        and stamp_map.get_column_spans(100, 120) == [],
+        "prefab voxels were not stamped with the requested rotation and scale",
+    )
+
+    rollback = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    handle = rollback.snapshot()
+    untouched_tiles = len(handle)
+    for x, y, z in crater:
+        rollback.remove_point(x, y, z)
+    rollback.set_points(line, 0x7F102030)
+    rollback.place_prefab_in_world(prefab, 100, 120, 200)
+    edited_tiles = len(handle)
+    rollback.restore(handle)
+    rollback.set_point(300, 300, 180, 0x7F0000FF)
+    rollback.restore(handle)
+    restored_bytes = rollback.generate_vxl(False)
+    restored_reload = vxl.VXL(-1, restored_bytes, len(restored_bytes), 2)
+    stale = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    try:
+        stale.restore(handle)
+        stale_rejected = False
+    except ValueError:
+        stale_rejected = True
+    check_condition(
+        "snapshot restore",
+        untouched_tiles == 0
+        and 0 < edited_tiles < 256
+        and bytes(rollback._solid_view) == bytes(by_bytes._solid_view)
+        and bytes(rollback._top_z_view) == bytes(by_bytes._top_z_view)
+        and bytes(rollback.get_overview()) == bytes(by_bytes.get_overview())
+        and all(
+            rollback.get_point(*point) == by_bytes.get_point(*point)
+            and restored_reload.get_point(*point) == by_bytes.get_point(*point)
+            for point in crater + line + [(300, 300, 180)] + list(stamped)
+        )
+        and stale_rejected,
+        "restore did not roll back the edited tiles",
+    )
+
+    journal = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    base_chunks, base_items = journal.get_join_state()
+    for x, y, z in crater:
+        journal.remove_point(x, y, z)
+    journal.set_points(line, 0x7F102030)
+    journal.set_point(300, 300, 180, 0x7F0000FF)
+    journal.set_point(300, 300, 180, 0x7F00FF00)
+    since = journal.edit_generation
+    journal.color_block(*line[0], color=(1, 2, 3))
+    delta_chunks, delta_items = journal.get_join_state()
+    recolored = journal.get_journal_items(since)
+    joined_data = zlib.decompress(b"".join(data for data, _ in delta_chunks))
+    joined = vxl.VXL(-1, joined_data, len(joined_data), 2)
+    for x, y, z, color in delta_items:
+        if color is None:
+            joined.remove_point(x, y, z)
+        else:
+            joined.set_point(x, y, z, color)
+    folded_chunks, folded_items = journal.get_join_state(max_delta=0)
+    check_condition(
+        "edit journal",
+        base_items == []
+        and delta_chunks is base_chunks
+        and len(delta_items) == len(set(crater + line)) + 1
+        and (300, 300, 180, (0, 255, 0)) in delta_items
+        and recolored == [tuple(line[0]) + ((1, 2, 3),)]
+        and bytes(joined._solid_view) == bytes(journal._solid_view)
+        # Block items carry RGB only, not the shade byte.
+        and all(
+            joined.get_point(*point)[1][:3] == journal.get_point(*point)[1][:3]
+            for point in crater + line + [(300, 300, 180)]
+        )
+        and folded_chunks is not base_chunks
+        and folded_items == []
+        and journal.get_join_state()[0] is folded_chunks,
+        "journal delta does not rebuild the edited map from its base",
+    )
+
+    region = by_bytes.get_solid_region(-2, 250, 190, 3, 254, 239)
+    heights = by_bytes.get_heightmap(-2, 250, 3, 254)
+    try:
+        by_bytes.get_heightmap(5, 5, 4, 5)
+        empty_rejected = False
+    except ValueError:
+        empty_rejected = True
+    check_condition(
+        "region queries",
+        region.shape == (5, 6, 50)
+        and heights.shape == (5, 6)
+        and all(
+            region[y - 250, x + 2, z - 190] == by_bytes.get_solid(x, y, z)
+            for y in range(250, 255)
+            for x in range(-2, 4)
+            for z in range(190, 240)
+        )
+        and all(
+            heights[y - 250, x + 2] == (by_bytes.get_column_spans(x, y) or [(240, 240)])[0][0]
+            for y in range(250, 255)
+            for x in range(-2, 4)
+        )
+        and empty_rejected,
+        "region queries differ from per-voxel lookups",
+    )
+
+    def same_columns(loaded, expected):
+        return all(
+            bytes(getattr(loaded, name)) == bytes(getattr(expected, name))
+            for name in ("_solid_view", "_top_z_view", "_bottom_z_view")
+        )
+
+    threaded = vxl.VXL(-1, raw_map, len(raw_map), 2, threads=3)
+    truncated = raw_map[:len(raw_map) // 2]
+    threaded_truncated = vxl.VXL(-1, truncated, len(truncated), 2, threads=3)
+    check_condition(
+        "threaded load",
+        same_columns(threaded, by_bytes)
+        and bytes(threaded.get_overview()) == bytes(by_bytes.get_overview())
+        and threaded.generate_vxl(False) == raw_map
+        and all(threaded.get_point(*point) == by_bytes.get_point(*point) for point in crater + line)
+        and threaded_truncated.generate_vxl(False) == vxl.VXL(-1, truncated, len(truncated), 2).generate_vxl(False),
+        "threaded load differs from the serial loader",
+    )
+
+    chunked = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    loaded_versions = [chunk.version for chunk in chunked.iter_dirty_chunks()]
+    since = chunked.edit_generation
+    chunked.set_point(300, 300, 180, 0x7F0000FF)
+    chunked.remove_point(*crater[0])
+    dirty = list(chunked.iter_dirty_chunks(since))
+    edited = [chunk for chunk in dirty if chunk.x1 <= 300 < chunk.x2 and chunk.y1 <= 300 < chunk.y2]
+    blocks = edited[0].to_block_list() if edited else []
+    check_condition(
+        "chunk versions",
+        loaded_versions == [since] * 256
+        and len(dirty) == 2
+        and sorted(chunk.version for chunk in dirty) == [since + 1, since + 2]
+        and (edited[0].x1, edited[0].y1, edited[0].z1, edited[0].x2, edited[0].y2, edited[0].z2) == (288, 288, 0, 320, 320, 240)
+        and (300, 300, 180) in blocks
+        and edited[0].get_colors()[blocks.index((300, 300, 180))] == 0x7F0000FF
+        and chunked.chunk_to_pointlist(edited[0]) == blocks
+        and all(chunked.get_solid(*point) for point in blocks)
+        and list(chunked.iter_dirty_chunks(chunked.edit_generation)) == []
+        and vxl.CChunk().to_block_list() == [],
+        "chunk versions or block lists do not follow the edits",
+    )
+
+    checked = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    loaded_checksum = checked.get_checksum()
+    checked.set_point(300, 300, 180, 0x7F0000FF)
+    for x, y, z in crater:
+        checked.remove_point(x, y, z)
+    edited_checksum = checked.get_checksum()
+    replayed = vxl.VXL(-1, raw_map, len(raw_map), 2)
+    replayed.remove_points(crater)
+    crater_checksum = replayed.get_checksum()
+    replayed.set_point(300, 300, 180, 0x7F0000FF)
+    checked.remove_point(300, 300, 180)
+    check_condition(
+        "rolling checksum",
+        loaded_checksum == by_bytes.get_checksum()
+        and -(1 << 31) <= loaded_checksum < (1 << 31)
+        and len(set([loaded_checksum, crater_checksum, edited_checksum])) == 3
+        and edited_checksum == replayed.get_checksum()
+        and checked.get_checksum() == crater_checksum,
+        "incremental checksum differs from a full recompute",
+    )
+
+    # Rewrite one surface color so the cache no longer matches its source.
+    color_pos = 0
+    while raw_map[color_pos + 2] < raw_map[color_pos + 1]:
+        if raw_map[color_pos]:
+            color_pos += 4 * raw_map[color_pos]
+        else:
+            color_pos += 4 * (raw_map[color_pos + 2] - raw_map[color_pos + 1] + 2)
+    color_pos += 4
+    changed_map = raw_map[:color_pos] + bytes([raw_map[color_pos] ^ 0xFF]) + raw_map[color_pos + 1:]
+    changed = vxl.VXL(-1, changed_map, len(changed_map), 2)
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        source_path = os.path.join(cache_dir, "cached.vxl")
+        cache_path = os.path.join(cache_dir, "cached.vxlc")
+        with open(source_path, "wb") as handle:
+            handle.write(raw_map)
+        cold = vxl.VXL(1, source_path, 2)
+        cache_written = os.path.exists(cache_path)
+        warm = vxl.VXL(1, source_path, 2)
+        cached_ok = (
+            cache_written
+            and same_columns(cold, by_bytes)
+            and same_columns(warm, by_bytes)
+            and bytes(warm.get_overview()) == bytes(by_bytes.get_overview())
+        )
+        # Path loads copy the source, so rewriting the file under a loaded
+        # map must not change (or fault) its serialization.
+        with open(source_path, "wb") as handle:
+            handle.write(changed_map[:4096])
+        cached_ok = cached_ok and warm.generate_vxl(False) == raw_map
+        cold = warm = None
+        with open(source_path, "wb") as handle:
+            handle.write(changed_map)
+        rebuilt = vxl.VXL(1, source_path, 2)
+        check_condition(
+            "vxlc map cache",
+            cached_ok
+            and same_columns(rebuilt, changed)
+            and rebuilt.generate_vxl(False) == changed_map
+            and bytes(rebuilt.get_overview()) == bytes(changed.get_overview()),
+            "cached load differs from parsing the source",
+        )
+        rebuilt = None
+
+        with open(cache_path, "rb") as handle:
+            cache = bytearray(handle.read())
+        color_used = struct.unpack_from("<4sIQIiiiiQ", cache, 0)[8]
+        area = 512 * 512
+        arena_at = len(cache) - color_used * 4
+        # A stale centering offset, an encoded column running past the source
+        # and every column sharing one full-height color slot are all rejected
+        # even though the header and the cache size are right.
+        corruptions = [
+            [(24, pack_u32(0x7FFFFFFF))],
+            [(arena_at - area * 4, pack_u32(0x7FFFFFFF))],
+            [
+                (arena_at - area * 13, b"\x00" * (area * 4)),
+                (arena_at - area * 9, b"\xF0" * area),
+            ],
+        ]
+        corrupt_ok = True
+        for writes in corruptions:
+            corrupt = bytearray(cache)
+            for at, payload in writes:
+                corrupt[at:at + len(payload)] = payload
+            with open(cache_path, "wb") as handle:
+                handle.write(corrupt)
+            reparsed = vxl.VXL(1, source_path, 2)
+            corrupt_ok = (
+                corrupt_ok
+                and same_columns(reparsed, changed)
+                and reparsed.generate_vxl(False) == changed_map
+            )
+        check_condition(
+            "corrupt vxlc cache falls back to parsing",
+            corrupt_ok,
+            "a corrupt cache of the right size was trusted",
+        )
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
 
 def main():
     print("=" * 60)
@@ -51,6 +51,15 @@ WORLD_API = [
     "update",
 ]
 
+WORLD_EXTENSION_API = [
+    "hitscan_batch",
+    "max_substeps",
+    "player_array",
+    "query_box",
+    "query_radius",
+    "timestep",
+]
+
 OBJECT_API = [
     "check_valid_position",
     "delete",
@@ -273,7 +282,14 @@ def test_module_surface():
 
 
 def test_class_dirs():
-    check("World dir", dir_list(world.World) == WORLD_API, dir_list(world.World))
+    world_dir = [name for name in dir_list(world.World) if name not in WORLD_EXTENSION_API]
+    check("World dir", world_dir == WORLD_API, world_dir)
+    if not IS_PY2:
+        check(
+            "World extension dir",
+            dir_list(world.World) == sorted(WORLD_API + WORLD_EXTENSION_API),
+            dir_list(world.World),
+        )
     check("Object dir", dir_list(world.Object) == OBJECT_API, dir_list(world.Object))
     check("Player dir", dir_list(world.Player) == PLAYER_API, dir_list(world.Player))
     check("GenericMovement dir", dir_list(world.GenericMovement) == GENERIC_API, dir_list(world.GenericMovement))